@@ -3,6 +3,8 @@ from flask_session import Session
 
 from config import Config
 from extensions import (
+    disk_cache,
+    indexer,
     logging as log_ext
 )
 from routes import init_routes
@@ -18,6 +20,8 @@ def create_app() -> Flask:
 
     # Extensions
     Session(app)
+    disk_cache.init_app(app)
+    indexer.init_app(app)
 
     # Logging
     log_ext.setup_logging()
@@ -15,6 +15,119 @@ class Config:
     API_DESCRIPTION = "Modula Internal Files Management API"
     OPENAPI_VERSION = "3.0.3"
 
+    # Download Settings
+    # Members larger than DOWNLOAD_BUFFER_MAX_BYTES are streamed in chunks
+    # instead of being read into memory first.
+    DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", 64 * 1024))
+    DOWNLOAD_BUFFER_MAX_BYTES = int(os.getenv("DOWNLOAD_BUFFER_MAX_BYTES", 1024 * 1024))
+    # Seconds a request waits on an identical in-flight extraction before giving up; 0 disables coalescing
+    DOWNLOAD_COALESCE_TIMEOUT = float(os.getenv("DOWNLOAD_COALESCE_TIMEOUT", 30))
+    # Seconds to gather requests for other members of an unindexed archive into one pass; 0 disables
+    DOWNLOAD_BATCH_WINDOW = float(os.getenv("DOWNLOAD_BATCH_WINDOW", 0.005))
+    # Default and largest page sizes of GET /download/members
+    MEMBERS_PAGE_SIZE = int(os.getenv("MEMBERS_PAGE_SIZE", 1000))
+    MEMBERS_PAGE_MAX = int(os.getenv("MEMBERS_PAGE_MAX", 10000))
+    # Cache-Control max-age of member downloads (sent as private and immutable); 0 makes clients revalidate
+    DOWNLOAD_CACHE_MAX_AGE = int(os.getenv("DOWNLOAD_CACHE_MAX_AGE", 24 * 3600))
+    # Seconds nginx's proxy_cache keeps a download, via X-Accel-Expires; 0 keeps them out of it
+    DOWNLOAD_PROXY_CACHE_TTL = int(os.getenv("DOWNLOAD_PROXY_CACHE_TTL", 3600))
+
+    # Member Cache Settings
+    # Per-worker LRU of extracted member bytes; 0 disables it.
+    MEMBER_CACHE_MAX_BYTES = int(os.getenv("MEMBER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    MEMBER_CACHE_MAX_ITEM_BYTES = int(os.getenv("MEMBER_CACHE_MAX_ITEM_BYTES", DOWNLOAD_BUFFER_MAX_BYTES))
+    # "zlib" keeps text members compressed in the cache and inflates them on hits; "none" stores raw bytes
+    MEMBER_CACHE_COMPRESSION = os.getenv("MEMBER_CACHE_COMPRESSION", "none").lower()
+    MEMBER_CACHE_COMPRESSION_LEVEL = int(os.getenv("MEMBER_CACHE_COMPRESSION_LEVEL", 1))
+    # Text members at least this large also get a cached gzip copy for clients accepting it; 0 disables
+    GZIP_MEMBERS_MIN_BYTES = int(os.getenv("GZIP_MEMBERS_MIN_BYTES", 512))
+    GZIP_MEMBERS_LEVEL = int(os.getenv("GZIP_MEMBERS_LEVEL", 6))
+
+    # Local scratch space for indexes and caches (never the bucket mount)
+    CACHE_ROOT = os.getenv("CACHE_ROOT", "/tmp/modula-edocs")
+
+    # Archive Index Settings
+    # Gzip checkpoints are taken every GZIP_INDEX_SPAN compressed bytes and kept
+    # in memory, bounded by GZIP_INDEX_CACHE_MAX_BYTES across all archives.
+    ARCHIVE_INDEX_ENABLED = os.getenv("ARCHIVE_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+    GZIP_INDEX_SPAN = int(os.getenv("GZIP_INDEX_SPAN", 1024 * 1024))
+    GZIP_INDEX_CACHE_MAX_BYTES = int(os.getenv("GZIP_INDEX_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    # Persistent member index sidecars; set to an empty string to disable
+    INDEX_DIR = os.getenv("INDEX_DIR", os.path.join(CACHE_ROOT, "index"))
+
+    # Disk Member Cache Settings
+    # Extracted members shared by all workers on local disk; empty dir or 0 bytes disables it.
+    DISK_CACHE_DIR = os.getenv("DISK_CACHE_DIR", os.path.join(CACHE_ROOT, "members"))
+    DISK_CACHE_MAX_BYTES = int(os.getenv("DISK_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+    DISK_CACHE_MAX_ITEM_BYTES = int(os.getenv("DISK_CACHE_MAX_ITEM_BYTES", 64 * 1024 * 1024))
+    DISK_CACHE_MAX_AGE = float(os.getenv("DISK_CACHE_MAX_AGE", 7 * 24 * 3600))
+    DISK_CACHE_SWEEP_INTERVAL = float(os.getenv("DISK_CACHE_SWEEP_INTERVAL", 60))
+
+    # X-Accel-Redirect Settings
+    # Let nginx send members from the disk cache; the prefix must be an internal location aliasing DISK_CACHE_DIR.
+    ACCEL_REDIRECT_ENABLED = os.getenv("ACCEL_REDIRECT_ENABLED", "false").lower() in ("1", "true", "yes")
+    ACCEL_REDIRECT_PREFIX = os.getenv("ACCEL_REDIRECT_PREFIX", "/_accel/members/")
+
+    # Prefetch Settings
+    # When a download first touches an archive, the background index pass also writes its members to the disk cache.
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+    PREFETCH_MAX_MEMBER_BYTES = int(os.getenv("PREFETCH_MAX_MEMBER_BYTES", DOWNLOAD_BUFFER_MAX_BYTES))
+    PREFETCH_MAX_BYTES = int(os.getenv("PREFETCH_MAX_BYTES", 16 * 1024 * 1024))
+
+    # Export Job Settings
+    # Bulk exports are queued under EXPORT_DIR by the web workers and built by the export runner process.
+    EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(CACHE_ROOT, "exports"))
+    EXPORT_MAX_JOBS = int(os.getenv("EXPORT_MAX_JOBS", 1))
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 4))
+    # Read-ahead members one export may hold in memory; larger or further ones are spooled to EXPORT_DIR
+    EXPORT_SPOOL_MAX_BYTES = int(os.getenv("EXPORT_SPOOL_MAX_BYTES", 32 * 1024 * 1024))
+    EXPORT_POLL_INTERVAL = float(os.getenv("EXPORT_POLL_INTERVAL", 1.0))
+    EXPORT_MAX_AGE = float(os.getenv("EXPORT_MAX_AGE", 24 * 3600))
+
+    # Document Catalog Settings
+    # MongoDB collection mapping member names and document keys to archives, filled as archives are indexed.
+    CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "false").lower() in ("1", "true", "yes")
+    CATALOG_DB = os.getenv("CATALOG_DB", "modula_edocs")
+    CATALOG_COLLECTION = os.getenv("CATALOG_COLLECTION", "documents")
+    CATALOG_BATCH_SIZE = int(os.getenv("CATALOG_BATCH_SIZE", 1000))
+
+    # Bucket Metadata Cache Settings
+    # Per-worker TTL cache of stat results and directory listings from the bucket mount; 0 disables.
+    FS_CACHE_TTL = float(os.getenv("FS_CACHE_TTL", 5))
+    FS_CACHE_MAX_ENTRIES = int(os.getenv("FS_CACHE_MAX_ENTRIES", 50000))
+
+    # Archive Discovery Settings
+    # Listings of date directories older than ARCHIVE_TREE_SETTLED_DAYS are cached for ARCHIVE_TREE_SETTLED_TTL.
+    ARCHIVE_TREE_SETTLED_DAYS = int(os.getenv("ARCHIVE_TREE_SETTLED_DAYS", 2))
+    ARCHIVE_TREE_SETTLED_TTL = float(os.getenv("ARCHIVE_TREE_SETTLED_TTL", 3600))
+    ARCHIVE_LIST_MAX_DAYS = int(os.getenv("ARCHIVE_LIST_MAX_DAYS", 366))
+
+    # Negative Cache Settings
+    # Per-worker memory of lookups that returned 404; a TTL of 0 disables that kind.
+    # Missing archives are forgotten early only by the index watcher (off by default); otherwise an archive
+    # uploaded after a 404 stays 404 on that worker for up to NEGATIVE_CACHE_ARCHIVE_TTL seconds.
+    NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", 60))
+    NEGATIVE_CACHE_ARCHIVE_TTL = float(os.getenv("NEGATIVE_CACHE_ARCHIVE_TTL", 5))
+    NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", 10000))
+
+    # Local Archive Cache Settings
+    # Optional local-disk copies of hot archives in front of the bucket mount; empty disables it.
+    ARCHIVE_CACHE_DIR = os.getenv("ARCHIVE_CACHE_DIR", "")
+    ARCHIVE_CACHE_MAX_BYTES = int(os.getenv("ARCHIVE_CACHE_MAX_BYTES", 4 * 1024 * 1024 * 1024))
+    ARCHIVE_CACHE_COPY_BUFSIZE = int(os.getenv("ARCHIVE_CACHE_COPY_BUFSIZE", 8 * 1024 * 1024))
+    ARCHIVE_CACHE_MMAP = os.getenv("ARCHIVE_CACHE_MMAP", "true").lower() in ("1", "true", "yes")
+
+    # Background Indexer Settings
+    # Watches the recent <customer>/<yy>/<mm>/<dd> directories and indexes new
+    # archives before clients ask for them. INDEXER_MODE is auto, inotify or poll.
+    INDEXER_ENABLED = os.getenv("INDEXER_ENABLED", "false").lower() in ("1", "true", "yes")
+    INDEXER_MODE = os.getenv("INDEXER_MODE", "auto")
+    INDEXER_POLL_INTERVAL = float(os.getenv("INDEXER_POLL_INTERVAL", 60))
+    INDEXER_LOOKBACK_DAYS = int(os.getenv("INDEXER_LOOKBACK_DAYS", 2))
+    INDEXER_SETTLE_SECONDS = float(os.getenv("INDEXER_SETTLE_SECONDS", 10))
+    INDEXER_WORKERS = int(os.getenv("INDEXER_WORKERS", 1))
+    INDEXER_MAX_BYTES_PER_SEC = float(os.getenv("INDEXER_MAX_BYTES_PER_SEC", 8 * 1024 * 1024))
+
     # Upload Settings
     MAX_CONTENT_LENGTH = 2 * 1024 * 1024 * 1024  # 2GB
 
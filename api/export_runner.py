@@ -0,0 +1,72 @@
+"""
+Background runner for bulk exports.
+
+Web workers only queue jobs under EXPORT_DIR; this process claims them and
+builds the bundles, so Gunicorn restarts (max_requests, timeouts) never
+kill an export half way. Supervisord keeps one runner per container and a
+lock file under EXPORT_DIR makes sure a second one exits.
+
+Usage (from the repo root):
+    python api/export_runner.py [--poll-interval SECONDS] [--once]
+"""
+import argparse
+import fcntl
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import List, Optional, Set
+
+from config import Config
+from extensions import export_jobs
+from extensions.logging import get_logger
+
+logger = get_logger(__name__, class_name="ExportRunner")
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run queued bulk exports from EXPORT_DIR.")
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=Config.EXPORT_POLL_INTERVAL,
+        help="Seconds between scans for queued jobs (default: EXPORT_POLL_INTERVAL)",
+    )
+    parser.add_argument("--once", action="store_true", help="Exit once no job is queued or running")
+    return parser.parse_args(argv)
+
+
+def run(poll_interval: float, once: bool = False) -> None:
+    slots = max(Config.EXPORT_MAX_JOBS, 1)
+    with ThreadPoolExecutor(max_workers=slots, thread_name_prefix="export-job") as pool:
+        running: Set[Future] = set()
+        while True:
+            running = {future for future in running if not future.done()}
+            for state in export_jobs.claim_queued(slots - len(running)):
+                logger.info(f"Export {state['id']} started for {state['customer']}")
+                running.add(pool.submit(export_jobs.run_job, state))
+            if not once:
+                time.sleep(poll_interval)
+            elif running:
+                wait(running, return_when=FIRST_COMPLETED)
+            else:
+                return
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    os.makedirs(Config.EXPORT_DIR, exist_ok=True)
+
+    with open(os.path.join(Config.EXPORT_DIR, export_jobs.RUNNER_LOCK), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.error(f"Another export runner holds {Config.EXPORT_DIR}; exiting")
+            return 1
+        export_jobs.recover_interrupted()
+        run(args.poll_interval, once=args.once)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
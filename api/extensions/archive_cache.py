@@ -0,0 +1,140 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Optional, Set, Union
+
+from config import Config
+from extensions.logging import get_logger
+from utils.archive import TAR_READ_BUFSIZE
+from utils.disk_lru import TMP_PREFIX, sweep_directory, touch
+
+logger = get_logger(__name__, class_name="ArchiveCache")
+
+_STATS = {"local_opens": 0, "source_opens": 0, "copies": 0, "copied_bytes": 0, "copy_failures": 0, "evictions": 0}
+_LOCK = threading.Lock()
+_PENDING: Set[str] = set()
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _LOCK:
+        _STATS[name] += amount
+
+
+def enabled() -> bool:
+    return bool(Config.ARCHIVE_CACHE_DIR) and Config.ARCHIVE_CACHE_MAX_BYTES > 0
+
+
+def _local_path(path: str, st: os.stat_result) -> str:
+    """Local copy location; the source's mtime/size are part of the name, so a changed source never matches."""
+    identity = f"{path}\0{st.st_mtime_ns}\0{st.st_size}"
+    digest = hashlib.sha256(identity.encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(Config.ARCHIVE_CACHE_DIR, digest[:2], digest + ".tar.gz")
+
+
+def _map(fh: BinaryIO) -> Union[BinaryIO, mmap.mmap]:
+    if not Config.ARCHIVE_CACHE_MMAP:
+        return fh
+    try:
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        # Empty files and some filesystems cannot be mapped
+        return fh
+    fh.close()
+    return mapped
+
+
+def open_archive(path: str, st: os.stat_result, promote: bool = True) -> Union[BinaryIO, mmap.mmap]:
+    """
+    Open an archive for reading, preferring a current local copy.
+
+    Without a local copy the bucket file is opened directly and, when
+    ``promote`` is set, a background copy is queued for later opens.
+    """
+    if enabled():
+        local = _local_path(path, st)
+        try:
+            fh = open(local, "rb")
+        except FileNotFoundError:
+            if promote:
+                schedule_copy(path, st)
+        else:
+            touch(local)
+            _count("local_opens")
+            return _map(fh)
+
+    _count("source_opens")
+    return open(path, "rb", buffering=TAR_READ_BUFSIZE)
+
+
+def copy_archive(path: str, st: os.stat_result) -> str:
+    """Copy ``path`` to the local cache with large sequential reads and return the copy's path."""
+    local = _local_path(path, st)
+    directory = os.path.dirname(local)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=TMP_PREFIX)
+    try:
+        copied = 0
+        with open(path, "rb", buffering=0) as src, os.fdopen(fd, "wb") as dst:
+            try:
+                os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except (AttributeError, OSError):
+                pass
+            while True:
+                chunk = src.read(Config.ARCHIVE_CACHE_COPY_BUFSIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                copied += len(chunk)
+
+        after = os.stat(path)
+        if (after.st_mtime_ns, after.st_size) != (st.st_mtime_ns, st.st_size):
+            raise RuntimeError("source archive changed while it was being copied")
+        os.replace(tmp_path, local)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    _count("copies")
+    _count("copied_bytes", copied)
+    result = sweep_directory(Config.ARCHIVE_CACHE_DIR, Config.ARCHIVE_CACHE_MAX_BYTES)
+    _count("evictions", result["evicted"])
+    logger.info(f"Cached {path} locally ({copied} bytes)")
+    return local
+
+
+def _copy_in_background(path: str, st: os.stat_result) -> None:
+    try:
+        copy_archive(path, st)
+    except Exception as exc:
+        _count("copy_failures")
+        logger.warning(f"Local copy of {path} failed: {exc}")
+    finally:
+        with _LOCK:
+            _PENDING.discard(path)
+
+
+def schedule_copy(path: str, st: os.stat_result) -> None:
+    global _EXECUTOR
+    with _LOCK:
+        if path in _PENDING:
+            return
+        _PENDING.add(path)
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-copy")
+        executor = _EXECUTOR
+
+    executor.submit(_copy_in_background, path, st)
+
+
+def stats() -> Dict[str, Any]:
+    if not enabled():
+        return {"enabled": False}
+    with _LOCK:
+        return dict(_STATS, max_bytes=Config.ARCHIVE_CACHE_MAX_BYTES)
@@ -0,0 +1,248 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, Optional, Set, Union
+
+from config import Config
+from extensions import archive_cache, catalog, prefetch
+from extensions.logging import get_logger
+from utils.archive import MemberEntry, scan_archive
+from utils.gzindex import GzipIndex, InflateReader
+from utils.member_index import MemberIndexFile, encode_name, write_member_index
+from utils.throttle import RateLimiter
+
+logger = get_logger(__name__, class_name="ArchiveIndex")
+
+# Rough in-memory cost of one member entry held in a dict (sidecars are mmap-backed)
+MEMBER_COST = 256
+
+_INDEXES: "OrderedDict[str, ArchiveIndex]" = OrderedDict()
+_INDEX_BYTES = 0
+_PENDING: Set[str] = set()
+_LOCK = threading.Lock()
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+
+class ArchiveIndex:
+    """
+    Gzip checkpoints plus member locations for one archive version.
+
+    ``members`` is either a plain dict or a memory-mapped sidecar; both
+    answer ``get(name)``.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mtime_ns: int,
+        size: int,
+        gzip_index: GzipIndex,
+        members: Union[Dict[str, MemberEntry], MemberIndexFile],
+    ) -> None:
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.gzip_index = gzip_index
+        self.members = members
+
+    @property
+    def cost(self) -> int:
+        members_cost = len(self.members) * MEMBER_COST if isinstance(self.members, dict) else 0
+        return self.gzip_index.cost + members_cost
+
+    def is_current(self, st: os.stat_result) -> bool:
+        return st.st_mtime_ns == self.mtime_ns and st.st_size == self.size
+
+    def get(self, filename: str) -> Optional[MemberEntry]:
+        return self.members.get(filename.rstrip("/"))
+
+    def iter_from(self, name: str = "") -> Iterator[MemberEntry]:
+        """Members in UTF-8 name order (the sidecar's order), from the first name not below ``name``."""
+        if isinstance(self.members, MemberIndexFile):
+            return self.members.iter_from(name)
+        start = encode_name(name)
+        ordered = sorted((encode_name(entry.name), entry) for entry in self.members.values())
+        return (entry for key, entry in ordered if key >= start)
+
+    def open_member(self, entry: MemberEntry, fileobj: Optional[BinaryIO] = None, start: int = 0) -> InflateReader:
+        """Inflate from the nearest checkpoint before byte ``start`` of the member's data."""
+        return self.gzip_index.open_at(self.path, entry.offset_data + start, entry.size - start, fileobj)
+
+
+def _drop(path: str) -> None:
+    global _INDEX_BYTES
+    index = _INDEXES.pop(path, None)
+    if index is not None:
+        _INDEX_BYTES -= index.cost
+
+
+def _store(index: ArchiveIndex) -> None:
+    global _INDEX_BYTES
+    if index.cost > Config.GZIP_INDEX_CACHE_MAX_BYTES:
+        return
+
+    with _LOCK:
+        _drop(index.path)
+        while _INDEXES and _INDEX_BYTES + index.cost > Config.GZIP_INDEX_CACHE_MAX_BYTES:
+            evicted_path, evicted = _INDEXES.popitem(last=False)
+            _INDEX_BYTES -= evicted.cost
+            logger.debug(f"Evicted index for {evicted_path}")
+        _INDEXES[index.path] = index
+        _INDEX_BYTES += index.cost
+
+
+def sidecar_path(path: str) -> Optional[str]:
+    """Location of the persistent member index for archive ``path``."""
+    if not Config.INDEX_DIR:
+        return None
+
+    rel_path = os.path.relpath(path, Config.FILES_ROOT)
+    if rel_path.startswith(".."):
+        rel_path = hashlib.sha1(path.encode()).hexdigest()
+    return os.path.join(Config.INDEX_DIR, rel_path + ".idx")
+
+
+def _load_sidecar(path: str, st: os.stat_result) -> Optional[MemberIndexFile]:
+    index_path = sidecar_path(path)
+    if index_path is None:
+        return None
+
+    try:
+        sidecar = MemberIndexFile.open(index_path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Ignoring unreadable member index {index_path}: {exc}")
+        return None
+
+    if not sidecar.is_current(st):
+        logger.debug(f"Member index {index_path} is stale; archive changed on disk")
+        return None
+    return sidecar
+
+
+def get_index(path: str, st: os.stat_result) -> Optional[ArchiveIndex]:
+    """
+    Return an index for ``path`` if one matches the archive on disk.
+
+    Falls back to the persistent sidecar when no checkpoints are cached in
+    this process; such an index can answer lookups immediately while the
+    checkpoints are rebuilt in the background.
+    """
+    with _LOCK:
+        index = _INDEXES.get(path)
+        if index is not None:
+            if index.is_current(st):
+                _INDEXES.move_to_end(path)
+                return index
+            _drop(path)
+
+    sidecar = _load_sidecar(path, st)
+    if sidecar is None:
+        return None
+
+    index = ArchiveIndex(path, st.st_mtime_ns, st.st_size, GzipIndex.from_start(), sidecar)
+    _store(index)
+    schedule_build(path)
+    return index
+
+
+def is_indexed(path: str, st: os.stat_result) -> bool:
+    """True when a current index for ``path`` exists in memory or on disk."""
+    with _LOCK:
+        index = _INDEXES.get(path)
+        if index is not None and index.is_current(st):
+            return True
+    return _load_sidecar(path, st) is not None
+
+
+def build_index(path: str, limiter: Optional[RateLimiter] = None, fill_cache: bool = False) -> ArchiveIndex:
+    """
+    Scan ``path`` once, persist its member index and cache the result.
+
+    With ``fill_cache`` the same pass also caches the archive's members.
+    """
+    st = os.stat(path)
+    source = archive_cache.open_archive(path, st, promote=False)
+    filler = prefetch.MemberFiller(path, st) if fill_cache else None
+    gzip_index, members = scan_archive(path, Config.GZIP_INDEX_SPAN, limiter, source, filler)
+    if filler is not None:
+        filler.report()
+    catalog.record_archive(path, st, members.values())
+
+    index_path = sidecar_path(path)
+    if index_path is not None:
+        try:
+            sidecar = _load_sidecar(path, st)
+            if sidecar is None:
+                write_member_index(index_path, st, members.values())
+                sidecar = MemberIndexFile.open(index_path)
+            members = sidecar
+        except OSError as exc:
+            logger.warning(f"Could not persist member index {index_path}: {exc}")
+
+    index = ArchiveIndex(path, st.st_mtime_ns, st.st_size, gzip_index, members)
+    if index.cost > Config.GZIP_INDEX_CACHE_MAX_BYTES:
+        # Keep the member lookup but drop checkpoints that would not fit anyway,
+        # so the sidecar path does not keep rescheduling this build.
+        logger.warning(f"Checkpoints for {path} ({index.cost} bytes) exceed the cache budget; not kept")
+        index = ArchiveIndex(path, st.st_mtime_ns, st.st_size, GzipIndex.from_start(), members)
+    _store(index)
+    logger.info(
+        f"Indexed {path}: {len(members)} member(s), {len(gzip_index.checkpoints)} checkpoint(s)"
+    )
+    return index
+
+
+def write_sidecar(path: str, limiter: Optional[RateLimiter] = None) -> int:
+    """
+    Scan ``path`` and persist only its member index, without keeping gzip
+    checkpoints. Used by offline bulk indexing. Returns the member count.
+    """
+    index_path = sidecar_path(path)
+    if index_path is None:
+        raise RuntimeError("INDEX_DIR is not configured")
+
+    st = os.stat(path)
+    _, members = scan_archive(path, 0, limiter, archive_cache.open_archive(path, st, promote=False))
+    write_member_index(index_path, st, members.values())
+    catalog.record_archive(path, st, members.values())
+    return len(members)
+
+
+def _build_in_background(path: str) -> None:
+    try:
+        # Builds queued from downloads are first touches; siblings are likely next
+        build_index(path, fill_cache=prefetch.enabled())
+    except Exception as exc:
+        logger.warning(f"Background index build failed for {path}: {exc}")
+    finally:
+        with _LOCK:
+            _PENDING.discard(path)
+
+
+def schedule_build(path: str) -> None:
+    """Queue a background index build for ``path`` unless one is already pending."""
+    global _EXECUTOR
+    if not Config.ARCHIVE_INDEX_ENABLED:
+        return
+
+    with _LOCK:
+        if path in _PENDING:
+            return
+        _PENDING.add(path)
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-index")
+        executor = _EXECUTOR
+
+    executor.submit(_build_in_background, path)
+
+
+def clear() -> None:
+    """Drop every cached index."""
+    global _INDEX_BYTES
+    with _LOCK:
+        _INDEXES.clear()
+        _INDEX_BYTES = 0
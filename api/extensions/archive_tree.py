@@ -0,0 +1,61 @@
+import calendar
+import os
+from datetime import date, timedelta
+from typing import Collection, List, Optional
+
+from config import Config
+from extensions import fs_cache
+from utils.archive import ArchiveRef, iter_archives
+from utils.time import utc_now
+
+
+def _last_day(rel_parts: List[str]) -> Optional[date]:
+    """Last date a ``<customer>/<yy>[/<mm>[/<dd>]]`` directory can hold archives for."""
+    if len(rel_parts) < 2:
+        return None
+    try:
+        year = 2000 + int(rel_parts[1])
+        if len(rel_parts) == 2:
+            return date(year, 12, 31)
+        month = int(rel_parts[2])
+        if len(rel_parts) == 3:
+            return date(year, month, calendar.monthrange(year, month)[1])
+        return date(year, month, int(rel_parts[3]))
+    except ValueError:
+        return None
+
+
+def _listdir(path: str) -> List[str]:
+    """
+    Cached directory listing that keeps settled parts of the tree longer.
+
+    Directories whose dates are all more than ``ARCHIVE_TREE_SETTLED_DAYS``
+    in the past no longer receive archives, so their listings are kept for
+    ``ARCHIVE_TREE_SETTLED_TTL``. Recent ones follow ``FS_CACHE_TTL`` and are
+    invalidated by the watcher when an archive lands.
+    """
+    rel_path = os.path.relpath(path, Config.FILES_ROOT)
+    rel_parts = [] if rel_path == "." else rel_path.split(os.sep)
+    last_day = _last_day(rel_parts)
+    settled_before = utc_now().date() - timedelta(days=Config.ARCHIVE_TREE_SETTLED_DAYS)
+    ttl = Config.ARCHIVE_TREE_SETTLED_TTL if last_day is not None and last_day < settled_before else None
+    return fs_cache.listdir(path, ttl=ttl)
+
+
+def list_archives(
+    customer: str,
+    since: date,
+    until: date,
+    branches: Optional[Collection[str]] = None,
+) -> List[ArchiveRef]:
+    """Archives of one customer between ``since`` and ``until``, in date order."""
+    return list(
+        iter_archives(
+            Config.FILES_ROOT,
+            customers=[customer],
+            since=since,
+            until=until,
+            branches=branches,
+            listdir=_listdir,
+        )
+    )
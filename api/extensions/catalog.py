@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne, errors
+
+from config import Config
+from extensions import db
+from extensions.logging import get_logger
+from utils.archive import TAR_REL_REGEX, MemberEntry
+
+logger = get_logger(__name__, class_name="DocumentCatalog")
+
+# Costa Rican electronic documents are identified by a 50-digit "clave"
+DOCUMENT_KEY_REGEX = r"(\d{50})"
+
+_INDEXES_READY = False
+_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    return Config.CATALOG_ENABLED
+
+
+def document_key(name: str) -> str:
+    """The electronic document key in a member name, or its base name without extensions."""
+    base = os.path.basename(name)
+    match = re.search(DOCUMENT_KEY_REGEX, base)
+    return match.group(1) if match else base.split(".", 1)[0]
+
+
+def get_collection():
+    """Catalog collection, with its lookup indexes created once per process."""
+    global _INDEXES_READY
+    collection = db.get_client()[Config.CATALOG_DB][Config.CATALOG_COLLECTION]
+    if not _INDEXES_READY:
+        with _LOCK:
+            if not _INDEXES_READY:
+                collection.create_index([("name", ASCENDING), ("customer", ASCENDING), ("day", DESCENDING)])
+                collection.create_index([("key", ASCENDING), ("customer", ASCENDING), ("day", DESCENDING)])
+                collection.create_index([("tar_path", ASCENDING)])
+                _INDEXES_READY = True
+    return collection
+
+
+def record_archive(path: str, st: os.stat_result, members: Iterable[MemberEntry]) -> int:
+    """
+    Upsert one catalog document per member of the archive at ``path``.
+
+    Entries left over from an earlier version of the archive are removed.
+    Failures are logged, never raised, so indexing itself is unaffected.
+    Returns the number of members written.
+    """
+    if not enabled():
+        return 0
+
+    rel_search = re.search(TAR_REL_REGEX, os.path.relpath(path, Config.FILES_ROOT))
+    if not rel_search:
+        return 0
+    tar_path = rel_search.group(1)
+    customer, yy, mm, dd, archive_name = tar_path.split("/")
+    common = {
+        "tar_path": tar_path,
+        "customer": customer,
+        "day": f"20{yy}-{mm}-{dd}",
+        "branch": archive_name[:3],
+        "archive_size": st.st_size,
+        "archive_mtime_ns": st.st_mtime_ns,
+        "indexed_at": time.time(),
+    }
+
+    written = 0
+    try:
+        collection = get_collection()
+        batch: List[UpdateOne] = []
+        for entry in members:
+            document = dict(
+                common,
+                name=entry.name,
+                key=document_key(entry.name),
+                size=entry.size,
+                mtime=entry.mtime,
+                offset=entry.offset,
+                offset_data=entry.offset_data,
+            )
+            batch.append(UpdateOne({"_id": f"{tar_path}:{entry.name}"}, {"$set": document}, upsert=True))
+            if len(batch) >= Config.CATALOG_BATCH_SIZE:
+                collection.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        if batch:
+            collection.bulk_write(batch, ordered=False)
+            written += len(batch)
+
+        collection.delete_many({"tar_path": tar_path, "archive_mtime_ns": {"$ne": st.st_mtime_ns}})
+    except (errors.PyMongoError, RuntimeError) as exc:
+        logger.warning(f"Could not catalog {tar_path}: {exc}")
+    return written
+
+
+def find(
+    filename: Optional[str] = None,
+    key: Optional[str] = None,
+    customer: Optional[str] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Catalog entries for an exact member name or document key, newest archive first."""
+    query: Dict[str, Any] = {"name": filename} if filename else {"key": key}
+    if customer:
+        query["customer"] = customer
+    cursor = get_collection().find(query, {"_id": 0}).sort([("day", DESCENDING), ("tar_path", DESCENDING)])
+    return list(cursor.limit(limit))
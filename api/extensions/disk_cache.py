@@ -0,0 +1,196 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from config import Config
+from extensions.logging import get_logger
+from utils.disk_lru import TMP_PREFIX, sweep_directory, touch
+
+logger = get_logger(__name__, class_name="DiskMemberCache")
+
+# Directory the internal location in build/nginx.conf aliases for ACCEL_REDIRECT_PREFIX
+NGINX_ACCEL_ALIAS = "/tmp/modula-edocs/members/"
+
+_STATS = {"hits": 0, "misses": 0, "writes": 0, "bytes_written": 0, "evictions": 0}
+_STATS_LOCK = threading.Lock()
+_LAST_SWEEP = 0.0
+
+
+def _count(name: str, amount: int = 1) -> None:
+    with _STATS_LOCK:
+        _STATS[name] += amount
+
+
+def enabled() -> bool:
+    return bool(Config.DISK_CACHE_DIR) and Config.DISK_CACHE_MAX_BYTES > 0
+
+
+def accepts(size: int) -> bool:
+    """Whether a member of ``size`` bytes would be cached."""
+    return enabled() and size <= Config.DISK_CACHE_MAX_ITEM_BYTES
+
+
+def init_app(app) -> None:
+    """Refuse X-Accel-Redirect without a disk cache for nginx to send from."""
+    if not Config.ACCEL_REDIRECT_ENABLED:
+        return
+    if not enabled():
+        raise RuntimeError("ACCEL_REDIRECT_ENABLED requires the disk cache (DISK_CACHE_DIR and DISK_CACHE_MAX_BYTES)")
+    if os.path.realpath(Config.DISK_CACHE_DIR) != os.path.realpath(NGINX_ACCEL_ALIAS):
+        logger.warning(
+            f"DISK_CACHE_DIR is {Config.DISK_CACHE_DIR} but the shipped nginx location for "
+            f"{Config.ACCEL_REDIRECT_PREFIX} aliases {NGINX_ACCEL_ALIAS}; update build/nginx.conf to match"
+        )
+
+
+def _digest(path: str, st: os.stat_result, name: str) -> str:
+    identity = f"{path}\0{st.st_mtime_ns}\0{st.st_size}\0{name}"
+    return hashlib.sha256(identity.encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def _entry_rel_path(digest: str) -> str:
+    return f"{digest[:2]}/{digest}"
+
+
+def _entry_path(digest: str) -> str:
+    return os.path.join(Config.DISK_CACHE_DIR, _entry_rel_path(digest))
+
+
+def locate(path: str, st: os.stat_result, name: str) -> Optional[str]:
+    """
+    Path of the cached copy of a member relative to ``DISK_CACHE_DIR``, if there is one.
+
+    Used to hand the file to nginx instead of reading it here.
+    """
+    if not enabled():
+        return None
+
+    digest = _digest(path, st, name)
+    entry = _entry_path(digest)
+    if not os.path.isfile(entry):
+        _count("misses")
+        return None
+
+    touch(entry)
+    _count("hits")
+    return _entry_rel_path(digest)
+
+
+def open_entry(path: str, st: os.stat_result, name: str) -> Optional[Tuple[BinaryIO, int]]:
+    """
+    Open the cached copy of a member, returning the file and its size.
+
+    Entries are replaced atomically and never modified in place, so an open
+    handle stays valid even if a sweep unlinks the entry meanwhile.
+    """
+    if not enabled():
+        return None
+
+    entry = _entry_path(_digest(path, st, name))
+    try:
+        fh = open(entry, "rb")
+    except FileNotFoundError:
+        _count("misses")
+        return None
+
+    touch(entry)
+    _count("hits")
+    return fh, os.fstat(fh.fileno()).st_size
+
+
+class CacheWriter:
+    """Write a member to a temp file and publish it with an atomic rename."""
+
+    def __init__(self, entry: str) -> None:
+        self._entry = entry
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry), prefix=TMP_PREFIX)
+        # mkstemp creates 0600 files; nginx workers read entries for X-Accel-Redirect
+        os.fchmod(fd, 0o644)
+        self._fh: Optional[BinaryIO] = os.fdopen(fd, "wb")
+        self._written = 0
+
+    def write(self, chunk: bytes) -> None:
+        if self._fh is None:
+            return
+        try:
+            self._fh.write(chunk)
+            self._written += len(chunk)
+        except OSError as exc:
+            # A full cache disk must never break the download itself
+            logger.warning(f"Disk cache write failed: {exc}")
+            self.discard()
+
+    def commit(self) -> None:
+        if self._fh is None:
+            return
+        try:
+            self._fh.close()
+            self._fh = None
+            os.replace(self._tmp_path, self._entry)
+        except OSError as exc:
+            logger.warning(f"Disk cache commit failed: {exc}")
+            self.discard()
+            return
+        _count("writes")
+        _count("bytes_written", self._written)
+        maybe_sweep()
+
+    def discard(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def writer(path: str, st: os.stat_result, name: str, size: int) -> Optional[CacheWriter]:
+    """A writer for one member, or None if it should not be cached."""
+    if not accepts(size):
+        return None
+    try:
+        return CacheWriter(_entry_path(_digest(path, st, name)))
+    except OSError as exc:
+        logger.warning(f"Disk cache unavailable: {exc}")
+        return None
+
+
+def put(path: str, st: os.stat_result, name: str, data: bytes) -> None:
+    cache_writer = writer(path, st, name, len(data))
+    if cache_writer is not None:
+        cache_writer.write(data)
+        cache_writer.commit()
+
+
+def maybe_sweep() -> None:
+    """Run a sweep if this process has not done one recently."""
+    global _LAST_SWEEP
+    now = time.monotonic()
+    if now - _LAST_SWEEP < Config.DISK_CACHE_SWEEP_INTERVAL:
+        return
+    _LAST_SWEEP = now
+    try:
+        sweep()
+    except OSError as exc:
+        logger.warning(f"Disk cache sweep failed: {exc}")
+
+
+def sweep() -> Dict[str, int]:
+    """Expire old entries and trim the cache below its byte cap, oldest access first."""
+    result = sweep_directory(Config.DISK_CACHE_DIR, Config.DISK_CACHE_MAX_BYTES, Config.DISK_CACHE_MAX_AGE)
+    _count("evictions", result["evicted"])
+    if result["evicted"]:
+        logger.info(f"Disk cache sweep evicted {result['evicted']} entries; {result['bytes']} bytes remain")
+    return result
+
+
+def stats() -> Dict[str, Any]:
+    if not enabled():
+        return {"enabled": False}
+    with _STATS_LOCK:
+        return dict(_STATS, max_bytes=Config.DISK_CACHE_MAX_BYTES)
@@ -0,0 +1,349 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import date
+from typing import IO, Any, Collection, Deque, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from extensions import archive_cache, fs_cache
+from extensions.logging import get_logger
+from utils.archive import ArchiveRef, iter_archives, open_archive_stream, select_members
+from utils.bundle import BundleMember, iter_bundle
+
+logger = get_logger(__name__, class_name="ExportJobs")
+
+# Members up to this size may be held in memory between the readers and the writer
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+JOB_ID_REGEX = r"^[0-9a-f]{32}$"
+
+# Held by the export runner for as long as it runs; never expired
+RUNNER_LOCK = ".runner.lock"
+
+
+def _job_path(job_id: str, suffix: str) -> str:
+    return os.path.join(Config.EXPORT_DIR, job_id + suffix)
+
+
+def _write_state(state: Dict[str, Any]) -> None:
+    """Persist job state atomically so any worker can answer status polls."""
+    state["updated_at"] = time.time()
+    fd, tmp_path = tempfile.mkstemp(dir=Config.EXPORT_DIR, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, _job_path(state["id"], ".json"))
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Current state of a job, or None if it is unknown or has expired."""
+    try:
+        with open(_job_path(job_id, ".json"), "r", encoding="utf-8") as fh:
+            state = json.load(fh)
+    except FileNotFoundError:
+        return None
+
+    if state["status"] == "running" and state["pid"] and not _pid_alive(state["pid"]):
+        # The runner went away (restart, crash) without finishing
+        state["status"] = "failed"
+        state["error"] = "Export was interrupted"
+    return state
+
+
+def output_path(state: Dict[str, Any]) -> str:
+    return _job_path(state["id"], "." + state["format"])
+
+
+def _expire_old_jobs() -> None:
+    cutoff = time.time() - Config.EXPORT_MAX_AGE
+    try:
+        entries = list(os.scandir(Config.EXPORT_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name == RUNNER_LOCK:
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+class _MemoryBudget:
+    """Bytes of read-ahead one export may hold in memory; members past it are spooled to disk."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, size: int) -> bool:
+        with self._lock:
+            if self._used + size > self.max_bytes:
+                return False
+            self._used += size
+            return True
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self._used -= size
+
+
+class _SpooledMember:
+    """A spooled member plus the in-memory bytes it holds against the budget."""
+
+    __slots__ = ("member", "held")
+
+    def __init__(self, member: BundleMember, held: int) -> None:
+        self.member = member
+        self.held = held
+
+
+def _spool(fileobj: IO[bytes], size: int, budget: _MemoryBudget) -> Tuple[IO[bytes], int]:
+    if size <= SPOOL_MAX_MEMORY and budget.try_acquire(size):
+        return io.BytesIO(fileobj.read()), size
+    spool = tempfile.TemporaryFile(dir=Config.EXPORT_DIR)
+    shutil.copyfileobj(fileobj, spool, Config.DOWNLOAD_CHUNK_SIZE)
+    spool.seek(0)
+    return spool, 0
+
+
+def _read_archive(
+    ref: ArchiveRef,
+    pattern: Optional[str],
+    prefix: Optional[str],
+    budget: _MemoryBudget,
+) -> List[_SpooledMember]:
+    """Spool the matching members of one archive; runs on a reader thread."""
+    spooled: List[_SpooledMember] = []
+    st = fs_cache.stat(ref.abs_path)
+    # Members keep their path inside the bundle under the archive they came from
+    folder = ref.rel_path[:-len(".tar.gz")]
+    with ExitStack() as stack:
+        source = stack.enter_context(archive_cache.open_archive(ref.abs_path, st, promote=False))
+        tar = stack.enter_context(open_archive_stream(ref.abs_path, source))
+        try:
+            for member in select_members(tar, pattern=pattern or "*", prefix=prefix):
+                spool, held = _spool(tar.extractfile(member), member.size, budget)
+                name = f"{folder}/{member.name.rstrip('/')}"
+                spooled.append(_SpooledMember(BundleMember(name, member.size, int(member.mtime), spool), held))
+        except BaseException:
+            _discard(spooled, budget)
+            raise
+    return spooled
+
+
+def _discard(spooled: List[_SpooledMember], budget: _MemoryBudget) -> None:
+    for item in spooled:
+        item.member.fileobj.close()
+        budget.release(item.held)
+
+
+def _iter_members(state: Dict[str, Any], refs: List[ArchiveRef]) -> Iterator[BundleMember]:
+    """
+    Read archives on a bounded pool and yield their members in walk order.
+
+    Read-ahead is capped at ``workers * 2`` archives, and the members they
+    hold in memory at ``EXPORT_SPOOL_MAX_BYTES``; the rest wait on disk.
+    """
+    workers = max(Config.EXPORT_WORKERS, 1)
+    budget = _MemoryBudget(Config.EXPORT_SPOOL_MAX_BYTES)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export-reader") as pool:
+        in_flight: Deque[Tuple[ArchiveRef, Future]] = deque()
+        pending = iter(refs)
+
+        def refill() -> None:
+            # Bounded read-ahead keeps spooled members from piling up
+            while len(in_flight) < workers * 2:
+                ref = next(pending, None)
+                if ref is None:
+                    return
+                in_flight.append((ref, pool.submit(_read_archive, ref, state["pattern"], state["prefix"], budget)))
+
+        spooled: List[_SpooledMember] = []
+        try:
+            refill()
+            while in_flight:
+                ref, future = in_flight.popleft()
+                try:
+                    spooled = future.result()
+                except Exception as exc:
+                    logger.warning(f"Export {state['id']}: skipping {ref.rel_path}: {exc}")
+                    state["failed"].append(ref.rel_path)
+                    spooled = []
+
+                while spooled:
+                    item = spooled.pop(0)
+                    try:
+                        with item.member.fileobj:
+                            yield item.member
+                    finally:
+                        budget.release(item.held)
+                    state["members"] += 1
+                    state["bytes"] += item.member.size
+
+                state["archives_done"] += 1
+                _write_state(state)
+                refill()
+        finally:
+            # The job failed part way; drop what was read ahead
+            _discard(spooled, budget)
+            for _ref, future in in_flight:
+                future.cancel()
+                if not future.cancelled():
+                    try:
+                        _discard(future.result(), budget)
+                    except Exception:
+                        pass
+
+
+def _iter_states() -> Iterator[Dict[str, Any]]:
+    try:
+        entries = list(os.scandir(Config.EXPORT_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.startswith(".") or not entry.name.endswith(".json"):
+            continue
+        state = get_job(entry.name[:-len(".json")])
+        if state is not None:
+            yield state
+
+
+def recover_interrupted() -> int:
+    """
+    Fail jobs left running by a previous runner; call once when a runner starts.
+
+    Only one runner holds ``RUNNER_LOCK``, so any job still marked running
+    belonged to a process that is gone.
+    """
+    recovered = 0
+    for state in _iter_states():
+        if state["status"] == "running":
+            state["status"] = "failed"
+            state["error"] = "Export was interrupted"
+            state["finished_at"] = time.time()
+            _write_state(state)
+            recovered += 1
+    if recovered:
+        logger.warning(f"Marked {recovered} interrupted export(s) as failed")
+    return recovered
+
+
+def claim_queued(limit: int) -> List[Dict[str, Any]]:
+    """Mark up to ``limit`` queued jobs, oldest first, as running in this process."""
+    if limit <= 0:
+        return []
+    queued = sorted((s for s in _iter_states() if s["status"] == "queued"), key=lambda s: s["created_at"])
+    claimed = queued[:limit]
+    for state in claimed:
+        state["status"] = "running"
+        state["pid"] = os.getpid()
+        _write_state(state)
+    return claimed
+
+
+def run_job(state: Dict[str, Any]) -> None:
+    """Build the bundle of a claimed job; runs in the export runner, never in a web worker."""
+    final = output_path(state)
+    try:
+        refs = list(
+            iter_archives(
+                Config.FILES_ROOT,
+                customers=[state["customer"]],
+                since=date.fromisoformat(state["since"]),
+                until=date.fromisoformat(state["until"]),
+                branches=state["branches"],
+                listdir=fs_cache.listdir,
+            )
+        )
+        state["archives_total"] = len(refs)
+        _write_state(state)
+
+        fd, tmp_path = tempfile.mkstemp(dir=Config.EXPORT_DIR, prefix=".tmp-", suffix="." + state["format"])
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter_bundle(_iter_members(state, refs), state["format"], Config.DOWNLOAD_CHUNK_SIZE):
+                    out.write(chunk)
+            os.replace(tmp_path, final)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        state["status"] = "done"
+        state["size"] = os.path.getsize(final)
+        logger.info(
+            f"Export {state['id']} finished: {state['members']} member(s) from {state['archives_done']} archive(s)"
+        )
+    except Exception as exc:
+        logger.error(f"Export {state['id']} failed: {exc}", exc_info=True)
+        state["status"] = "failed"
+        state["error"] = str(exc)
+    state["finished_at"] = time.time()
+    _write_state(state)
+
+
+def submit(
+    customer: str,
+    since: date,
+    until: date,
+    branches: Optional[Collection[str]] = None,
+    pattern: Optional[str] = None,
+    prefix: Optional[str] = None,
+    bundle_format: str = "zip",
+) -> Dict[str, Any]:
+    """Queue an export for the export runner and return its initial state."""
+    os.makedirs(Config.EXPORT_DIR, exist_ok=True)
+    _expire_old_jobs()
+
+    state: Dict[str, Any] = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "pid": None,
+        "customer": customer,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "branches": sorted(branches) if branches else None,
+        "pattern": pattern,
+        "prefix": prefix,
+        "format": bundle_format,
+        "archives_total": None,
+        "archives_done": 0,
+        "members": 0,
+        "bytes": 0,
+        "failed": [],
+        "error": None,
+        "size": None,
+        "created_at": time.time(),
+        "finished_at": None,
+    }
+    _write_state(state)
+    return dict(state)
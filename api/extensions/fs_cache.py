@@ -0,0 +1,85 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from utils.lru import LRUCache
+
+_CACHE: Optional[LRUCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> Optional[LRUCache]:
+    """Per-worker cache of bucket mount metadata, or None when disabled."""
+    global _CACHE
+    if _CACHE is not None:
+        return _CACHE
+    if Config.FS_CACHE_TTL <= 0 or Config.FS_CACHE_MAX_ENTRIES <= 0:
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = LRUCache(
+                max_entries=Config.FS_CACHE_MAX_ENTRIES,
+                ttl=Config.FS_CACHE_TTL,
+                sizeof=lambda _value: 0,
+            )
+        return _CACHE
+
+
+def stat(path: str) -> os.stat_result:
+    """
+    ``os.stat`` with a short-lived per-worker cache.
+
+    Errors are not cached; a changed file is seen once its entry expires or
+    ``invalidate`` is called for it.
+    """
+    cache = get_cache()
+    if cache is None:
+        return os.stat(path)
+
+    st = cache.get(("stat", path))
+    if st is None:
+        st = os.stat(path)
+        cache.put(("stat", path), st)
+    return st
+
+
+def listdir(path: str, ttl: Optional[float] = None) -> List[str]:
+    """Sorted entry names of ``path``, cached like ``stat`` or for ``ttl`` seconds."""
+    cache = get_cache()
+    if cache is not None:
+        names = cache.get(("listdir", path))
+        if names is not None:
+            return names
+
+    with os.scandir(path) as entries:
+        names = sorted(entry.name for entry in entries)
+    if cache is not None:
+        cache.put(("listdir", path), names, ttl=ttl)
+    return names
+
+
+def invalidate(path: str) -> None:
+    """Forget ``path`` and the listing of the directory that contains it."""
+    cache = get_cache()
+    if cache is None:
+        return
+    cache.pop(("stat", path))
+    cache.pop(("listdir", path))
+    cache.pop(("listdir", os.path.dirname(path)))
+
+
+def stats() -> Dict[str, Any]:
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+    # Every hit is a metadata round trip the bucket mount did not have to serve
+    return dict(cache.stats(), saved_calls=cache.hits)
+
+
+def reset() -> None:
+    """Drop the cache so the next access rebuilds it from Config."""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = None
@@ -0,0 +1,323 @@
+import ctypes
+import ctypes.util
+import fcntl
+import os
+import re
+import select
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple
+
+from config import Config
+from extensions import archive_index, fs_cache, negative_cache
+from extensions.logging import get_logger
+from utils.archive import ARCHIVE_NAME_REGEX, CUSTOMER_DIR_REGEX
+from utils.throttle import RateLimiter
+from utils.time import utc_now
+
+logger = get_logger(__name__, class_name="ArchiveWatcher")
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+# Held under CACHE_ROOT by the one process that builds indexes for the watchers
+BUILD_LOCK = ".indexer.lock"
+
+_WATCHER: Optional["ArchiveWatcher"] = None
+_WATCHER_PID: Optional[int] = None
+_LOCK = threading.Lock()
+
+
+class _Inotify:
+    """Minimal ctypes binding over inotify(7); only whole-directory watches are needed."""
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        self._wds: Dict[str, int] = {}
+
+    def watch(self, path: str) -> None:
+        if path in self._wds:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._dirs[wd] = path
+        self._wds[path] = wd
+
+    def retain(self, paths: Set[str]) -> None:
+        """Drop watches on directories that are no longer of interest."""
+        for path in list(self._wds):
+            if path not in paths:
+                self._libc.inotify_rm_watch(self.fd, self._wds.pop(path))
+
+    def read(self, timeout: float) -> List[str]:
+        """Return paths of files finished or moved into a watched directory."""
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, _mask, _cookie, name_len = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = data[pos:pos + name_len].rstrip(b"\0")
+            pos += name_len
+            directory = self._dirs.get(wd)
+            if directory and name:
+                paths.append(os.path.join(directory, os.fsdecode(name)))
+        return paths
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class ArchiveWatcher:
+    """
+    Index archives as they land under ``root`` so the first download is warm.
+
+    Only the last ``lookback_days`` date directories of each customer are
+    watched, following the same layout ``TAR_REL_REGEX`` enforces. Polling
+    with ``scandir`` always runs every ``poll_interval`` seconds; inotify,
+    when available, picks up archives written in between. FUSE bucket
+    mounts do not report remote writes through inotify, so polling is what
+    catches those.
+
+    Every worker watches, so each drops its own stale stat and 404 entries
+    as archives land, but only the process holding ``BUILD_LOCK`` inflates
+    them; another worker takes over the lock when that one exits.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        mode: str = "auto",
+        poll_interval: float = 60.0,
+        lookback_days: int = 2,
+        workers: int = 1,
+        max_bytes_per_sec: float = 0,
+        settle_seconds: float = 10.0,
+    ) -> None:
+        self.root = root
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.lookback_days = lookback_days
+        self.settle_seconds = settle_seconds
+        self._limiter = RateLimiter(max_bytes_per_sec) if max_bytes_per_sec > 0 else None
+        self._pool = ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="archive-indexer")
+        self._inotify: Optional[_Inotify] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        self._pending: Set[str] = set()
+        self._build_lock: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+        self.stats = {"scans": 0, "indexed": 0, "failed": 0}
+
+    def start(self) -> None:
+        if self.mode in ("auto", "inotify"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as exc:
+                if self.mode == "inotify":
+                    raise
+                logger.info(f"inotify unavailable ({exc}); falling back to scandir polling")
+
+        self._thread = threading.Thread(target=self._run, name="archive-watcher", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Watching {self.root} ({'inotify + ' if self._inotify else ''}polling every {self.poll_interval}s)"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._pool.shutdown(wait=False)
+        if self._inotify is not None:
+            self._inotify.close()
+        if self._build_lock is not None:
+            self._build_lock.close()
+
+    def _holds_build_lock(self) -> bool:
+        """Take ``BUILD_LOCK`` if no other process holds it; kept until this process exits."""
+        if self._build_lock is None:
+            os.makedirs(Config.CACHE_ROOT, exist_ok=True)
+            lock = open(os.path.join(Config.CACHE_ROOT, BUILD_LOCK), "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return False
+            self._build_lock = lock
+            logger.info(f"Building indexes for new archives in process {os.getpid()}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as exc:
+                logger.warning(f"Archive scan failed: {exc}")
+
+            if self._inotify is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            remaining = self.poll_interval
+            while remaining > 0 and not self._stop.is_set():
+                step = min(remaining, 1.0)
+                for path in self._inotify.read(step):
+                    if re.match(ARCHIVE_NAME_REGEX, os.path.basename(path)):
+                        self._consider(path, settle=False)
+                remaining -= step
+
+    def _recent_dirs(self) -> Iterator[str]:
+        """Yield ``<root>/<customer>/<yy>/<mm>/<dd>`` for the lookback window."""
+        today = utc_now().date()
+        days = [today - timedelta(days=offset) for offset in range(self.lookback_days)]
+
+        with os.scandir(self.root) as entries:
+            customers = [e.name for e in entries if e.is_dir() and re.match(CUSTOMER_DIR_REGEX, e.name)]
+
+        for customer in customers:
+            for day in days:
+                yield os.path.join(self.root, customer, f"{day:%y}", f"{day:%m}", f"{day:%d}")
+
+    def scan(self) -> None:
+        """Poll the recent date directories once and queue anything new."""
+        watched: Set[str] = set()
+        current: Set[str] = set()
+
+        for directory in self._recent_dirs():
+            try:
+                with os.scandir(directory) as entries:
+                    archives = [e.path for e in entries if e.is_file() and re.match(ARCHIVE_NAME_REGEX, e.name)]
+            except FileNotFoundError:
+                continue
+
+            watched.add(directory)
+            if self._inotify is not None:
+                try:
+                    self._inotify.watch(directory)
+                except OSError as exc:
+                    logger.debug(f"Could not watch {directory}: {exc}")
+
+            for path in archives:
+                current.add(path)
+                self._consider(path)
+
+        if self._inotify is not None:
+            self._inotify.retain(watched)
+
+        with self._lock:
+            # Forget archives that fell out of the lookback window
+            for path in list(self._seen):
+                if path not in current:
+                    del self._seen[path]
+        self.stats["scans"] += 1
+
+    def _consider(self, path: str, settle: bool = True) -> None:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return
+
+        key = (st.st_mtime_ns, st.st_size)
+        if self._seen.get(path) != key:
+            # Downloads may have cached a 404 or the old stat for this archive moments ago
+            negative_cache.forget_archive(path)
+            fs_cache.invalidate(path)
+        if settle and time.time() - st.st_mtime < self.settle_seconds:
+            # Possibly still being written; pick it up on the next pass
+            return
+
+        if not self._holds_build_lock():
+            return
+
+        with self._lock:
+            if self._seen.get(path) == key or path in self._pending:
+                return
+            self._pending.add(path)
+
+        self._pool.submit(self._index, path, key)
+
+    def _index(self, path: str, key: Tuple[int, int]) -> None:
+        try:
+            st = os.stat(path)
+            # A download, the bulk CLI or an earlier builder may have indexed it already
+            if (st.st_mtime_ns, st.st_size) == key and archive_index.is_indexed(path, st):
+                with self._lock:
+                    self._seen[path] = key
+                return
+            archive_index.build_index(path, limiter=self._limiter)
+            with self._lock:
+                self._seen[path] = key
+                self.stats["indexed"] += 1
+        except Exception as exc:
+            with self._lock:
+                self.stats["failed"] += 1
+            logger.warning(f"Indexing {path} failed: {exc}")
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+
+def ensure_started() -> Optional[ArchiveWatcher]:
+    """
+    Start the watcher for this process if it is not running yet.
+
+    Gunicorn may fork workers after the app is imported (``--preload``), and
+    threads do not survive a fork, so the owning pid is checked every time.
+    """
+    global _WATCHER, _WATCHER_PID
+    if not Config.INDEXER_ENABLED:
+        return None
+
+    pid = os.getpid()
+    if _WATCHER is not None and _WATCHER_PID == pid:
+        return _WATCHER
+
+    with _LOCK:
+        if _WATCHER is None or _WATCHER_PID != pid:
+            watcher = ArchiveWatcher(
+                Config.FILES_ROOT,
+                mode=Config.INDEXER_MODE,
+                poll_interval=Config.INDEXER_POLL_INTERVAL,
+                lookback_days=Config.INDEXER_LOOKBACK_DAYS,
+                workers=Config.INDEXER_WORKERS,
+                max_bytes_per_sec=Config.INDEXER_MAX_BYTES_PER_SEC,
+                settle_seconds=Config.INDEXER_SETTLE_SECONDS,
+            )
+            watcher.start()
+            _WATCHER, _WATCHER_PID = watcher, pid
+    return _WATCHER
+
+
+def init_app(app) -> None:
+    """Start the watcher lazily from the first request each worker serves."""
+    if not Config.INDEXER_ENABLED:
+        return
+
+    @app.before_request
+    def _start_archive_watcher():
+        ensure_started()
@@ -0,0 +1,195 @@
+import mimetypes
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+from extensions.logging import get_logger
+from utils.encoding import is_compressible
+from utils.lru import LRUCache
+
+logger = get_logger(__name__, class_name="MemberCache")
+
+# Never let one worker's member cache take more than this share of the container limit
+MEMORY_LIMIT_SHARE = 0.25
+
+_CACHE: Optional[LRUCache] = None
+_CACHE_LOCK = threading.Lock()
+
+MemberKey = Tuple[str, int, int, str]
+
+# zlib wbits value for the gzip copies served to gzip-accepting clients
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Cached values are (encoding, data, raw size); encoding is "identity", "zlib" or
+# "gzip", and only ``data`` counts against the budget
+CachedValue = Tuple[str, bytes, int]
+
+_CODEC_STATS = {
+    "compressions": 0,
+    "compressed": 0,
+    "compress_seconds": 0.0,
+    "decompressed": 0,
+    "decompress_seconds": 0.0,
+}
+_CODEC_LOCK = threading.Lock()
+
+
+def _container_memory_limit() -> Optional[int]:
+    """Memory limit of the current cgroup (v2 or v1), if any."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path, "r", encoding="ascii") as fh:
+                raw = fh.read().strip()
+        except OSError:
+            continue
+        if raw.isdigit() and int(raw) < 1 << 60:
+            return int(raw)
+    return None
+
+
+def _budget() -> int:
+    budget = Config.MEMBER_CACHE_MAX_BYTES
+    limit = _container_memory_limit()
+    if limit:
+        workers = max(int(os.getenv("GUNICORN_WORKERS", "1") or 1), 1)
+        ceiling = int(limit * MEMORY_LIMIT_SHARE / workers)
+        if budget > ceiling:
+            logger.warning(f"MEMBER_CACHE_MAX_BYTES={budget} exceeds {ceiling} for this container; clamping")
+            budget = ceiling
+    return budget
+
+
+def get_cache() -> Optional[LRUCache]:
+    """Per-worker member cache singleton, or None when disabled."""
+    global _CACHE
+    if _CACHE is not None:
+        return _CACHE
+    if Config.MEMBER_CACHE_MAX_BYTES <= 0:
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = LRUCache(max_bytes=_budget(), sizeof=lambda value: len(value[1]))
+            logger.info(f"Member cache initialised with a {_CACHE.max_bytes} byte budget")
+        return _CACHE
+
+
+def member_key(path: str, st: os.stat_result, name: str) -> MemberKey:
+    """Identity of one member of one archive version."""
+    return (path, st.st_mtime_ns, st.st_size, name)
+
+
+def _count(**amounts) -> None:
+    with _CODEC_LOCK:
+        for name, amount in amounts.items():
+            _CODEC_STATS[name] += amount
+
+
+def _encode(name: str, data: bytes) -> CachedValue:
+    """Compress text members when enabled; binary ones (PDFs, images) rarely shrink."""
+    if Config.MEMBER_CACHE_COMPRESSION != "zlib" or not is_compressible(mimetypes.guess_type(name)[0]):
+        return "identity", data, len(data)
+
+    started = time.perf_counter()
+    packed = zlib.compress(data, Config.MEMBER_CACHE_COMPRESSION_LEVEL)
+    elapsed = time.perf_counter() - started
+    if len(packed) >= len(data):
+        _count(compressions=1, compress_seconds=elapsed)
+        return "identity", data, len(data)
+    _count(compressions=1, compressed=1, compress_seconds=elapsed)
+    return "zlib", packed, len(data)
+
+
+def _decode(value: CachedValue) -> bytes:
+    encoding, data, _raw_size = value
+    if encoding == "identity":
+        return data
+
+    started = time.perf_counter()
+    data = zlib.decompress(data, GZIP_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+    _count(decompressed=1, decompress_seconds=time.perf_counter() - started)
+    return data
+
+
+def get(path: str, st: os.stat_result, name: str) -> Optional[bytes]:
+    cache = get_cache()
+    if cache is None:
+        return None
+    value = cache.get(member_key(path, st, name))
+    return _decode(value) if value is not None else None
+
+
+def put(path: str, st: os.stat_result, name: str, data: bytes) -> None:
+    cache = get_cache()
+    if cache is None or len(data) > Config.MEMBER_CACHE_MAX_ITEM_BYTES:
+        return
+    cache.put(member_key(path, st, name), _encode(name, data))
+
+
+def get_gzip(path: str, st: os.stat_result, name: str) -> Optional[bytes]:
+    """The gzip-encoded copy of a member, if that is the form it is cached in."""
+    cache = get_cache()
+    if cache is None:
+        return None
+    value = cache.get(member_key(path, st, name))
+    return value[1] if value is not None and value[0] == "gzip" else None
+
+
+def put_gzip(path: str, st: os.stat_result, name: str, data: bytes, raw_size: int) -> None:
+    """
+    Cache a member as its gzip copy, replacing any raw or zlib entry.
+
+    Identity hits then inflate the copy, so the member is held only once.
+    """
+    cache = get_cache()
+    if cache is None or len(data) > Config.MEMBER_CACHE_MAX_ITEM_BYTES:
+        return
+    cache.put(member_key(path, st, name), ("gzip", data, raw_size))
+
+
+def stats() -> Dict[str, Any]:
+    """
+    LRU counters plus the compression tier's effect.
+
+    ``effective_max_bytes`` is the budget scaled by the raw-to-stored ratio
+    of the entries cached right now, i.e. how many raw bytes the cache can
+    hold with its current mix of members.
+    """
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+
+    result = cache.stats()
+    with _CODEC_LOCK:
+        codec = dict(_CODEC_STATS)
+    values = cache.values()
+    raw_bytes = sum(value[2] for value in values)
+    stored_bytes = sum(len(value[1]) for value in values)
+    ratio = raw_bytes / stored_bytes if stored_bytes else 1.0
+    result["compression"] = {
+        "codec": Config.MEMBER_CACHE_COMPRESSION,
+        "ratio": round(ratio, 2),
+        "effective_max_bytes": int(cache.max_bytes * ratio),
+        "compressed": codec["compressed"],
+        "compress_ms_avg": (
+            round(codec["compress_seconds"] * 1000 / codec["compressions"], 3) if codec["compressions"] else 0.0
+        ),
+        "decompressed": codec["decompressed"],
+        "decompress_ms_per_hit": (
+            round(codec["decompress_seconds"] * 1000 / codec["decompressed"], 3) if codec["decompressed"] else 0.0
+        ),
+    }
+    return result
+
+
+def reset() -> None:
+    """Drop the cache so the next access rebuilds it from Config."""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = None
+    with _CODEC_LOCK:
+        for name in _CODEC_STATS:
+            _CODEC_STATS[name] = 0
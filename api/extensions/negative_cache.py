@@ -0,0 +1,83 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from config import Config
+from utils.lru import LRUCache
+
+_CACHE: Optional[LRUCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> Optional[LRUCache]:
+    """Per-worker cache of lookups known to 404, or None when disabled."""
+    global _CACHE
+    if _CACHE is not None:
+        return _CACHE
+    if Config.NEGATIVE_CACHE_MAX_ENTRIES <= 0:
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            # Values are flags; only the entry count bounds the cache
+            _CACHE = LRUCache(max_entries=Config.NEGATIVE_CACHE_MAX_ENTRIES, sizeof=lambda _value: 0)
+        return _CACHE
+
+
+def archive_missing(path: str) -> bool:
+    """
+    Whether ``path`` recently failed to stat.
+
+    There is no archive version to key on, so these entries rely on a short
+    TTL, plus ``forget_archive`` when the watcher sees the archive land.
+    The watcher is off by default (``INDEXER_ENABLED``), so usually only
+    the TTL applies: an archive uploaded right after a 404 keeps returning
+    404 from this worker for up to ``NEGATIVE_CACHE_ARCHIVE_TTL`` seconds.
+    """
+    cache = get_cache()
+    return cache is not None and Config.NEGATIVE_CACHE_ARCHIVE_TTL > 0 and cache.get(("archive", path)) is not None
+
+
+def add_archive(path: str) -> None:
+    cache = get_cache()
+    if cache is None or Config.NEGATIVE_CACHE_ARCHIVE_TTL <= 0:
+        return
+    cache.put(("archive", path), True, ttl=Config.NEGATIVE_CACHE_ARCHIVE_TTL)
+
+
+def forget_archive(path: str) -> None:
+    cache = get_cache()
+    if cache is not None:
+        cache.pop(("archive", path))
+
+
+def member_missing(path: str, st: os.stat_result, name: str) -> bool:
+    """
+    Whether ``name`` is known to be absent from this version of the archive.
+
+    The key carries the archive's mtime and size, so a rewritten archive
+    never matches an old entry.
+    """
+    cache = get_cache()
+    if cache is None or Config.NEGATIVE_CACHE_TTL <= 0:
+        return False
+    return cache.get(("member", path, st.st_mtime_ns, st.st_size, name)) is not None
+
+
+def add_member(path: str, st: os.stat_result, name: str) -> None:
+    cache = get_cache()
+    if cache is None or Config.NEGATIVE_CACHE_TTL <= 0:
+        return
+    cache.put(("member", path, st.st_mtime_ns, st.st_size, name), True, ttl=Config.NEGATIVE_CACHE_TTL)
+
+
+def stats() -> Dict[str, Any]:
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+def reset() -> None:
+    """Drop the cache so the next access rebuilds it from Config."""
+    global _CACHE
+    with _CACHE_LOCK:
+        _CACHE = None
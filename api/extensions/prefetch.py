@@ -0,0 +1,60 @@
+import os
+import threading
+from typing import IO, Any, Dict
+
+from config import Config
+from extensions import disk_cache
+from extensions.logging import get_logger
+from utils.archive import MemberEntry
+
+logger = get_logger(__name__, class_name="MemberPrefetch")
+
+_STATS = {"archives": 0, "members": 0, "bytes": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def enabled() -> bool:
+    # Only the disk cache is filled, so there is nothing to prefetch into without it
+    return Config.PREFETCH_ENABLED and Config.PREFETCH_MAX_BYTES > 0 and disk_cache.enabled()
+
+
+class MemberFiller:
+    """
+    ``scan_archive`` callback that caches every member the pass goes by.
+
+    Members above ``PREFETCH_MAX_MEMBER_BYTES`` are skipped, and filling
+    stops once ``PREFETCH_MAX_BYTES`` have been cached for the archive.
+    Members go to the disk cache only: the per-worker member LRU is left to
+    what clients actually request, which a prefetched archive would evict.
+    """
+
+    def __init__(self, path: str, st: os.stat_result) -> None:
+        self.path = path
+        self.st = st
+        self.members = 0
+        self.filled = 0
+
+    def __call__(self, entry: MemberEntry, fileobj: IO[bytes]) -> None:
+        if entry.size > Config.PREFETCH_MAX_MEMBER_BYTES or self.filled + entry.size > Config.PREFETCH_MAX_BYTES:
+            return
+        if not disk_cache.accepts(entry.size):
+            return
+
+        data = fileobj.read()
+        disk_cache.put(self.path, self.st, entry.name, data)
+        self.members += 1
+        self.filled += len(data)
+
+    def report(self) -> None:
+        with _STATS_LOCK:
+            _STATS["archives"] += 1
+            _STATS["members"] += self.members
+            _STATS["bytes"] += self.filled
+        logger.info(f"Prefetched {self.members} member(s) ({self.filled} bytes) of {self.path}")
+
+
+def stats() -> Dict[str, Any]:
+    if not enabled():
+        return {"enabled": False}
+    with _STATS_LOCK:
+        return dict(_STATS)
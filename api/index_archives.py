@@ -0,0 +1,202 @@
+"""
+Offline bulk indexer for the whole bucket tree.
+
+Walks FILES_ROOT (optionally filtered by customer, date range and branch)
+and writes a member index sidecar for every archive using a process pool.
+Progress is appended to a state file so an interrupted run can be resumed.
+
+Usage (from the repo root):
+    python api/index_archives.py --customer stg-modula-12345 --since 2023-11-01 --until 2023-11-30
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from extensions import archive_index
+from extensions.logging import get_logger
+from utils.archive import ArchiveRef, iter_archives
+
+logger = get_logger(__name__, class_name="BulkIndexer")
+
+# Seconds between throughput reports
+REPORT_INTERVAL = 10.0
+
+
+def _parse_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got '{value}'") from exc
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build member indexes for archives under FILES_ROOT.")
+    parser.add_argument("--root", default=Config.FILES_ROOT, help="Bucket mount to walk (default: FILES_ROOT)")
+    parser.add_argument("--customer", action="append", help="Only this customer id; repeatable")
+    parser.add_argument("--since", type=_parse_date, help="First archive date to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=_parse_date, help="Last archive date to include (YYYY-MM-DD)")
+    parser.add_argument("--branch", action="append", help="Only this three-digit branch; repeatable")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Indexing processes")
+    parser.add_argument(
+        "--state",
+        default=os.path.join(Config.CACHE_ROOT, "bulk-index-state.jsonl"),
+        help="Progress file used to resume interrupted runs",
+    )
+    parser.add_argument("--force", action="store_true", help="Re-index archives that already have a current index")
+    return parser.parse_args(argv)
+
+
+def _load_state(path: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Archives already indexed by a previous run, as rel_path -> (size, mtime_ns).
+
+    Records from older state files without a size and mtime are ignored, so
+    those archives are checked again.
+    """
+    done: Dict[str, Tuple[int, int]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A partially written last line from an interrupted run
+                    continue
+                if record.get("status") in ("indexed", "current") and "mtime_ns" in record:
+                    done[record["path"]] = (record["size"], record["mtime_ns"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def _index_one(ref: ArchiveRef, force: bool) -> Dict:
+    """Runs in a worker process."""
+    started = time.perf_counter()
+    try:
+        st = os.stat(ref.abs_path)
+        if not force and archive_index.is_indexed(ref.abs_path, st):
+            return {
+                "path": ref.rel_path,
+                "status": "current",
+                "bytes": 0,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+            }
+
+        members = archive_index.write_sidecar(ref.abs_path)
+        return {
+            "path": ref.rel_path,
+            "status": "indexed",
+            "bytes": st.st_size,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "members": members,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    except Exception as exc:
+        return {"path": ref.rel_path, "status": "failed", "bytes": 0, "error": str(exc)}
+
+
+class _Progress:
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.last_report = self.started
+        self.counts = {"indexed": 0, "current": 0, "failed": 0, "resumed": 0}
+        self.bytes = 0
+
+    def add(self, result: Dict) -> None:
+        self.counts[result["status"]] += 1
+        self.bytes += result["bytes"]
+
+    def report(self, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not final and now - self.last_report < REPORT_INTERVAL:
+            return
+        self.last_report = now
+        elapsed = max(now - self.started, 1e-9)
+        logger.info(
+            f"[BULK-INDEX]{'[DONE]' if final else ''} "
+            f"indexed={self.counts['indexed']} current={self.counts['current']} "
+            f"resumed={self.counts['resumed']} failed={self.counts['failed']} "
+            f"{self.counts['indexed'] / elapsed:.2f} archives/s "
+            f"{self.bytes / elapsed / (1024 * 1024):.2f} MB/s"
+        )
+
+
+def _unchanged(ref: ArchiveRef, recorded: Optional[Tuple[int, int]]) -> bool:
+    """Whether the archive is still the one a previous run indexed."""
+    if recorded is None:
+        return False
+    try:
+        st = os.stat(ref.abs_path)
+    except OSError:
+        return False
+    return (st.st_size, st.st_mtime_ns) == recorded
+
+
+def run(args: argparse.Namespace) -> _Progress:
+    done = {} if args.force else _load_state(args.state)
+    progress = _Progress()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.state)), exist_ok=True)
+    refs = iter_archives(
+        args.root,
+        customers=args.customer,
+        since=args.since,
+        until=args.until,
+        branches=args.branch,
+    )
+    max_in_flight = max(args.workers, 1) * 4
+
+    with open(args.state, "a", encoding="utf-8") as state, \
+            ProcessPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        in_flight = set()
+
+        def drain() -> None:
+            nonlocal in_flight
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                progress.add(result)
+                state.write(json.dumps(result) + "\n")
+                if result["status"] == "failed":
+                    logger.warning(f"[BULK-INDEX] {result['path']}: {result['error']}")
+            state.flush()
+            progress.report()
+
+        for ref in refs:
+            # A rewritten archive (same path, new size or mtime) is indexed again
+            if _unchanged(ref, done.get(ref.rel_path)):
+                progress.counts["resumed"] += 1
+                continue
+            in_flight.add(pool.submit(_index_one, ref, args.force))
+            if len(in_flight) >= max_in_flight:
+                drain()
+
+        while in_flight:
+            drain()
+
+    progress.report(final=True)
+    return progress
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    # Sidecar paths mirror the archive path relative to FILES_ROOT
+    Config.FILES_ROOT = args.root
+    if not Config.INDEX_DIR:
+        logger.error("INDEX_DIR is empty; nothing to write indexes to")
+        return 2
+
+    progress = run(args)
+    return 1 if progress.counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
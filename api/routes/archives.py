@@ -0,0 +1,42 @@
+import os
+
+from flask_smorest import Blueprint, abort
+
+from routes.schemas.archives import ArchiveListRequestSchema
+from config import Config
+from extensions import archive_tree
+
+blp = Blueprint(
+    "Archives",
+    __name__,
+    url_prefix="/archives",
+    description="Discover archives available for download",
+)
+
+
+@blp.route("", methods=["GET"], strict_slashes=False)
+@blp.arguments(ArchiveListRequestSchema, location="query", as_kwargs=True)
+def list_archives(**query_kwargs):
+    """List a customer's archives between two dates, optionally for some branches only."""
+    customer = query_kwargs.get("customer")
+    since = query_kwargs.get("since")
+    until = query_kwargs.get("until")
+    branches = query_kwargs.get("branches")
+
+    if since > until:
+        abort(400, message="'since' must not be after 'until'")
+    if (until - since).days >= Config.ARCHIVE_LIST_MAX_DAYS:
+        abort(400, message=f"Date range must not exceed {Config.ARCHIVE_LIST_MAX_DAYS} days")
+
+    archives = []
+    for ref in archive_tree.list_archives(customer, since, until, branches):
+        # <branch>_<HH-MM>.tar.gz
+        hh_mm = os.path.basename(ref.rel_path)[4:9]
+        archives.append({
+            "tar_path": ref.rel_path,
+            "date": ref.day.isoformat(),
+            "branch": ref.branch,
+            "time": hh_mm.replace("-", ":"),
+        })
+
+    return {"customer": customer, "archives": archives}
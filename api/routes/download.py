@@ -1,14 +1,50 @@
 import os
 import re
 import io
+import itertools
 import tarfile
-from typing import Optional
+import zlib
+import mimetypes
+from contextlib import ExitStack
+from email.utils import formatdate
+from typing import IO, Any, Collection, Dict, Iterator, Optional, Tuple, Union
+from urllib.parse import quote
 
-from flask import send_file
+from flask import Response, request, send_file
 from flask_smorest import Blueprint, abort
+from pymongo import errors as mongo_errors
 
-from routes.schemas.download import DownloadRequestSchema
+from routes.schemas.download import (
+    DocumentLookupRequestSchema,
+    DownloadBatchRequestSchema,
+    DownloadByNameRequestSchema,
+    DownloadMembersRequestSchema,
+    DownloadRequestSchema,
+)
 from config import Config
+from extensions import archive_cache, archive_index, catalog, disk_cache, fs_cache, member_cache, negative_cache
+from extensions.archive_index import ArchiveIndex
+from utils.archive import (
+    TAR_REL_REGEX,
+    MemberEntry,
+    find_member,
+    find_members,
+    iter_member_chunks,
+    open_archive_stream,
+    select_members,
+)
+from utils.bundle import BUNDLE_MIMETYPES, BundleMember, iter_bundle
+from utils.conditional import (
+    etag_matches,
+    if_range_matches,
+    is_not_modified,
+    member_etag,
+    parse_range_header,
+    resolve_range,
+)
+from utils.encoding import accepts_gzip, gzip_bytes, is_compressible
+from utils.gzindex import GzipIndex
+from utils.singleflight import FlightTimeout, MicroBatcher, SingleFlight
 
 blp = Blueprint(
     "Download",
@@ -17,19 +53,506 @@ blp = Blueprint(
     description="Download electronic document files",
 )
 
+# Identical downloads in flight at the same time share one extraction
+_FLIGHTS = SingleFlight()
 
-@blp.route("", methods=["GET"], strict_slashes=False)
-@blp.arguments(DownloadRequestSchema, location="query", as_kwargs=True)
-def download_file(**query_kwargs):
-    # Extract parameters
-    filename: Optional[str] = query_kwargs.get("filename")
-    tar_path: Optional[str] = query_kwargs.get("tar_path")
+# Downloads of different members of one archive arriving together share one pass over it
+_BATCHES = MicroBatcher(Config.DOWNLOAD_BATCH_WINDOW)
 
-    # Define the regex pattern to extract relative tar path
-    tar_rel_regex = r"((?:stg|prd)-modula-\d{5}/\d{2}/\d{2}/\d{2}/\d{3}_\d{2}-\d{2}\.tar\.gz)$"
-    
+# Batch result for a member its own request should extract, e.g. one too large to buffer
+_UNBATCHED = object()
+
+
+def _content_disposition(filename: str) -> str:
+    """Build an attachment Content-Disposition header for ``filename``."""
+    try:
+        filename.encode("ascii")
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(filename)}"
+    escaped = filename.replace("\\", "\\\\").replace('"', '\\"')
+    return f'attachment; filename="{escaped}"'
+
+
+def _stream_response(
+    fileobj: IO[bytes],
+    size: int,
+    filename: str,
+    closer: ExitStack,
+    sink: Optional[disk_cache.CacheWriter] = None,
+) -> Response:
+    """Stream a tar member to the client in bounded chunks."""
+    response = Response(
+        response=iter_member_chunks(fileobj, Config.DOWNLOAD_CHUNK_SIZE, closer, sink),
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        direct_passthrough=True,
+    )
+    response.headers["Content-Length"] = str(size)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Disposition"] = _content_disposition(filename)
+    return response
+
+
+def _partial_response(chunks: Iterator[bytes], start: int, stop: int, size: int, filename: str) -> Response:
+    """206 response carrying bytes ``start`` to ``stop`` of a member of ``size`` bytes."""
+    response = Response(
+        response=chunks,
+        status=206,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        direct_passthrough=True,
+    )
+    response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    response.headers["Content-Length"] = str(stop - start)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Disposition"] = _content_disposition(filename)
+    return response
+
+
+def _range_not_satisfiable(size: int) -> Response:
+    response = Response(status=416)
+    response.headers["Content-Range"] = f"bytes */{size}"
+    return response
+
+
+def _gzip_response(data: bytes, filename: str) -> Response:
+    """Send the cached gzip copy of a text member as is."""
+    response = Response(
+        response=[data],
+        status=200,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        direct_passthrough=True,
+    )
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Content-Length"] = str(len(data))
+    response.headers["Content-Disposition"] = _content_disposition(filename)
+    return response
+
+
+def _member_not_found(tar_abs_path: str, st: os.stat_result, filename: str) -> None:
+    """Remember the miss for this archive version, then 404."""
+    negative_cache.add_member(tar_abs_path, st, filename)
+    abort(404, message="Could not find the requested file")
+
+
+def _find_index(
+    tar_abs_path: str,
+    st: os.stat_result,
+    located: Optional[ArchiveIndex] = None,
+) -> Optional[ArchiveIndex]:
+    """
+    The archive's index, scheduling a build when there is none yet.
+
+    ``located`` stands in for a missing index: catalog offsets for one
+    member, which spare walking the tar headers up to it.
+    """
+    index = archive_index.get_index(tar_abs_path, st)
+    if index is None:
+        archive_index.schedule_build(tar_abs_path)
+        if located is not None and located.is_current(st):
+            index = located
+    return index
+
+
+def _catalog_index(tar_abs_path: str, document: Dict[str, Any]) -> ArchiveIndex:
+    """Single-member index over the archive version the catalog document was recorded from."""
+    entry = MemberEntry(
+        document["name"], document["size"], document["mtime"], document["offset"], document["offset_data"]
+    )
+    return ArchiveIndex(
+        tar_abs_path,
+        document["archive_mtime_ns"],
+        document["archive_size"],
+        GzipIndex.from_start(),
+        {entry.name: entry},
+    )
+
+
+def _open_indexed_member(
+    index: ArchiveIndex,
+    st: os.stat_result,
+    filename: str,
+    stack: ExitStack,
+) -> Tuple[IO[bytes], int]:
+    """Seek to the member through the archive's gzip checkpoints."""
+    entry = index.get(filename)
+    if entry is None:
+        _member_not_found(index.path, st, filename)
+
+    source = archive_cache.open_archive(index.path, st)
+    reader = stack.enter_context(index.open_member(entry, source))
+    return reader, entry.size
+
+
+def _open_streamed_member(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    stack: ExitStack,
+) -> Tuple[IO[bytes], int]:
+    """Walk the tar stream until the requested member shows up."""
+    source = stack.enter_context(archive_cache.open_archive(tar_abs_path, st))
+    tar = stack.enter_context(open_archive_stream(tar_abs_path, source))
+    member = find_member(tar, filename)
+    if member is None:
+        _member_not_found(tar_abs_path, st, filename)
+
+    extracted_file = tar.extractfile(member)
+    if extracted_file is None:
+        _member_not_found(tar_abs_path, st, filename)
+
+    return extracted_file, member.size
+
+
+def _member_entry(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    located: Optional[ArchiveIndex] = None,
+) -> MemberEntry:
+    """Look up a member's size and mtime without reading its data."""
+    index = _find_index(tar_abs_path, st, located)
+    if index is not None:
+        entry = index.get(filename)
+    else:
+        with ExitStack() as stack:
+            source = stack.enter_context(archive_cache.open_archive(tar_abs_path, st))
+            tar = stack.enter_context(open_archive_stream(tar_abs_path, source))
+            member = find_member(tar, filename)
+            entry = None
+            if member is not None and member.isfile():
+                entry = MemberEntry(filename, member.size, int(member.mtime), member.offset, member.offset_data)
+
+    if entry is None:
+        _member_not_found(tar_abs_path, st, filename)
+    return entry
+
+
+def _confirm_member(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    located: Optional[ArchiveIndex] = None,
+) -> None:
+    """404 unless the member exists; a disk cache entry or the index answers without inflating."""
+    if disk_cache.locate(tar_abs_path, st, filename) is None:
+        _member_entry(tar_abs_path, st, filename, located)
+
+
+def _head_response(entry: MemberEntry, filename: str) -> Response:
+    """Headers a GET for the member would carry, without the body."""
+    response = Response(
+        status=200,
+        mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+    )
+    response.headers["Content-Length"] = str(entry.size)
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["Content-Disposition"] = _content_disposition(filename)
+    return response
+
+
+def _set_cache_headers(response, etag: str, last_modified: int, proxy_cache: bool = True, vary: bool = False):
+    """Validators and caching directives for a member of an archive version."""
+    if response.status_code >= 400:
+        return response
+
+    response.headers["ETag"] = f'"{etag}"'
+    if vary:
+        # The member may also be sent gzip-encoded
+        response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    # Private: members are per tenant and only nginx's proxy_cache keys on the credentials
+    if Config.DOWNLOAD_CACHE_MAX_AGE > 0:
+        response.headers["Cache-Control"] = f"private, max-age={Config.DOWNLOAD_CACHE_MAX_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+    # Read and stripped by nginx; it takes precedence over Cache-Control there
+    response.headers["X-Accel-Expires"] = str(Config.DOWNLOAD_PROXY_CACHE_TTL if proxy_cache else 0)
+    return response
+
+
+def _read_members(tar_abs_path: str, st: os.stat_result, filenames: Collection[str]) -> Dict[str, object]:
+    """Read every requested member in one sequential pass, caching each one."""
+    if len(filenames) < 2:
+        # Nothing to share; the regular path also handles streaming
+        return {name: _UNBATCHED for name in filenames}
+
+    results: Dict[str, object] = {}
+    with ExitStack() as stack:
+        source = stack.enter_context(archive_cache.open_archive(tar_abs_path, st))
+        tar = stack.enter_context(open_archive_stream(tar_abs_path, source))
+        for name, member in find_members(tar, filenames):
+            if member.size > Config.DOWNLOAD_BUFFER_MAX_BYTES:
+                results[name] = _UNBATCHED
+                continue
+            extracted_file = tar.extractfile(member)
+            if extracted_file is None:
+                continue
+            data = extracted_file.read()
+            disk_cache.put(tar_abs_path, st, name, data)
+            member_cache.put(tar_abs_path, st, name, data)
+            results[name] = data
+    return results
+
+
+def _load_batched(tar_abs_path: str, st: os.stat_result, filename: str) -> Optional[bytes]:
+    """
+    Extract ``filename`` as part of a batch for its archive.
+
+    Returns None when the caller should extract the member itself.
+    """
+    if _BATCHES.window <= 0:
+        return None
+
+    result = _BATCHES.submit(
+        (tar_abs_path, st.st_mtime_ns, st.st_size),
+        filename,
+        lambda filenames: _read_members(tar_abs_path, st, filenames),
+        timeout=Config.DOWNLOAD_COALESCE_TIMEOUT if Config.DOWNLOAD_COALESCE_TIMEOUT > 0 else None,
+    )
+    if result is None:
+        _member_not_found(tar_abs_path, st, filename)
+    if result is _UNBATCHED:
+        return None
+    return result
+
+
+def _load_member(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    located: Optional[ArchiveIndex] = None,
+) -> Union[bytes, Response]:
+    """
+    Extract one member from the fastest available source.
+
+    Small members come back as bytes (and are cached); large ones come back
+    as a streaming response that owns the open archive.
+    """
+    with ExitStack() as stack:
+        sink = None
+        disk_entry = disk_cache.open_entry(tar_abs_path, st, filename)
+        if disk_entry is not None:
+            extracted_file = stack.enter_context(disk_entry[0])
+            size = disk_entry[1]
+        else:
+            index = _find_index(tar_abs_path, st, located)
+            if index is not None:
+                extracted_file, size = _open_indexed_member(index, st, filename, stack)
+            else:
+                batched = _load_batched(tar_abs_path, st, filename)
+                if batched is not None:
+                    return batched
+                extracted_file, size = _open_streamed_member(tar_abs_path, st, filename, stack)
+            sink = disk_cache.writer(tar_abs_path, st, filename, size)
+            if sink is not None:
+                # No-op once committed; drops the temp file on any failure
+                stack.callback(sink.discard)
+
+        # Large members are streamed; the generator takes over closing the archive
+        if size > Config.DOWNLOAD_BUFFER_MAX_BYTES:
+            return _stream_response(extracted_file, size, filename, stack.pop_all(), sink)
+
+        file_bytes = extracted_file.read()
+        if sink is not None:
+            sink.write(file_bytes)
+            sink.commit()
+
+    member_cache.put(tar_abs_path, st, filename, file_bytes)
+    return file_bytes
+
+
+def _gzip_cache_headers(response: Response, etag: str, last_modified: int) -> Response:
+    """
+    Cache headers for a gzip representation.
+
+    Its tag is the weak form of the member's, as nginx does when it
+    compresses: revalidation still matches, ``If-Range`` never does.
+    """
+    _set_cache_headers(response, etag, last_modified, vary=True)
+    response.headers["ETag"] = f'W/"{etag}"'
+    return response
+
+
+def _fill_disk_cache(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    located: Optional[ArchiveIndex] = None,
+) -> None:
+    """Extract one member into the disk cache without sending it anywhere."""
+    file_bytes = member_cache.get(tar_abs_path, st, filename)
+    if file_bytes is not None:
+        disk_cache.put(tar_abs_path, st, filename, file_bytes)
+        return
+
+    with ExitStack() as stack:
+        index = _find_index(tar_abs_path, st, located)
+        if index is not None:
+            extracted_file, size = _open_indexed_member(index, st, filename, stack)
+        else:
+            extracted_file, size = _open_streamed_member(tar_abs_path, st, filename, stack)
+
+        sink = disk_cache.writer(tar_abs_path, st, filename, size)
+        if sink is None:
+            return
+        stack.callback(sink.discard)
+        for chunk in iter_member_chunks(extracted_file, Config.DOWNLOAD_CHUNK_SIZE):
+            sink.write(chunk)
+        sink.commit()
+
+
+def _disk_cacheable(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    located: Optional[ArchiveIndex] = None,
+) -> bool:
+    """
+    Whether the disk cache would take the member, so it is not inflated only to be refused.
+
+    Without an index the size is unknown until the tar walk in
+    ``_fill_disk_cache`` reaches the member's header, which it checks
+    before inflating the member's data.
+    """
+    if not disk_cache.enabled():
+        return False
+    index = _find_index(tar_abs_path, st, located)
+    if index is None:
+        return True
+    entry = index.get(filename)
+    if entry is None:
+        _member_not_found(tar_abs_path, st, filename)
+    return disk_cache.accepts(entry.size)
+
+
+def _accel_response(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    located: Optional[ArchiveIndex] = None,
+) -> Optional[Response]:
+    """
+    Point nginx at the member's disk cache entry, extracting it there first if needed.
+
+    Returns None when the member cannot be cached on disk, e.g. because it is
+    above ``DISK_CACHE_MAX_ITEM_BYTES``; the caller then sends it itself.
+    """
+    rel_path = disk_cache.locate(tar_abs_path, st, filename)
+    if rel_path is None:
+        if not _disk_cacheable(tar_abs_path, st, filename, located):
+            return None
+        if Config.DOWNLOAD_COALESCE_TIMEOUT > 0:
+            _FLIGHTS.do(
+                ("accel",) + member_cache.member_key(tar_abs_path, st, filename),
+                lambda: _fill_disk_cache(tar_abs_path, st, filename, located),
+                timeout=Config.DOWNLOAD_COALESCE_TIMEOUT,
+            )
+        else:
+            _fill_disk_cache(tar_abs_path, st, filename, located)
+        rel_path = disk_cache.locate(tar_abs_path, st, filename)
+        if rel_path is None:
+            return None
+
+    # nginx sets Content-Length from the file and keeps Content-Type and Content-Disposition
+    response = Response(status=200, mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+    response.headers["X-Accel-Redirect"] = quote(Config.ACCEL_REDIRECT_PREFIX + rel_path)
+    response.headers["Content-Disposition"] = _content_disposition(filename)
+    return response
+
+
+def _load_member_coalesced(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    located: Optional[ArchiveIndex] = None,
+) -> Union[bytes, Response]:
+    """
+    ``_load_member``, shared between identical requests that overlap in time.
+
+    Waiters reuse the leader's bytes or error. A streaming response belongs
+    to one client only, so for large members each waiter opens its own.
+    """
+    if Config.DOWNLOAD_COALESCE_TIMEOUT <= 0:
+        return _load_member(tar_abs_path, st, filename, located)
+
+    result, shared = _FLIGHTS.do(
+        member_cache.member_key(tar_abs_path, st, filename),
+        lambda: _load_member(tar_abs_path, st, filename, located),
+        timeout=Config.DOWNLOAD_COALESCE_TIMEOUT,
+    )
+    if shared and isinstance(result, Response):
+        return _load_member(tar_abs_path, st, filename, located)
+    return result
+
+
+def _skip(fileobj: IO[bytes], length: int) -> None:
+    while length > 0:
+        chunk = fileobj.read(min(length, Config.DOWNLOAD_CHUNK_SIZE))
+        if not chunk:
+            raise EOFError("Member ended before the requested range")
+        length -= len(chunk)
+
+
+def _serve_range(
+    tar_abs_path: str,
+    st: os.stat_result,
+    filename: str,
+    spec: Tuple[Optional[int], Optional[int]],
+    located: Optional[ArchiveIndex] = None,
+) -> Response:
+    """
+    Answer one byte range from the cheapest source holding the member.
+
+    Cached bytes are sliced and disk cache entries seeked. Indexed archives
+    inflate from the checkpoint nearest the range start instead of the
+    member start. Otherwise the member is read up to the range while the
+    index is built for later slices.
+    """
+    file_bytes = member_cache.get(tar_abs_path, st, filename)
+    if file_bytes is not None:
+        byte_range = resolve_range(spec, len(file_bytes))
+        if byte_range is None:
+            return _range_not_satisfiable(len(file_bytes))
+        start, stop = byte_range
+        return _partial_response(iter([file_bytes[start:stop]]), start, stop, len(file_bytes), filename)
+
+    with ExitStack() as stack:
+        index = None
+        disk_entry = disk_cache.open_entry(tar_abs_path, st, filename)
+        if disk_entry is not None:
+            fileobj = stack.enter_context(disk_entry[0])
+            size = disk_entry[1]
+        else:
+            index = _find_index(tar_abs_path, st, located)
+            if index is not None:
+                entry = index.get(filename)
+                if entry is None:
+                    _member_not_found(tar_abs_path, st, filename)
+                size = entry.size
+            else:
+                fileobj, size = _open_streamed_member(tar_abs_path, st, filename, stack)
+
+        byte_range = resolve_range(spec, size)
+        if byte_range is None:
+            return _range_not_satisfiable(size)
+        start, stop = byte_range
+
+        if index is not None:
+            source = archive_cache.open_archive(index.path, st)
+            fileobj = stack.enter_context(index.open_member(entry, source, start))
+        elif disk_entry is not None:
+            fileobj.seek(start)
+        else:
+            # Tar streams cannot seek; inflate and drop the bytes before the range
+            _skip(fileobj, start)
+
+        chunks = iter_member_chunks(fileobj, Config.DOWNLOAD_CHUNK_SIZE, stack.pop_all(), length=stop - start)
+    return _partial_response(chunks, start, stop, size, filename)
+
+
+def _resolve_tar_path(tar_path: str) -> str:
+    """Validate a client supplied ``tar_path`` and return the archive's absolute path."""
     # Extract relative tar path
-    tar_rel_search = re.search(tar_rel_regex, tar_path)
+    tar_rel_search = re.search(TAR_REL_REGEX, tar_path)
     if not tar_rel_search:
         abort(400, message="Invalid 'tar_path' format - dnmep")
     
@@ -38,33 +561,267 @@ def download_file(**query_kwargs):
         abort(400, message="Invalid 'tar_path' format - cnerp")
 
     # Construct absolute tar path
-    tar_abs_path = os.path.join(Config.FILES_ROOT, tar_rel_path)
+    return os.path.join(Config.FILES_ROOT, tar_rel_path)
+
+
+def _serve_member(tar_abs_path: str, filename: str, located: Optional[ArchiveIndex] = None):
+    """
+    Answer a GET or HEAD for one member of the archive at ``tar_abs_path``.
+
+    ``located`` optionally carries the member's offsets from the catalog,
+    used while the archive has no index of its own.
+    """
+    if negative_cache.archive_missing(tar_abs_path):
+        abort(404, message="Could not find the requested tar archive")
 
     try:
-        # Open the tar file and extract the requested file
-        with tarfile.open(tar_abs_path, "r:gz") as tar:
-            try:
-                member = tar.getmember(filename)
-                extracted_file = tar.extractfile(member)
-                if extracted_file is None:
-                    abort(404, message="Could not find the requested file")
+        st = fs_cache.stat(tar_abs_path)
+        if negative_cache.member_missing(tar_abs_path, st, filename):
+            abort(404, message="Could not find the requested file")
+
+        # The archive version alone identifies the bytes, so a matching tag never opens it:
+        # only a client that saw a 200 for this member can hold one.
+        etag = member_etag(tar_abs_path, st, filename)
+        last_modified = int(st.st_mtime)
+        vary = (
+            Config.GZIP_MEMBERS_MIN_BYTES > 0
+            and member_cache.get_cache() is not None
+            and is_compressible(mimetypes.guess_type(filename)[0])
+        )
+        if is_not_modified(request.headers, etag, last_modified):
+            # A date or "*" holds for any name in the archive; confirm the member first
+            if not etag_matches(request.headers.get("If-None-Match"), etag, wildcard=False):
+                _confirm_member(tar_abs_path, st, filename, located)
+            return _set_cache_headers(Response(status=304), etag, last_modified, vary=vary)
 
-                file_bytes = extracted_file.read()
+        if request.method == "HEAD":
+            response = _head_response(_member_entry(tar_abs_path, st, filename, located), filename)
+            return _set_cache_headers(response, etag, last_modified, vary=vary)
 
-            except KeyError:
-                abort(404, message="Could not find the requested file")
+        spec = parse_range_header(request.headers.get("Range"))
+        if spec is not None and if_range_matches(request.headers.get("If-Range"), etag, last_modified):
+            response = _serve_range(tar_abs_path, st, filename, spec, located)
+            return _set_cache_headers(response, etag, last_modified, vary=vary)
 
-        return send_file(
+        wants_gzip = vary and accepts_gzip(request.headers.get("Accept-Encoding"))
+        if wants_gzip:
+            gzipped = member_cache.get_gzip(tar_abs_path, st, filename)
+            if gzipped is not None:
+                return _gzip_cache_headers(_gzip_response(gzipped, filename), etag, last_modified)
+        elif Config.ACCEL_REDIRECT_ENABLED:
+            response = _accel_response(tar_abs_path, st, filename, located)
+            if response is not None:
+                # Not kept by nginx: the disk cache entry it points at may be swept
+                return _set_cache_headers(response, etag, last_modified, proxy_cache=False, vary=vary)
+
+        file_bytes = member_cache.get(tar_abs_path, st, filename)
+        if file_bytes is None:
+            result = _load_member_coalesced(tar_abs_path, st, filename, located)
+            if isinstance(result, Response):
+                return _set_cache_headers(result, etag, last_modified, vary=vary)
+            file_bytes = result
+
+        if wants_gzip and len(file_bytes) >= Config.GZIP_MEMBERS_MIN_BYTES:
+            gzipped = gzip_bytes(file_bytes, Config.GZIP_MEMBERS_LEVEL)
+            member_cache.put_gzip(tar_abs_path, st, filename, gzipped, len(file_bytes))
+            return _gzip_cache_headers(_gzip_response(gzipped, filename), etag, last_modified)
+
+        response = send_file(
             io.BytesIO(file_bytes),
             as_attachment=True,
             download_name=filename,
+            etag=etag,
+            last_modified=last_modified,
+            # Conditionals and Range were settled above; Werkzeug would 416 several ranges
+            conditional=False,
         )
+        response.headers["Accept-Ranges"] = "bytes"
+        return _set_cache_headers(response, etag, last_modified, vary=vary)
     except FileNotFoundError:
+        negative_cache.add_archive(tar_abs_path)
         abort(404, message="Could not find the requested tar archive")
-    except tarfile.TarError:
+    except (tarfile.TarError, zlib.error, EOFError):
         abort(500, message="Error processing the tar archive")
+    except FlightTimeout:
+        abort(503, message="Timed out waiting for the same file to be extracted")
     except Exception as e:
         # Allow explicit aborts/HTTP exceptions to propagate without wrapping
         if hasattr(e, "status_code") or hasattr(e, "code"):
             raise
         abort(500, message=f"Unexpected error: {str(e)}")
+
+
+@blp.route("", methods=["GET", "HEAD"], strict_slashes=False)
+@blp.arguments(DownloadRequestSchema, location="query", as_kwargs=True)
+def download_file(**query_kwargs):
+    # Extract parameters
+    filename: Optional[str] = query_kwargs.get("filename")
+    tar_path: Optional[str] = query_kwargs.get("tar_path")
+
+    tar_abs_path = _resolve_tar_path(tar_path)
+    return _serve_member(tar_abs_path, filename)
+
+
+@blp.route("/batch", methods=["POST"])
+@blp.arguments(DownloadBatchRequestSchema, location="json", as_kwargs=True)
+def download_batch(**body_kwargs):
+    """
+    Stream several members of one archive back as a single zip or tar.
+
+    Members are selected by exact ``filenames``, a glob ``pattern`` or a
+    name ``prefix`` (any match counts) and read in one pass over the
+    archive. Requested names that are not in the archive are left out.
+    """
+    tar_path: Optional[str] = body_kwargs.get("tar_path")
+    filenames = body_kwargs.get("filenames") or []
+    pattern: Optional[str] = body_kwargs.get("pattern")
+    prefix: Optional[str] = body_kwargs.get("prefix")
+    bundle_format: str = body_kwargs.get("format") or "zip"
+
+    if not (filenames or pattern or prefix):
+        abort(400, message="Provide 'filenames', 'pattern' or 'prefix'")
+
+    tar_abs_path = _resolve_tar_path(tar_path)
+    if negative_cache.archive_missing(tar_abs_path):
+        abort(404, message="Could not find the requested tar archive")
+
+    try:
+        with ExitStack() as stack:
+            st = fs_cache.stat(tar_abs_path)
+            source = stack.enter_context(archive_cache.open_archive(tar_abs_path, st))
+            tar = stack.enter_context(open_archive_stream(tar_abs_path, source))
+            members = (
+                BundleMember(member.name.rstrip("/"), member.size, int(member.mtime), tar.extractfile(member))
+                for member in select_members(tar, filenames, pattern, prefix)
+            )
+
+            # Find the first match before committing to a 200
+            first = next(members, None)
+            if first is None:
+                abort(404, message="Could not find any matching file")
+
+            chunks = iter_bundle(
+                itertools.chain([first], members),
+                bundle_format,
+                Config.DOWNLOAD_CHUNK_SIZE,
+                stack.pop_all(),
+            )
+
+        bundle_name = os.path.basename(tar_abs_path)[:-len(".tar.gz")] + "." + bundle_format
+        response = Response(
+            response=chunks,
+            mimetype=BUNDLE_MIMETYPES[bundle_format],
+            direct_passthrough=True,
+        )
+        response.headers["Content-Disposition"] = _content_disposition(bundle_name)
+        return response
+    except FileNotFoundError:
+        negative_cache.add_archive(tar_abs_path)
+        abort(404, message="Could not find the requested tar archive")
+    except (tarfile.TarError, zlib.error, EOFError):
+        abort(500, message="Error processing the tar archive")
+    except Exception as e:
+        # Allow explicit aborts/HTTP exceptions to propagate without wrapping
+        if hasattr(e, "status_code") or hasattr(e, "code"):
+            raise
+        abort(500, message=f"Unexpected error: {str(e)}")
+
+
+@blp.route("/members", methods=["GET"])
+@blp.arguments(DownloadMembersRequestSchema, location="query", as_kwargs=True)
+def list_members(**query_kwargs):
+    """
+    List an archive's members in name order, one page at a time.
+
+    Pass the previous page's ``next_after`` as ``after`` to continue. The
+    listing comes from the member index, which is built first if needed.
+    """
+    tar_path: Optional[str] = query_kwargs.get("tar_path")
+    prefix: str = query_kwargs.get("prefix") or ""
+    after: Optional[str] = query_kwargs.get("after")
+    limit: int = min(query_kwargs.get("limit") or Config.MEMBERS_PAGE_SIZE, Config.MEMBERS_PAGE_MAX)
+
+    tar_abs_path = _resolve_tar_path(tar_path)
+    if negative_cache.archive_missing(tar_abs_path):
+        abort(404, message="Could not find the requested tar archive")
+
+    try:
+        st = fs_cache.stat(tar_abs_path)
+        index = archive_index.get_index(tar_abs_path, st) or archive_index.build_index(tar_abs_path)
+
+        start = after if after is not None and after > prefix else prefix
+        members = []
+        next_after = None
+        for entry in index.iter_from(start):
+            if not entry.name.startswith(prefix):
+                break
+            if entry.name == after:
+                continue
+            if len(members) == limit:
+                next_after = members[-1]["name"]
+                break
+            members.append({"name": entry.name, "size": entry.size, "mtime": entry.mtime})
+
+        return {"members": members, "next_after": next_after}
+    except FileNotFoundError:
+        negative_cache.add_archive(tar_abs_path)
+        abort(404, message="Could not find the requested tar archive")
+    except (tarfile.TarError, zlib.error, EOFError):
+        abort(500, message="Error processing the tar archive")
+    except Exception as e:
+        # Allow explicit aborts/HTTP exceptions to propagate without wrapping
+        if hasattr(e, "status_code") or hasattr(e, "code"):
+            raise
+        abort(500, message=f"Unexpected error: {str(e)}")
+
+
+def _find_documents(**query) -> list:
+    if not catalog.enabled():
+        abort(503, message="The document catalog is not enabled")
+    try:
+        return catalog.find(**query)
+    except (mongo_errors.PyMongoError, RuntimeError) as exc:
+        abort(503, message=f"The document catalog is unavailable: {exc}")
+
+
+@blp.route("/lookup", methods=["GET"])
+@blp.arguments(DocumentLookupRequestSchema, location="query", as_kwargs=True)
+def lookup_documents(**query_kwargs):
+    """Find which archives hold a member name or electronic document key."""
+    filename: Optional[str] = query_kwargs.get("filename")
+    key: Optional[str] = query_kwargs.get("key")
+    if not filename and not key:
+        abort(400, message="Provide 'filename' or 'key'")
+
+    documents = _find_documents(
+        filename=filename,
+        key=key,
+        customer=query_kwargs.get("customer"),
+        limit=query_kwargs.get("limit") or 100,
+    )
+    return {"documents": documents}
+
+
+@blp.route("/by-name", methods=["GET", "HEAD"])
+@blp.arguments(DownloadByNameRequestSchema, location="query", as_kwargs=True)
+def download_by_name(**query_kwargs):
+    """
+    Download a member by name alone, from the newest archive that holds it.
+
+    The archive comes from the document catalog; the member is then read
+    through the same index and caches as ``GET /download``. While the
+    archive has no index, the catalog's offsets are used instead of
+    walking the tar headers, as long as the archive has not changed since.
+    """
+    filename: Optional[str] = query_kwargs.get("filename")
+    key: Optional[str] = query_kwargs.get("key")
+    if not filename and not key:
+        abort(400, message="Provide 'filename' or 'key'")
+
+    documents = _find_documents(filename=filename, key=key, customer=query_kwargs.get("customer"), limit=1)
+    if not documents:
+        abort(404, message="Could not find the requested file")
+
+    document = documents[0]
+    tar_abs_path = os.path.join(Config.FILES_ROOT, document["tar_path"])
+    return _serve_member(tar_abs_path, document["name"], _catalog_index(tar_abs_path, document))
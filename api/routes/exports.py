@@ -0,0 +1,68 @@
+import re
+from typing import Any, Dict
+
+from flask import send_file
+from flask_smorest import Blueprint, abort
+
+from routes.schemas.exports import ExportRequestSchema
+from extensions import export_jobs
+
+blp = Blueprint(
+    "Exports",
+    __name__,
+    url_prefix="/exports",
+    description="Bulk export of documents across archives",
+)
+
+
+def _get_job_or_404(job_id: str) -> Dict[str, Any]:
+    if not re.match(export_jobs.JOB_ID_REGEX, job_id):
+        abort(404, message="Could not find the requested export")
+    state = export_jobs.get_job(job_id)
+    if state is None:
+        abort(404, message="Could not find the requested export")
+    return state
+
+
+@blp.route("", methods=["POST"], strict_slashes=False)
+@blp.arguments(ExportRequestSchema, location="json", as_kwargs=True)
+def create_export(**body_kwargs):
+    """
+    Queue an export of every matching member across a customer's archives.
+
+    Poll ``GET /exports/<id>`` for progress and fetch the finished bundle
+    from ``GET /exports/<id>/download``.
+    """
+    since = body_kwargs.get("since")
+    until = body_kwargs.get("until")
+    if since > until:
+        abort(400, message="'since' must not be after 'until'")
+
+    state = export_jobs.submit(
+        body_kwargs.get("customer"),
+        since,
+        until,
+        branches=body_kwargs.get("branches"),
+        pattern=body_kwargs.get("pattern"),
+        prefix=body_kwargs.get("prefix"),
+        bundle_format=body_kwargs.get("format") or "zip",
+    )
+    return state, 202
+
+
+@blp.route("/<job_id>", methods=["GET"])
+def get_export(job_id: str):
+    return _get_job_or_404(job_id)
+
+
+@blp.route("/<job_id>/download", methods=["GET"])
+def download_export(job_id: str):
+    state = _get_job_or_404(job_id)
+    if state["status"] != "done":
+        abort(409, message=f"Export is {state['status']}, not done")
+
+    return send_file(
+        export_jobs.output_path(state),
+        as_attachment=True,
+        download_name=f"{state['customer']}_{state['since']}_{state['until']}.{state['format']}",
+    )
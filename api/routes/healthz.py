@@ -1,5 +1,6 @@
 from flask.views import MethodView
 from flask_smorest import Blueprint
+from extensions import archive_cache, disk_cache, fs_cache, member_cache, negative_cache, prefetch
 from extensions.logging import get_logger
 
 logger = get_logger(__name__, class_name="HealthzController")
@@ -22,5 +23,14 @@ class HealthzController(MethodView):
             "ok": True,
             "message": "Service is healthy",
             "code": "HEALTHY",
-            "data": {}
+            "data": {
+                "caches": {
+                    "member": member_cache.stats(),
+                    "disk": disk_cache.stats(),
+                    "archive": archive_cache.stats(),
+                    "negative": negative_cache.stats(),
+                    "fs": fs_cache.stats(),
+                    "prefetch": prefetch.stats(),
+                },
+            }
         }
\ No newline at end of file
@@ -0,0 +1,22 @@
+import re
+
+from marshmallow import Schema, fields, validates, ValidationError
+
+from utils.archive import CUSTOMER_DIR_REGEX
+
+
+class ArchiveListRequestSchema(Schema):
+    customer = fields.String(required=True, data_key="customer")
+    since = fields.Date(required=True, data_key="since")
+    until = fields.Date(required=True, data_key="until")
+    branches = fields.List(fields.String(), data_key="branch")
+
+    @validates("customer")
+    def _validate_customer(self, value: str):
+        if not value or not re.match(CUSTOMER_DIR_REGEX, value):
+            raise ValidationError("customer must look like 'stg-modula-12345'")
+
+    @validates("branches")
+    def _validate_branches(self, value: list):
+        if any(not re.fullmatch(r"\d{3}", branch) for branch in value or []):
+            raise ValidationError("branch must be a three-digit code")
@@ -14,3 +14,61 @@ class DownloadRequestSchema(Schema):
     def _validate_tar_path(self, value: str):
         if not value or not value.strip():
             raise ValidationError("tar_path must not be empty")
+
+
+class DownloadBatchRequestSchema(Schema):
+    tar_path = fields.String(required=True, data_key="tar_path")
+    filenames = fields.List(fields.String(), data_key="filenames")
+    pattern = fields.String(data_key="pattern")
+    prefix = fields.String(data_key="prefix")
+    format = fields.String(data_key="format", load_default="zip")
+
+    @validates("tar_path")
+    def _validate_tar_path(self, value: str):
+        if not value or not value.strip():
+            raise ValidationError("tar_path must not be empty")
+
+    @validates("format")
+    def _validate_format(self, value: str):
+        if value not in ("zip", "tar"):
+            raise ValidationError("format must be 'zip' or 'tar'")
+
+
+class DownloadMembersRequestSchema(Schema):
+    tar_path = fields.String(required=True, data_key="tar_path")
+    prefix = fields.String(data_key="prefix")
+    after = fields.String(data_key="after")
+    limit = fields.Integer(data_key="limit")
+
+    @validates("tar_path")
+    def _validate_tar_path(self, value: str):
+        if not value or not value.strip():
+            raise ValidationError("tar_path must not be empty")
+
+    @validates("limit")
+    def _validate_limit(self, value: int):
+        if value is not None and value < 1:
+            raise ValidationError("limit must be positive")
+
+
+class DocumentLookupRequestSchema(Schema):
+    filename = fields.String(data_key="filename")
+    key = fields.String(data_key="key")
+    customer = fields.String(data_key="customer")
+    limit = fields.Integer(data_key="limit", load_default=100)
+
+    @validates("limit")
+    def _validate_limit(self, value: int):
+        if value < 1 or value > 1000:
+            raise ValidationError("limit must be between 1 and 1000")
+
+
+class DownloadByNameRequestSchema(Schema):
+    filename = fields.String(data_key="filename")
+    key = fields.String(data_key="key")
+    customer = fields.String(data_key="customer")
+
+    @validates("filename")
+    def _validate_filename(self, value: str):
+        if not value or not value.strip():
+            raise ValidationError("filename must not be empty")
@@ -0,0 +1,30 @@
+import re
+
+from marshmallow import Schema, fields, validates, ValidationError
+
+from utils.archive import CUSTOMER_DIR_REGEX
+
+
+class ExportRequestSchema(Schema):
+    customer = fields.String(required=True, data_key="customer")
+    since = fields.Date(required=True, data_key="since")
+    until = fields.Date(required=True, data_key="until")
+    branches = fields.List(fields.String(), data_key="branches")
+    pattern = fields.String(data_key="pattern")
+    prefix = fields.String(data_key="prefix")
+    format = fields.String(data_key="format", load_default="zip")
+
+    @validates("customer")
+    def _validate_customer(self, value: str):
+        if not value or not re.match(CUSTOMER_DIR_REGEX, value):
+            raise ValidationError("customer must look like 'stg-modula-12345'")
+
+    @validates("branches")
+    def _validate_branches(self, value: list):
+        if any(not re.fullmatch(r"\d{3}", branch) for branch in value or []):
+            raise ValidationError("branches must be three-digit codes")
+
+    @validates("format")
+    def _validate_format(self, value: str):
+        if value not in ("zip", "tar"):
+            raise ValidationError("format must be 'zip' or 'tar'")
@@ -0,0 +1,269 @@
+import fnmatch
+import os
+import re
+import tarfile
+from contextlib import ExitStack, contextmanager
+from datetime import date
+from typing import IO, BinaryIO, Callable, Collection, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from extensions.logging import get_logger
+from utils.gzindex import GzipIndex, InflateReader
+from utils.throttle import RateLimiter, ThrottledReader
+
+logger = get_logger(__name__)
+
+# Relative archive path: <customer>/<yy>/<mm>/<dd>/<branch>_<HH-MM>.tar.gz
+TAR_REL_REGEX = r"((?:stg|prd)-modula-\d{5}/\d{2}/\d{2}/\d{2}/\d{3}_\d{2}-\d{2}\.tar\.gz)$"
+
+# The same layout, one path component at a time, for directory walks
+CUSTOMER_DIR_REGEX = r"^(?:stg|prd)-modula-\d{5}$"
+DATE_PART_REGEX = r"^\d{2}$"
+ARCHIVE_NAME_REGEX = r"^\d{3}_\d{2}-\d{2}\.tar\.gz$"
+
+# Read buffer for archive file handles on the bucket mount. Larger sequential
+# reads are far cheaper than many small ones on a FUSE-backed filesystem.
+TAR_READ_BUFSIZE = 1024 * 1024
+
+
+@contextmanager
+def open_archive_stream(tar_abs_path: str, fileobj: Optional[BinaryIO] = None) -> Iterator[tarfile.TarFile]:
+    """
+    Open a tar.gz archive in forward-only stream mode.
+
+    Stream mode never seeks backwards, so headers are inflated strictly in
+    order and only as far as the caller iterates. An already open
+    ``fileobj`` is read instead of ``tar_abs_path`` and is not closed.
+
+    Inflation goes through ``InflateReader`` rather than tarfile's own
+    ``r|gz``, which inflates each read in one unbounded call; memory then
+    stays flat however compressible a member is.
+    """
+    with ExitStack() as stack:
+        if fileobj is None:
+            fileobj = stack.enter_context(open(tar_abs_path, "rb", buffering=TAR_READ_BUFSIZE))
+        yield stack.enter_context(tarfile.open(fileobj=InflateReader(fileobj), mode="r|"))
+
+
+def find_member(tar: tarfile.TarFile, filename: str) -> Optional[tarfile.TarInfo]:
+    """
+    Walk member headers one by one and stop at the first match.
+
+    Unlike ``TarFile.getmember`` this does not load every header first, so
+    only the bytes up to the requested member get decompressed.
+    """
+    target = filename.rstrip("/")
+    scanned = 0
+    for member in tar:
+        scanned += 1
+        if member.name.rstrip("/") == target:
+            logger.debug(f"Found member '{filename}' after scanning {scanned} header(s)")
+            return member
+
+    logger.debug(f"Member '{filename}' not found after scanning {scanned} header(s)")
+    return None
+
+
+def find_members(tar: tarfile.TarFile, filenames: Collection[str]) -> Iterator[Tuple[str, tarfile.TarInfo]]:
+    """
+    Yield ``(requested name, member)`` for each of ``filenames`` in archive order.
+
+    Like ``find_member``, the first occurrence of a name wins and the walk
+    stops once every name has been found. In stream mode the caller must
+    read a member's data before advancing.
+    """
+    wanted = {name.rstrip("/"): name for name in filenames}
+    for member in tar:
+        name = wanted.pop(member.name.rstrip("/"), None)
+        if name is not None:
+            yield name, member
+            if not wanted:
+                return
+
+
+def select_members(
+    tar: tarfile.TarFile,
+    filenames: Optional[Collection[str]] = None,
+    pattern: Optional[str] = None,
+    prefix: Optional[str] = None,
+) -> Iterator[tarfile.TarInfo]:
+    """
+    Yield regular-file members matching any of ``filenames``, the glob
+    ``pattern`` or ``prefix``, in archive order.
+
+    The first occurrence of a name wins. When only ``filenames`` are given
+    the walk stops as soon as all of them have been seen.
+    """
+    wanted = {name.rstrip("/") for name in filenames or ()}
+    seen = set()
+    for member in tar:
+        name = member.name.rstrip("/")
+        if name in seen:
+            continue
+        seen.add(name)
+
+        if (
+            name in wanted
+            or (pattern and fnmatch.fnmatchcase(name, pattern))
+            or (prefix and name.startswith(prefix))
+        ):
+            wanted.discard(name)
+            if member.isfile():
+                yield member
+        if not pattern and not prefix and not wanted:
+            return
+
+
+def iter_member_chunks(
+    fileobj: IO[bytes],
+    chunk_size: int,
+    closer: Optional[ExitStack] = None,
+    sink=None,
+    length: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Yield a member's decompressed bytes in bounded chunks.
+
+    ``closer`` owns the open archive and is closed once the stream is
+    exhausted or the client goes away, whichever happens first. Every
+    chunk is also copied to ``sink`` (a disk cache writer), which is only
+    committed if the whole member was read. ``length`` stops the stream
+    early, e.g. at the end of a byte range.
+    """
+    completed = False
+    remaining = length
+    try:
+        while remaining is None or remaining > 0:
+            chunk = fileobj.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            if sink is not None:
+                sink.write(chunk)
+            yield chunk
+        completed = True
+    finally:
+        if sink is not None:
+            if completed:
+                sink.commit()
+            else:
+                sink.discard()
+        if closer is not None:
+            closer.close()
+
+
+class MemberEntry(NamedTuple):
+    """Location of a regular-file member inside the uncompressed tar stream."""
+    name: str
+    size: int
+    mtime: int
+    offset: int
+    offset_data: int
+
+
+def scan_archive(
+    tar_abs_path: str,
+    span: int,
+    limiter: Optional[RateLimiter] = None,
+    fileobj: Optional[BinaryIO] = None,
+    on_member: Optional[Callable[[MemberEntry, IO[bytes]], None]] = None,
+) -> Tuple[GzipIndex, Dict[str, MemberEntry]]:
+    """
+    Inflate a whole tar.gz once, recording gzip checkpoints every ``span``
+    compressed bytes and the position of every regular-file member.
+
+    Only the first occurrence of a name is kept, matching ``find_member``.
+    Reads are charged against ``limiter`` when one is given. An already
+    open ``fileobj`` is read instead of ``tar_abs_path`` and is closed.
+    ``on_member`` is handed each kept member's data as the pass reaches it.
+    """
+    members: Dict[str, MemberEntry] = {}
+    with (fileobj if fileobj is not None else open(tar_abs_path, "rb")) as raw:
+        source = ThrottledReader(raw, limiter) if limiter is not None else raw
+        reader = InflateReader(source, span=span)
+        with tarfile.open(fileobj=reader, mode="r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                name = member.name.rstrip("/")
+                if name not in members:
+                    members[name] = MemberEntry(
+                        name, member.size, int(member.mtime), member.offset, member.offset_data
+                    )
+                    if on_member is not None:
+                        on_member(members[name], tar.extractfile(member))
+
+    return GzipIndex(reader.checkpoints), members
+
+
+class ArchiveRef(NamedTuple):
+    """An archive found by walking the bucket layout."""
+    rel_path: str
+    abs_path: str
+    customer: str
+    day: date
+    branch: str
+
+
+def _listdir(path: str) -> List[str]:
+    with os.scandir(path) as entries:
+        return sorted(e.name for e in entries)
+
+
+def _scandir_names(path: str, pattern: str, listdir: Callable[[str], List[str]] = _listdir) -> List[str]:
+    try:
+        return [name for name in listdir(path) if re.match(pattern, name)]
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def iter_archives(
+    root: str,
+    customers: Optional[Collection[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    branches: Optional[Collection[str]] = None,
+    listdir: Callable[[str], List[str]] = _listdir,
+) -> Iterator[ArchiveRef]:
+    """
+    Walk ``<root>/<customer>/<yy>/<mm>/<dd>/<branch>_<HH-MM>.tar.gz`` in order.
+
+    Directories that do not follow the layout, or that fall entirely outside
+    the requested date range, are never listed. ``listdir`` returns the
+    sorted names in a directory and may be swapped for a cached one.
+    """
+    for customer in _scandir_names(root, CUSTOMER_DIR_REGEX, listdir):
+        if customers and customer not in customers:
+            continue
+        customer_dir = os.path.join(root, customer)
+
+        for yy in _scandir_names(customer_dir, DATE_PART_REGEX, listdir):
+            year = 2000 + int(yy)
+            if (since and year < since.year) or (until and year > until.year):
+                continue
+
+            for mm in _scandir_names(os.path.join(customer_dir, yy), DATE_PART_REGEX, listdir):
+                month = (year, int(mm))
+                if (since and month < (since.year, since.month)) or (until and month > (until.year, until.month)):
+                    continue
+
+                for dd in _scandir_names(os.path.join(customer_dir, yy, mm), DATE_PART_REGEX, listdir):
+                    try:
+                        day = date(year, int(mm), int(dd))
+                    except ValueError:
+                        continue
+                    if (since and day < since) or (until and day > until):
+                        continue
+
+                    day_dir = os.path.join(customer_dir, yy, mm, dd)
+                    for name in _scandir_names(day_dir, ARCHIVE_NAME_REGEX, listdir):
+                        branch = name[:3]
+                        if branches and branch not in branches:
+                            continue
+                        yield ArchiveRef(
+                            f"{customer}/{yy}/{mm}/{dd}/{name}",
+                            os.path.join(day_dir, name),
+                            customer,
+                            day,
+                            branch,
+                        )
@@ -0,0 +1,109 @@
+import tarfile
+import time
+import zipfile
+from contextlib import ExitStack
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional
+
+BUNDLE_FORMATS = ("zip", "tar")
+
+BUNDLE_MIMETYPES = {
+    "zip": "application/zip",
+    "tar": "application/x-tar",
+}
+
+# Earliest timestamp a zip entry can carry
+_ZIP_EPOCH = 315532800  # 1980-01-01T00:00:00Z
+
+
+class BundleMember(NamedTuple):
+    """One file to add to a bundle, read from ``fileobj``."""
+    name: str
+    size: int
+    mtime: int
+    fileobj: IO[bytes]
+
+
+class _ChunkSink:
+    """Unseekable write target whose written bytes are drained by a generator."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_zip(members: Iterable[BundleMember], chunk_size: int) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    # zipfile falls back to data descriptors on an unseekable target, so
+    # nothing has to be buffered beyond the chunk being written.
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for member in members:
+            info = zipfile.ZipInfo(member.name, time.gmtime(max(member.mtime, _ZIP_EPOCH))[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with bundle.open(info, mode="w", force_zip64=member.size >= zipfile.ZIP64_LIMIT) as dst:
+                while True:
+                    chunk = member.fileobj.read(chunk_size)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _iter_tar(members: Iterable[BundleMember], chunk_size: int) -> Iterator[bytes]:
+    for member in members:
+        info = tarfile.TarInfo(member.name)
+        info.size = member.size
+        info.mtime = member.mtime
+        info.mode = 0o644
+        yield info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+        remaining = member.size
+        while remaining > 0:
+            chunk = member.fileobj.read(min(chunk_size, remaining))
+            if not chunk:
+                raise EOFError(f"Member '{member.name}' ended early")
+            yield chunk
+            remaining -= len(chunk)
+
+        padding = -member.size % tarfile.BLOCKSIZE
+        if padding:
+            yield tarfile.NUL * padding
+
+    # End-of-archive marker
+    yield tarfile.NUL * (tarfile.BLOCKSIZE * 2)
+
+
+def iter_bundle(
+    members: Iterable[BundleMember],
+    bundle_format: str,
+    chunk_size: int,
+    closer: Optional[ExitStack] = None,
+) -> Iterator[bytes]:
+    """
+    Stream ``members`` as a zip or tar archive, one chunk at a time.
+
+    ``members`` is consumed lazily, so it can walk a forward-only tar
+    stream. ``closer`` is closed once the bundle ends or is abandoned.
+    """
+    writer = _iter_zip if bundle_format == "zip" else _iter_tar
+    try:
+        for chunk in writer(members, chunk_size):
+            if chunk:
+                yield chunk
+    finally:
+        if closer is not None:
+            closer.close()
@@ -0,0 +1,112 @@
+import hashlib
+import os
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+
+
+def member_etag(path: str, st: os.stat_result, name: str) -> str:
+    """
+    Strong entity tag for one member of one archive version, without quotes.
+
+    Archives are never modified in place, so the archive path, mtime, size
+    and member name identify the member's bytes.
+    """
+    identity = f"{path}\0{st.st_mtime_ns}\0{st.st_size}\0{name}"
+    return hashlib.sha256(identity.encode("utf-8", "surrogateescape")).hexdigest()[:32]
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """POSIX timestamp of an HTTP date header, or None if it is missing or malformed."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def etag_matches(header: Optional[str], etag: str, wildcard: bool = True) -> bool:
+    """Weak comparison of ``etag`` against an ``If-None-Match`` list; ``*`` matches only with ``wildcard``."""
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            if wildcard:
+                return True
+            continue
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: int) -> bool:
+    """
+    Evaluate ``If-None-Match`` and ``If-Modified-Since`` (RFC 9110, 13.2.2).
+
+    ``If-Modified-Since`` is ignored whenever ``If-None-Match`` is present.
+    """
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+
+    since = parse_http_date(headers.get("If-Modified-Since"))
+    return since is not None and last_modified <= since
+
+
+def parse_range_header(header: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a single ``bytes=first-last`` or ``bytes=-suffix`` range.
+
+    Returns ``(first, last)`` with ``first`` None for a suffix range, or
+    None when the header is absent, malformed or asks for several ranges;
+    those requests get the whole member, as RFC 9110 allows.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first.isdigit() or (not first and last.isdigit())):
+        return None
+    if last and not last.isdigit():
+        return None
+
+    first_pos = int(first) if first else None
+    last_pos = int(last) if last else None
+    if first_pos is not None and last_pos is not None and last_pos < first_pos:
+        return None
+    return first_pos, last_pos
+
+
+def resolve_range(spec: Tuple[Optional[int], Optional[int]], size: int) -> Optional[Tuple[int, int]]:
+    """Half-open ``(start, stop)`` offsets of ``spec`` in a body of ``size`` bytes, or None if unsatisfiable."""
+    first, last = spec
+    if first is None:
+        if not last or not size:
+            return None
+        return max(size - last, 0), size
+    if first >= size:
+        return None
+    return first, size if last is None else min(last + 1, size)
+
+
+def if_range_matches(header: Optional[str], etag: str, last_modified: int) -> bool:
+    """
+    Evaluate ``If-Range``: True when the range may be served.
+
+    Entity tags use strong comparison, so weak tags never match; dates must
+    equal ``Last-Modified`` exactly.
+    """
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith('"'):
+        return header.strip('"') == etag
+    if header.startswith("W/"):
+        return False
+    return parse_http_date(header) == last_modified
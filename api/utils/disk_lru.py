@@ -0,0 +1,82 @@
+import fcntl
+import os
+import time
+from typing import Dict, Optional
+
+# Sweeps trim a directory to this share of its byte cap to avoid sweeping on every write
+SWEEP_TARGET_RATIO = 0.9
+
+# Temp files older than this are leftovers from crashed writers
+STALE_TMP_SECONDS = 3600
+
+TMP_PREFIX = ".tmp-"
+
+
+def touch(path: str) -> None:
+    """Mark ``path`` as recently used; mtime doubles as the last-access time."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def sweep_directory(root: str, max_bytes: int, max_age: Optional[float] = None) -> Dict[str, int]:
+    """
+    Trim a sharded ``<root>/<xx>/<entry>`` cache directory below ``max_bytes``,
+    least recently used first, and drop entries older than ``max_age``.
+
+    A non-blocking file lock makes sure only one process sweeps a directory
+    at a time; the others simply skip.
+    """
+    os.makedirs(root, exist_ok=True)
+    result = {"entries": 0, "bytes": 0, "evicted": 0}
+    expired = 0
+
+    with open(os.path.join(root, ".sweep.lock"), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return result
+
+        now = time.time()
+        entries = []
+        for shard in os.scandir(root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(TMP_PREFIX):
+                    if now - st.st_mtime > STALE_TMP_SECONDS:
+                        _unlink(entry.path)
+                    continue
+                if max_age is not None and now - st.st_mtime > max_age:
+                    expired += _unlink(entry.path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        if total > max_bytes:
+            target = max_bytes * SWEEP_TARGET_RATIO
+            for _, size, entry_path in sorted(entries):
+                if total <= target:
+                    break
+                if _unlink(entry_path):
+                    total -= size
+                    result["evicted"] += 1
+
+        result["bytes"] = total
+        result["entries"] = len(entries) - result["evicted"]
+        result["evicted"] += expired
+
+    return result
+
+
+def _unlink(path: str) -> int:
+    try:
+        os.unlink(path)
+        return 1
+    except FileNotFoundError:
+        return 0
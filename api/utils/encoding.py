@@ -0,0 +1,39 @@
+import gzip
+from typing import Optional
+
+# Same types nginx compresses on the fly (gzip_types in build/nginx.conf)
+COMPRESSIBLE_MIMETYPES = frozenset({
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+})
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype:
+        return False
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def accepts_gzip(header: Optional[str]) -> bool:
+    """True when an ``Accept-Encoding`` value allows gzip (``q=0`` refuses it)."""
+    if not header:
+        return False
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() not in ("gzip", "x-gzip"):
+            continue
+        param, _, value = params.partition("=")
+        if param.strip().lower() == "q":
+            try:
+                return float(value) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def gzip_bytes(data: bytes, level: int) -> bytes:
+    """Gzip ``data`` with a zero mtime so the output only depends on the input."""
+    return gzip.compress(data, compresslevel=level, mtime=0)
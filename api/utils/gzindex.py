@@ -0,0 +1,191 @@
+import bisect
+import zlib
+from typing import BinaryIO, List, Optional
+
+# zlib wbits value that expects a gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Compressed bytes read from disk per inflate step
+READ_SIZE = 256 * 1024
+
+# Rough in-memory cost of one checkpoint: the 32 KiB inflate window plus zlib state
+CHECKPOINT_COST = 48 * 1024
+
+
+class Checkpoint:
+    """Snapshot of the inflate state at a known compressed/uncompressed offset pair."""
+
+    __slots__ = ("comp_offset", "uncomp_offset", "decompressor")
+
+    def __init__(self, comp_offset: int, uncomp_offset: int, decompressor) -> None:
+        self.comp_offset = comp_offset
+        self.uncomp_offset = uncomp_offset
+        self.decompressor = decompressor
+
+
+class InflateReader:
+    """
+    Forward-only file-like reader over a gzip stream.
+
+    When ``span`` is given, a checkpoint is recorded roughly every ``span``
+    bytes of compressed input so that later readers can resume from there.
+    """
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        decompressor=None,
+        comp_offset: int = 0,
+        uncomp_offset: int = 0,
+        span: Optional[int] = None,
+        owns_file: bool = False,
+    ) -> None:
+        self._fileobj = fileobj
+        self._dec = decompressor or zlib.decompressobj(GZIP_WBITS)
+        self._owns_file = owns_file
+        self._comp_read = comp_offset
+        self._pending = b""
+        self._buffer = bytearray()
+        self._eof = False
+        self._remaining: Optional[int] = None
+        self.position = uncomp_offset
+
+        self._span = span
+        self.checkpoints: List[Checkpoint] = []
+        if span:
+            self.checkpoints.append(Checkpoint(comp_offset, uncomp_offset, self._dec.copy()))
+            self._next_checkpoint = comp_offset + span
+
+    def limit(self, length: Optional[int]) -> None:
+        """Stop returning data after ``length`` more bytes."""
+        self._remaining = length
+
+    def _fill(self, want: int) -> None:
+        while len(self._buffer) < want and not self._eof:
+            if not self._pending:
+                self._pending = self._fileobj.read(READ_SIZE)
+                self._comp_read += len(self._pending)
+                if not self._pending:
+                    if not self._dec.eof:
+                        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+                    self._eof = True
+                    break
+
+            if self._dec.eof:
+                # Concatenated gzip members (or trailing zero padding) after the first one
+                if not self._pending.lstrip(b"\x00"):
+                    self._pending = b""
+                    continue
+                self._dec = zlib.decompressobj(GZIP_WBITS)
+
+            self._buffer += self._dec.decompress(self._pending, READ_SIZE * 4)
+            self._pending = self._dec.unconsumed_tail or self._dec.unused_data
+
+            if self._span and not self._dec.eof:
+                consumed = self._comp_read - len(self._pending)
+                if consumed >= self._next_checkpoint:
+                    produced = self.position + len(self._buffer)
+                    self.checkpoints.append(Checkpoint(consumed, produced, self._dec.copy()))
+                    self._next_checkpoint = consumed + self._span
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining is not None:
+            size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+
+        if size is None or size < 0:
+            chunks = []
+            while True:
+                chunk = self.read(READ_SIZE * 4)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+
+        self._fill(size)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.position += len(chunk)
+        if self._remaining is not None:
+            self._remaining -= len(chunk)
+        return chunk
+
+    def skip(self, length: int) -> None:
+        """Inflate and discard ``length`` bytes."""
+        while length > 0:
+            self._fill(min(length, READ_SIZE * 4))
+            step = min(length, len(self._buffer))
+            if not step:
+                raise EOFError("Offset is past the end of the gzip stream")
+            del self._buffer[:step]
+            self.position += step
+            length -= step
+
+    def close(self) -> None:
+        if self._owns_file:
+            self._fileobj.close()
+
+    def __enter__(self) -> "InflateReader":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.close()
+        return False
+
+
+class GzipIndex:
+    """
+    Random-access index over a gzip file in the style of zlib's zran.c.
+
+    Python's zlib cannot prime a raw inflate at an arbitrary bit offset, so
+    checkpoints keep a copy of the live decompressor instead of a serialised
+    window. They only live in memory.
+    """
+
+    def __init__(self, checkpoints: List[Checkpoint]) -> None:
+        self.checkpoints = checkpoints
+        self._offsets = [cp.uncomp_offset for cp in checkpoints]
+
+    @classmethod
+    def from_start(cls) -> "GzipIndex":
+        """Index with a single checkpoint at the start of the stream."""
+        return cls([Checkpoint(0, 0, zlib.decompressobj(GZIP_WBITS))])
+
+    @property
+    def cost(self) -> int:
+        return len(self.checkpoints) * CHECKPOINT_COST
+
+    def checkpoint_for(self, offset: int) -> Checkpoint:
+        """Return the last checkpoint at or before uncompressed ``offset``."""
+        idx = bisect.bisect_right(self._offsets, offset) - 1
+        return self.checkpoints[max(idx, 0)]
+
+    def open_at(
+        self,
+        path: str,
+        offset: int,
+        length: Optional[int] = None,
+        fileobj: Optional[BinaryIO] = None,
+    ) -> InflateReader:
+        """
+        Position a reader at uncompressed ``offset`` of ``path``.
+
+        An already open, seekable ``fileobj`` may be passed instead; the
+        reader takes ownership of it either way.
+        """
+        checkpoint = self.checkpoint_for(offset)
+        if fileobj is None:
+            fileobj = open(path, "rb")
+        try:
+            fileobj.seek(checkpoint.comp_offset)
+            reader = InflateReader(
+                fileobj,
+                checkpoint.decompressor.copy(),
+                comp_offset=checkpoint.comp_offset,
+                uncomp_offset=checkpoint.uncomp_offset,
+                owns_file=True,
+            )
+            reader.skip(offset - checkpoint.uncomp_offset)
+        except Exception:
+            fileobj.close()
+            raise
+        reader.limit(length)
+        return reader
@@ -0,0 +1,130 @@
+import mmap
+import os
+import struct
+import tempfile
+from typing import Iterable, Iterator, Optional
+
+from utils.archive import MemberEntry
+
+# Sidecar layout (little-endian):
+#   header  : magic, version, flags, archive size, archive mtime_ns, record count, names size
+#   records : one fixed-size record per member, sorted by UTF-8 name bytes
+#   names   : concatenated UTF-8 member names referenced by the records
+MAGIC = b"MEIX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHqqII")
+RECORD = struct.Struct("<IIqqqq")  # name offset, name length, size, mtime, offset, offset_data
+
+
+def encode_name(name: str) -> bytes:
+    return name.encode("utf-8", "surrogateescape")
+
+
+def write_member_index(path: str, st: os.stat_result, entries: Iterable[MemberEntry]) -> None:
+    """Atomically write a sidecar index for the archive described by ``st``."""
+    encoded = sorted((encode_name(entry.name), entry) for entry in entries)
+
+    names = bytearray()
+    records = bytearray()
+    for raw_name, entry in encoded:
+        records += RECORD.pack(len(names), len(raw_name), entry.size, entry.mtime, entry.offset, entry.offset_data)
+        names += raw_name
+
+    header = HEADER.pack(MAGIC, VERSION, 0, st.st_size, st.st_mtime_ns, len(encoded), len(names))
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".idx")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header)
+            fh.write(records)
+            fh.write(names)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class MemberIndexFile:
+    """
+    Read-only, memory-mapped view over a sidecar written by ``write_member_index``.
+
+    Lookups are a binary search over the fixed-size records; nothing is
+    decoded until a record matches.
+    """
+
+    def __init__(self, mm: mmap.mmap) -> None:
+        magic, version, _flags, size, mtime_ns, count, names_size = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a member index file")
+        if len(mm) != HEADER.size + count * RECORD.size + names_size:
+            raise ValueError("Truncated member index file")
+
+        self._mm = mm
+        self.archive_size = size
+        self.archive_mtime_ns = mtime_ns
+        self._count = count
+        self._names_offset = HEADER.size + count * RECORD.size
+
+    @classmethod
+    def open(cls, path: str) -> "MemberIndexFile":
+        with open(path, "rb") as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(mm)
+        except Exception:
+            mm.close()
+            raise
+
+    def is_current(self, st: os.stat_result) -> bool:
+        return st.st_size == self.archive_size and st.st_mtime_ns == self.archive_mtime_ns
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, idx: int):
+        return RECORD.unpack_from(self._mm, HEADER.size + idx * RECORD.size)
+
+    def _name_at(self, idx: int) -> bytes:
+        name_offset, name_len = self._record(idx)[:2]
+        start = self._names_offset + name_offset
+        return self._mm[start:start + name_len]
+
+    def _entry(self, idx: int) -> MemberEntry:
+        name_offset, name_len, size, mtime, offset, offset_data = self._record(idx)
+        start = self._names_offset + name_offset
+        name = self._mm[start:start + name_len].decode("utf-8", "surrogateescape")
+        return MemberEntry(name, size, mtime, offset, offset_data)
+
+    def _bisect_left(self, key: bytes) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def get(self, name: str) -> Optional[MemberEntry]:
+        key = encode_name(name)
+        idx = self._bisect_left(key)
+        if idx < self._count and self._name_at(idx) == key:
+            return self._entry(idx)
+        return None
+
+    def iter_from(self, name: str) -> Iterator[MemberEntry]:
+        """Entries in name order, starting at the first name not below ``name``."""
+        for idx in range(self._bisect_left(encode_name(name)), self._count):
+            yield self._entry(idx)
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def __iter__(self) -> Iterator[MemberEntry]:
+        for idx in range(self._count):
+            yield self._entry(idx)
@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Optional, Set, Tuple
+
+
+class FlightTimeout(Exception):
+    """A waiter gave up on an identical call still in progress."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key onto one execution.
+
+    The first caller runs ``fn``; callers arriving while it runs wait for
+    its result, or its exception, instead of repeating the work. Nothing is
+    remembered once the call finishes.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "shared": 0, "timeouts": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True when another caller did the work."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["calls"] += 1
+            else:
+                call.waiters += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise FlightTimeout(f"Gave up after {timeout}s waiting for an identical call")
+            with self._lock:
+                self.stats["shared"] += 1
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class _Batch:
+    __slots__ = ("items", "done", "results", "error")
+
+    def __init__(self) -> None:
+        self.items: Set[Hashable] = set()
+        self.done = threading.Event()
+        self.results: Dict[Hashable, Any] = {}
+        self.error: Optional[BaseException] = None
+
+
+class MicroBatcher:
+    """
+    Gather calls for different items under one key into a single batch call.
+
+    The first caller for a key holds the batch open for ``window`` seconds,
+    then runs ``fn`` once with every item submitted meanwhile. Each caller
+    gets its own item's result, or the batch's exception.
+    """
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._open: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+        self.stats = {"batches": 0, "items": 0, "timeouts": 0}
+
+    def submit(
+        self,
+        key: Hashable,
+        item: Hashable,
+        fn: Callable[[FrozenSet[Hashable]], Dict[Hashable, Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Return ``fn``'s result for ``item``, or None if it returned nothing for it."""
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+                self.stats["batches"] += 1
+            batch.items.add(item)
+            self.stats["items"] += 1
+
+        if not leader:
+            if not batch.done.wait(timeout):
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise FlightTimeout(f"Gave up after {timeout}s waiting for a batch")
+            if batch.error is not None:
+                raise batch.error
+            return batch.results.get(item)
+
+        time.sleep(self.window)
+        with self._lock:
+            # Later callers start a new batch
+            del self._open[key]
+            items = frozenset(batch.items)
+
+        try:
+            batch.results = fn(items)
+        except BaseException as exc:
+            batch.error = exc
+            raise
+        finally:
+            batch.done.set()
+        return batch.results.get(item)
@@ -0,0 +1,49 @@
+import threading
+import time
+from typing import BinaryIO, Optional
+
+
+class RateLimiter:
+    """
+    Token bucket shared between threads.
+
+    ``consume`` blocks until ``amount`` units fit in the budget; a rate of
+    zero or less disables throttling.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: float) -> None:
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class ThrottledReader:
+    """File wrapper that charges every read against a ``RateLimiter``."""
+
+    def __init__(self, fileobj: BinaryIO, limiter: RateLimiter) -> None:
+        self._fileobj = fileobj
+        self._limiter = limiter
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        self._limiter.consume(len(data))
+        return data
+
+    def close(self) -> None:
+        self._fileobj.close()
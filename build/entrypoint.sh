@@ -25,6 +25,14 @@ done
 
 echo -e "${GREEN}[OK] All required variables are set.${NC}"
 
+# nginx only answers downloads from its cache for these credentials; it gets
+# their digest so the secret itself is never written to disk
+CREDENTIALS_MD5="$(printf '%s|%s' "$FILES_API_KEY" "$FILES_API_SECRET" \
+  | python3 -c 'import base64, hashlib, sys; print(base64.urlsafe_b64encode(hashlib.md5(sys.stdin.buffer.read()).digest()).decode().rstrip("="))')"
+umask 077
+echo "set \$api_credentials_md5 \"${CREDENTIALS_MD5}\";" > /etc/nginx/download-cache-auth.conf
+umask 022
+
 # Start supervisord
 echo -e "${GREEN}[ENTRYPOINT] Starting supervisor...${NC}"
 
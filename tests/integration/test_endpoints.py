@@ -10,7 +10,7 @@ import routes as routes_pkg
 
 def test_download_handler_end_to_end(tmp_path, monkeypatch):
     # Prepare tarball
-    tar_rel = Path("stg-modula-12345/23/12/31/123/01_10-10.tar.gz")
+    tar_rel = Path("stg-modula-12345/23/12/31/123_10-10.tar.gz")
     tar_abs = tmp_path / tar_rel
     tar_abs.parent.mkdir(parents=True, exist_ok=True)
     with tarfile.open(tar_abs, "w:gz") as tar:
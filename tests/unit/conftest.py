@@ -32,11 +32,15 @@ if "flask" not in sys.modules:
     request = types.SimpleNamespace(headers={}, remote_addr=None, method="GET", path="/")
 
     class Response:
-        def __init__(self, json=None, status_code=200, headers=None, is_json=True):
+        def __init__(self, json=None, status_code=200, headers=None, is_json=True,
+                     response=None, status=None, mimetype=None, direct_passthrough=False):
             self._json = json
-            self.status_code = status_code
+            self.status_code = status if status is not None else status_code
             self.headers = headers or {}
-            self.is_json = is_json
+            self.is_json = is_json and response is None
+            self.response = response
+            self.mimetype = mimetype
+            self.direct_passthrough = direct_passthrough
 
         def get_json(self, silent=False):
             return self._json
@@ -98,8 +102,22 @@ if "flask" not in sys.modules:
                 return func
             return decorator
 
-    def send_file(fileobj, as_attachment=False, download_name=None):
-        return {"file": fileobj.getvalue(), "as_attachment": as_attachment, "download_name": download_name}
+    class SentFile(dict):
+        status_code = 200
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.headers = {}
+
+    def send_file(fileobj, as_attachment=False, download_name=None, etag=None, last_modified=None, conditional=True):
+        return SentFile(
+            file=fileobj.getvalue(),
+            as_attachment=as_attachment,
+            download_name=download_name,
+            etag=etag,
+            last_modified=last_modified,
+            conditional=conditional,
+        )
 
     flask.Flask = Flask
     flask.Blueprint = Blueprint
@@ -188,6 +206,50 @@ if "flask_smorest" not in sys.modules:
     flask_smorest.Api = Api
     sys.modules["flask_smorest"] = flask_smorest
 
+# Stub pymongo; tests that need a collection provide their own fake.
+if "pymongo" not in sys.modules:
+    pymongo = types.ModuleType("pymongo")
+
+    class _Admin:
+        def command(self, _cmd):
+            return {"ok": 1}
+
+    class MongoClient:
+        def __init__(self, *args, **kwargs):
+            self.admin = _Admin()
+
+    class UpdateOne:
+        def __init__(self, filter, update, upsert=False):
+            self._filter = filter
+            self._doc = update
+            self._upsert = upsert
+
+    errors = types.ModuleType("pymongo.errors")
+
+    class PyMongoError(Exception):
+        pass
+
+    errors.PyMongoError = PyMongoError
+
+    server_api = types.ModuleType("pymongo.server_api")
+
+    class ServerApi:
+        def __init__(self, *args, **kwargs):
+            pass
+
+    server_api.ServerApi = ServerApi
+
+    pymongo.MongoClient = MongoClient
+    pymongo.UpdateOne = UpdateOne
+    pymongo.ASCENDING = 1
+    pymongo.DESCENDING = -1
+    pymongo.errors = errors
+    pymongo.server_api = server_api
+
+    sys.modules["pymongo"] = pymongo
+    sys.modules["pymongo.errors"] = errors
+    sys.modules["pymongo.server_api"] = server_api
+
 # Stub dateutil.parser minimal functionality.
 if "dateutil" not in sys.modules:
     dateutil = types.ModuleType("dateutil")
@@ -243,7 +305,23 @@ if "marshmallow" not in sys.modules:
 
     class fields:
         class String:
-            def __init__(self, required=False, data_key=None):
+            def __init__(self, required=False, data_key=None, **kwargs):
+                self.required = required
+                self.data_key = data_key
+
+        class Integer:
+            def __init__(self, required=False, data_key=None, **kwargs):
+                self.required = required
+                self.data_key = data_key
+
+        class Date:
+            def __init__(self, required=False, data_key=None, **kwargs):
+                self.required = required
+                self.data_key = data_key
+
+        class List:
+            def __init__(self, inner=None, required=False, data_key=None, **kwargs):
+                self.inner = inner
                 self.required = required
                 self.data_key = data_key
 
@@ -263,3 +341,18 @@ if "marshmallow" not in sys.modules:
 @pytest.fixture
 def abort_exc():
     return AbortException
+
+
+@pytest.fixture(autouse=True)
+def _isolated_indexing(monkeypatch, tmp_path):
+    from config import Config
+    from extensions import archive_index, fs_cache, member_cache, negative_cache
+    monkeypatch.setattr(Config, "ARCHIVE_INDEX_ENABLED", False)
+    monkeypatch.setattr(Config, "CACHE_ROOT", str(tmp_path / "_cache"))
+    monkeypatch.setattr(Config, "INDEX_DIR", str(tmp_path / "_index"))
+    monkeypatch.setattr(Config, "DISK_CACHE_DIR", str(tmp_path / "_members"))
+    monkeypatch.setattr(Config, "EXPORT_DIR", str(tmp_path / "_exports"))
+    archive_index.clear()
+    member_cache.reset()
+    negative_cache.reset()
+    fs_cache.reset()
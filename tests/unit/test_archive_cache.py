@@ -0,0 +1,56 @@
+import os
+
+from config import Config
+from extensions import archive_cache
+
+
+def _archive(tmp_path, content=b"archive bytes"):
+    path = tmp_path / "a.tar.gz"
+    path.write_bytes(content)
+    return str(path), os.stat(path)
+
+
+def test_disabled_reads_the_source(tmp_path):
+    path, st = _archive(tmp_path)
+    with archive_cache.open_archive(path, st) as fh:
+        assert fh.read() == b"archive bytes"
+    assert archive_cache.stats() == {"enabled": False}
+
+
+def test_copy_then_open_local(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ARCHIVE_CACHE_DIR", str(tmp_path / "_archives"))
+    path, st = _archive(tmp_path)
+
+    local = archive_cache.copy_archive(path, st)
+    assert open(local, "rb").read() == b"archive bytes"
+
+    os.unlink(path)
+    with archive_cache.open_archive(path, st, promote=False) as fh:
+        fh.seek(8)
+        assert fh.read(5) == b"bytes"
+
+
+def test_changed_source_is_not_served_from_local_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ARCHIVE_CACHE_DIR", str(tmp_path / "_archives"))
+    path, st = _archive(tmp_path)
+    archive_cache.copy_archive(path, st)
+
+    path, st = _archive(tmp_path, b"rewritten archive")
+    with archive_cache.open_archive(path, st, promote=False) as fh:
+        assert fh.read() == b"rewritten archive"
+
+
+def test_copy_sweeps_to_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ARCHIVE_CACHE_DIR", str(tmp_path / "_archives"))
+    monkeypatch.setattr(Config, "ARCHIVE_CACHE_MAX_BYTES", 150)
+    first = tmp_path / "first.tar.gz"
+    second = tmp_path / "second.tar.gz"
+    first.write_bytes(b"x" * 100)
+    second.write_bytes(b"y" * 100)
+
+    first_local = archive_cache.copy_archive(str(first), os.stat(first))
+    os.utime(first_local, (1, 1))
+    second_local = archive_cache.copy_archive(str(second), os.stat(second))
+
+    assert not os.path.exists(first_local)
+    assert os.path.exists(second_local)
@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+from config import Config
+from extensions import archive_tree, fs_cache
+from routes import archives
+from utils import archive
+
+
+def _touch_archive(root, day, name):
+    path = root / "stg-modula-12345" / f"{day:%y}" / f"{day:%m}" / f"{day:%d}" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+
+
+def test_list_archives_filters_and_caches_listings(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FILES_ROOT", str(tmp_path))
+    _touch_archive(tmp_path, date(2023, 11, 30), "123_23-59.tar.gz")
+    _touch_archive(tmp_path, date(2023, 12, 1), "123_08-15.tar.gz")
+    _touch_archive(tmp_path, date(2023, 12, 1), "456_09-00.tar.gz")
+    _touch_archive(tmp_path, date(2023, 12, 1), "notes.txt")
+    _touch_archive(tmp_path, date(2023, 12, 3), "123_10-00.tar.gz")
+
+    result = archives.list_archives(
+        customer="stg-modula-12345", since=date(2023, 11, 30), until=date(2023, 12, 2), branches=["123"]
+    )
+    assert result["archives"] == [
+        {"tar_path": "stg-modula-12345/23/11/30/123_23-59.tar.gz", "date": "2023-11-30", "branch": "123", "time": "23:59"},
+        {"tar_path": "stg-modula-12345/23/12/01/123_08-15.tar.gz", "date": "2023-12-01", "branch": "123", "time": "08:15"},
+    ]
+
+    # Served from cached listings on the next call
+    monkeypatch.setattr(archive.os, "scandir", lambda path: pytest.fail("directory listed again"))
+    monkeypatch.setattr(fs_cache.os, "scandir", lambda path: pytest.fail("directory listed again"))
+    again = archives.list_archives(customer="stg-modula-12345", since=date(2023, 11, 30), until=date(2023, 12, 2))
+    assert len(again["archives"]) == 3
+
+
+def test_settled_directories_are_cached_longer(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FILES_ROOT", str(tmp_path))
+    ttls = {}
+    monkeypatch.setattr(fs_cache, "listdir", lambda path, ttl=None: ttls.__setitem__(path, ttl) or [])
+
+    archive_tree._listdir(str(tmp_path / "stg-modula-12345"))
+    archive_tree._listdir(str(tmp_path / "stg-modula-12345" / "20" / "02"))
+    archive_tree._listdir(str(tmp_path / "stg-modula-12345" / "99" / "01" / "01"))
+
+    assert list(ttls.values()) == [None, Config.ARCHIVE_TREE_SETTLED_TTL, None]
+
+
+def test_list_archives_rejects_bad_ranges(monkeypatch, abort_exc):
+    with pytest.raises(abort_exc) as exc:
+        archives.list_archives(customer="stg-modula-12345", since=date(2023, 12, 2), until=date(2023, 12, 1))
+    assert exc.value.status_code == 400
+
+    monkeypatch.setattr(Config, "ARCHIVE_LIST_MAX_DAYS", 7)
+    with pytest.raises(abort_exc) as exc:
+        archives.list_archives(customer="stg-modula-12345", since=date(2023, 12, 1), until=date(2023, 12, 8))
+    assert exc.value.status_code == 400
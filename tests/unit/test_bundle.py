@@ -0,0 +1,49 @@
+import io
+import tarfile
+import zipfile
+
+from utils.bundle import BundleMember, iter_bundle
+
+
+def _members():
+    return [
+        BundleMember("a.xml", 4, 1700000000, io.BytesIO(b"<a/>")),
+        BundleMember("docs/b.pdf", 3000, 0, io.BytesIO(b"%" * 3000)),
+    ]
+
+
+class _Closer:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_zip_bundle_round_trip():
+    closer = _Closer()
+    data = b"".join(iter_bundle(_members(), "zip", 1024, closer))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as bundle:
+        assert bundle.namelist() == ["a.xml", "docs/b.pdf"]
+        assert bundle.read("a.xml") == b"<a/>"
+        assert bundle.read("docs/b.pdf") == b"%" * 3000
+        assert bundle.getinfo("docs/b.pdf").date_time == (1980, 1, 1, 0, 0, 0)
+    assert closer.closed
+
+
+def test_tar_bundle_round_trip():
+    data = b"".join(iter_bundle(_members(), "tar", 1024))
+
+    with tarfile.open(fileobj=io.BytesIO(data)) as bundle:
+        assert bundle.getnames() == ["a.xml", "docs/b.pdf"]
+        assert bundle.extractfile("a.xml").read() == b"<a/>"
+        assert bundle.getmember("a.xml").mtime == 1700000000
+        assert bundle.extractfile("docs/b.pdf").read() == b"%" * 3000
+
+
+def test_abandoned_bundle_still_closes():
+    closer = _Closer()
+    chunks = iter_bundle(_members(), "tar", 1024, closer)
+    next(chunks)
+    chunks.close()
+    assert closer.closed
@@ -0,0 +1,172 @@
+import io
+import tarfile
+
+import pytest
+
+from config import Config
+from extensions import archive_index, catalog
+from routes import download
+
+KEY = "50606122300310101234500100001010000000019123456789"
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self._docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        return iter(self._docs[:count])
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.docs = {}
+        self.batches = []
+
+    def bulk_write(self, ops, ordered=True):
+        self.batches.append(len(ops))
+        for op in ops:
+            self.docs.setdefault(op._filter["_id"], {}).update(op._doc["$set"])
+
+    def delete_many(self, query):
+        for doc_id, doc in list(self.docs.items()):
+            if doc["tar_path"] == query["tar_path"] and doc["archive_mtime_ns"] != query["archive_mtime_ns"]["$ne"]:
+                del self.docs[doc_id]
+
+    def find(self, query, projection=None):
+        return _Cursor([dict(doc) for doc in self.docs.values() if all(doc.get(k) == v for k, v in query.items())])
+
+
+@pytest.fixture
+def collection(monkeypatch, tmp_path):
+    fake = _FakeCollection()
+    monkeypatch.setattr(Config, "CATALOG_ENABLED", True)
+    monkeypatch.setattr(Config, "FILES_ROOT", str(tmp_path))
+    monkeypatch.setattr(catalog, "get_collection", lambda: fake)
+    return fake
+
+
+def _make_tar(root, day, members):
+    tar_path = root / "stg-modula-12345" / "23" / "12" / day / "123_10-10.tar.gz"
+    tar_path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(tar_path, "w:gz") as tar:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name=name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    return tar_path
+
+
+def test_document_key():
+    assert catalog.document_key(f"FE/{KEY}_firmado.xml") == KEY
+    assert catalog.document_key("reports/summary.v2.pdf") == "summary"
+
+
+def test_build_index_records_members(collection, monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "CATALOG_BATCH_SIZE", 2)
+    tar_path = _make_tar(tmp_path, "30", {"a.xml": b"a", "b.xml": b"b", "c.pdf": b"c"})
+
+    archive_index.build_index(str(tar_path))
+
+    assert collection.batches == [2, 1]
+    doc = collection.docs["stg-modula-12345/23/12/30/123_10-10.tar.gz:c.pdf"]
+    assert (doc["customer"], doc["day"], doc["branch"], doc["key"], doc["size"]) == (
+        "stg-modula-12345", "2023-12-30", "123", "c", 1,
+    )
+
+    # A rewritten archive replaces the members of its previous version
+    _make_tar(tmp_path, "30", {"a.xml": b"new"})
+    archive_index.build_index(str(tar_path))
+    assert sorted(doc["name"] for doc in collection.docs.values()) == ["a.xml"]
+
+
+def test_find_returns_newest_archive_first(collection, tmp_path):
+    for day in ("29", "31", "30"):
+        archive_index.build_index(str(_make_tar(tmp_path, day, {"doc.xml": day.encode()})))
+
+    documents = download.lookup_documents(filename="doc.xml")["documents"]
+    assert [doc["day"] for doc in documents] == ["2023-12-31", "2023-12-30", "2023-12-29"]
+    assert catalog.find(key="doc", customer="other") == []
+
+
+def test_download_by_name_serves_newest_member(collection, monkeypatch, tmp_path):
+    for day in ("29", "31"):
+        archive_index.build_index(str(_make_tar(tmp_path, day, {"doc.xml": day.encode()})))
+
+    captured = {}
+
+    def fake_send_file(fileobj, as_attachment=False, download_name=None, **kwargs):
+        captured["bytes"] = fileobj.getvalue()
+        return download.Response(status=200)
+
+    monkeypatch.setattr(download, "send_file", fake_send_file)
+
+    assert download.download_by_name(filename="doc.xml").status_code == 200
+    assert captured["bytes"] == b"31"
+
+
+def test_download_by_key_uses_catalog_offsets(collection, monkeypatch, tmp_path):
+    tar_path = _make_tar(tmp_path, "30", {"a.xml": b"a" * 700, f"FE/{KEY}_firmado.xml": b"signed"})
+    archive_index.build_index(str(tar_path))
+    # Neither checkpoints nor a sidecar are left: only the catalog knows the offsets
+    archive_index.clear()
+    monkeypatch.setattr(Config, "INDEX_DIR", "")
+    monkeypatch.setattr(archive_index, "schedule_build", lambda path: None)
+
+    captured = {}
+
+    def fake_send_file(fileobj, as_attachment=False, download_name=None, **kwargs):
+        captured["bytes"] = fileobj.getvalue()
+        captured["name"] = download_name
+        return download.Response(status=200)
+
+    monkeypatch.setattr(download, "send_file", fake_send_file)
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: pytest.fail("tar headers walked"))
+
+    assert download.download_by_name(key=KEY).status_code == 200
+    assert captured == {"bytes": b"signed", "name": f"FE/{KEY}_firmado.xml"}
+
+
+def test_download_by_name_ignores_offsets_of_a_rewritten_archive(collection, monkeypatch, tmp_path):
+    tar_path = _make_tar(tmp_path, "30", {"doc.xml": b"old"})
+    archive_index.build_index(str(tar_path))
+    archive_index.clear()
+    monkeypatch.setattr(Config, "INDEX_DIR", "")
+    monkeypatch.setattr(archive_index, "schedule_build", lambda path: None)
+    monkeypatch.setattr(catalog, "record_archive", lambda *a: 0)
+    _make_tar(tmp_path, "30", {"padding.xml": b"p" * 700, "doc.xml": b"new"})
+
+    captured = {}
+
+    def fake_send_file(fileobj, as_attachment=False, download_name=None, **kwargs):
+        captured["bytes"] = fileobj.getvalue()
+        return download.Response(status=200)
+
+    monkeypatch.setattr(download, "send_file", fake_send_file)
+
+    assert download.download_by_name(filename="doc.xml").status_code == 200
+    assert captured["bytes"] == b"new"
+
+
+def test_lookup_errors(collection, monkeypatch, abort_exc):
+    with pytest.raises(abort_exc) as exc:
+        download.lookup_documents()
+    assert exc.value.status_code == 400
+
+    with pytest.raises(abort_exc) as exc:
+        download.download_by_name(filename="missing.xml")
+    assert exc.value.status_code == 404
+
+    with pytest.raises(abort_exc) as exc:
+        download.download_by_name()
+    assert exc.value.status_code == 400
+
+    monkeypatch.setattr(Config, "CATALOG_ENABLED", False)
+    with pytest.raises(abort_exc) as exc:
+        download.lookup_documents(key=KEY)
+    assert exc.value.status_code == 503
@@ -0,0 +1,53 @@
+from utils.conditional import (
+    etag_matches,
+    if_range_matches,
+    is_not_modified,
+    parse_http_date,
+    parse_range_header,
+    resolve_range,
+)
+
+LAST_MODIFIED = 1701388800  # Fri, 01 Dec 2023 00:00:00 GMT
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard():
+    assert etag_matches('"abc"', "abc")
+    assert etag_matches('"x", W/"abc"', "abc")
+    assert etag_matches("*", "abc")
+    assert not etag_matches("*", "abc", wildcard=False)
+    assert etag_matches('*, "abc"', "abc", wildcard=False)
+    assert not etag_matches('"abcd"', "abc")
+    assert not etag_matches(None, "abc")
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    headers = {"If-None-Match": '"other"', "If-Modified-Since": "Sat, 02 Dec 2023 00:00:00 GMT"}
+    assert not is_not_modified(headers, "abc", LAST_MODIFIED)
+
+
+def test_if_modified_since():
+    assert is_not_modified({"If-Modified-Since": "Fri, 01 Dec 2023 00:00:00 GMT"}, "abc", LAST_MODIFIED)
+    assert not is_not_modified({"If-Modified-Since": "Thu, 30 Nov 2023 23:59:59 GMT"}, "abc", LAST_MODIFIED)
+    assert not is_not_modified({"If-Modified-Since": "yesterday"}, "abc", LAST_MODIFIED)
+    assert parse_http_date(None) is None
+
+
+def test_parse_and_resolve_range():
+    assert parse_range_header("bytes=0-99") == (0, 99)
+    assert parse_range_header("bytes=-5") == (None, 5)
+    assert parse_range_header("bytes=10-") == (10, None)
+    for header in (None, "bytes=0-1,4-5", "items=0-1", "bytes=5-1", "bytes=-", "bytes=a-b"):
+        assert parse_range_header(header) is None
+
+    assert resolve_range((0, 99), 10) == (0, 10)
+    assert resolve_range((None, 5), 3) == (0, 3)
+    assert resolve_range((10, None), 10) is None
+    assert resolve_range((None, 0), 10) is None
+
+
+def test_if_range():
+    assert if_range_matches(None, "abc", LAST_MODIFIED)
+    assert if_range_matches('"abc"', "abc", LAST_MODIFIED)
+    assert not if_range_matches('W/"abc"', "abc", LAST_MODIFIED)
+    assert if_range_matches("Fri, 01 Dec 2023 00:00:00 GMT", "abc", LAST_MODIFIED)
+    assert not if_range_matches("Sat, 02 Dec 2023 00:00:00 GMT", "abc", LAST_MODIFIED)
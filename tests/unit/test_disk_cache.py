@@ -0,0 +1,87 @@
+import os
+import time
+
+import pytest
+
+from config import Config
+from extensions import disk_cache
+
+
+def _archive(tmp_path, content=b"archive"):
+    path = tmp_path / "a.tar.gz"
+    path.write_bytes(content)
+    return str(path), os.stat(path)
+
+
+def test_put_and_open_entry(tmp_path):
+    path, st = _archive(tmp_path)
+    assert disk_cache.open_entry(path, st, "doc.xml") is None
+
+    disk_cache.put(path, st, "doc.xml", b"<doc/>")
+    fh, size = disk_cache.open_entry(path, st, "doc.xml")
+    with fh:
+        assert fh.read() == b"<doc/>"
+    assert size == 6
+
+    # A rewritten archive has a different identity
+    path, st = _archive(tmp_path, b"rewritten archive")
+    assert disk_cache.open_entry(path, st, "doc.xml") is None
+
+
+def test_writer_discard_leaves_nothing_behind(tmp_path):
+    path, st = _archive(tmp_path)
+    writer = disk_cache.writer(path, st, "doc.xml", 3)
+    writer.write(b"abc")
+    writer.discard()
+
+    assert disk_cache.open_entry(path, st, "doc.xml") is None
+    leftovers = [name for _, _, names in os.walk(Config.DISK_CACHE_DIR) for name in names]
+    assert leftovers == []
+
+
+def test_writer_skips_oversized_members(tmp_path, monkeypatch):
+    path, st = _archive(tmp_path)
+    monkeypatch.setattr(Config, "DISK_CACHE_MAX_ITEM_BYTES", 2)
+    assert disk_cache.writer(path, st, "doc.xml", 3) is None
+
+
+def test_sweep_evicts_oldest_and_expired(tmp_path, monkeypatch):
+    path, st = _archive(tmp_path)
+    monkeypatch.setattr(Config, "DISK_CACHE_SWEEP_INTERVAL", 3600)
+    for idx in range(4):
+        disk_cache.put(path, st, f"m{idx}", b"x" * 100)
+
+    now = time.time()
+    for idx in range(4):
+        fh, _ = disk_cache.open_entry(path, st, f"m{idx}")
+        fh.close()
+        entry = disk_cache._entry_path(disk_cache._digest(path, st, f"m{idx}"))
+        os.utime(entry, (now - 100 + idx, now - 100 + idx))
+
+    monkeypatch.setattr(Config, "DISK_CACHE_MAX_BYTES", 250)
+    result = disk_cache.sweep()
+    assert result["evicted"] == 2
+    assert disk_cache.open_entry(path, st, "m0") is None
+    assert disk_cache.open_entry(path, st, "m3") is not None
+
+    monkeypatch.setattr(Config, "DISK_CACHE_MAX_AGE", 1)
+    entry = disk_cache._entry_path(disk_cache._digest(path, st, "m3"))
+    os.utime(entry, (now - 10, now - 10))
+    assert disk_cache.sweep()["evicted"] >= 1
+
+
+def test_accel_redirect_requires_the_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "ACCEL_REDIRECT_ENABLED", True)
+    monkeypatch.setattr(Config, "DISK_CACHE_DIR", "")
+    with pytest.raises(RuntimeError):
+        disk_cache.init_app(None)
+
+    warnings = []
+    monkeypatch.setattr(disk_cache.logger, "warning", warnings.append)
+    monkeypatch.setattr(Config, "DISK_CACHE_DIR", str(tmp_path))
+    disk_cache.init_app(None)
+    assert "build/nginx.conf" in warnings[0]
+
+    monkeypatch.setattr(Config, "DISK_CACHE_DIR", disk_cache.NGINX_ACCEL_ALIAS.rstrip("/"))
+    disk_cache.init_app(None)
+    assert len(warnings) == 1
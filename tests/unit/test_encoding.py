@@ -0,0 +1,24 @@
+import gzip
+
+from utils.encoding import accepts_gzip, gzip_bytes, is_compressible
+
+
+def test_is_compressible():
+    assert is_compressible("application/xml")
+    assert is_compressible("text/html")
+    assert not is_compressible("application/pdf")
+    assert not is_compressible(None)
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, gzip;q=0.8")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip(None)
+
+
+def test_gzip_bytes_is_deterministic():
+    data = b"<Factura/>" * 100
+    assert gzip_bytes(data, 6) == gzip_bytes(data, 6)
+    assert gzip.decompress(gzip_bytes(data, 6)) == data
@@ -0,0 +1,127 @@
+import io
+import tarfile
+import zipfile
+from datetime import date
+
+import pytest
+
+import export_runner
+from config import Config
+from extensions import export_jobs
+from routes import exports
+
+
+def _make_archive(root, day, branch, names):
+    tar_path = root / "stg-modula-12345" / f"{day:%y}" / f"{day:%m}" / f"{day:%d}" / f"{branch}_10-10.tar.gz"
+    tar_path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(tar_path, "w:gz") as tar:
+        for name in names:
+            info = tarfile.TarInfo(name=name)
+            info.size = len(name)
+            tar.addfile(info, io.BytesIO(name.encode()))
+
+
+def _wait(job_id):
+    assert export_jobs.get_job(job_id)["status"] == "queued"
+    assert export_runner.main(["--once"]) == 0
+    return export_jobs.get_job(job_id)
+
+
+def test_export_job_bundles_matching_members_across_archives(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FILES_ROOT", str(tmp_path))
+    _make_archive(tmp_path, date(2023, 11, 30), "123", ["a.xml", "a.pdf"])
+    _make_archive(tmp_path, date(2023, 12, 1), "123", ["b.xml"])
+    _make_archive(tmp_path, date(2023, 12, 1), "456", ["c.xml"])
+    _make_archive(tmp_path, date(2023, 12, 2), "123", ["late.xml"])
+
+    state, status = exports.create_export(
+        customer="stg-modula-12345",
+        since=date(2023, 11, 30),
+        until=date(2023, 12, 1),
+        branches=["123"],
+        pattern="*.xml",
+        format="zip",
+    )
+    assert status == 202
+
+    state = _wait(state["id"])
+    assert state["status"] == "done"
+    assert (state["archives_total"], state["archives_done"], state["members"]) == (2, 2, 2)
+
+    with zipfile.ZipFile(export_jobs.output_path(state)) as bundle:
+        assert bundle.namelist() == [
+            "stg-modula-12345/23/11/30/123_10-10/a.xml",
+            "stg-modula-12345/23/12/01/123_10-10/b.xml",
+        ]
+        assert bundle.read("stg-modula-12345/23/12/01/123_10-10/b.xml") == b"b.xml"
+
+
+def test_export_routes_reject_bad_requests(abort_exc):
+    with pytest.raises(abort_exc) as exc:
+        exports.create_export(customer="stg-modula-12345", since=date(2023, 12, 2), until=date(2023, 12, 1))
+    assert exc.value.status_code == 400
+
+    with pytest.raises(abort_exc) as exc:
+        exports.get_export("../../etc/passwd")
+    assert exc.value.status_code == 404
+
+
+def test_unfinished_or_orphaned_exports(tmp_path, monkeypatch, abort_exc):
+    monkeypatch.setattr(Config, "FILES_ROOT", str(tmp_path))
+
+    state = export_jobs.submit("stg-modula-12345", date(2023, 12, 1), date(2023, 12, 1))
+    with pytest.raises(abort_exc) as exc:
+        exports.download_export(state["id"])
+    assert exc.value.status_code == 409
+
+    # Queued jobs wait for a runner however long it takes to start
+    monkeypatch.setattr(export_jobs, "_pid_alive", lambda pid: False)
+    assert exports.get_export(state["id"])["status"] == "queued"
+
+    # The runner that claimed the job is gone
+    assert [claimed["id"] for claimed in export_jobs.claim_queued(5)] == [state["id"]]
+    assert exports.get_export(state["id"])["status"] == "failed"
+
+
+def test_runner_fails_interrupted_jobs_on_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FILES_ROOT", str(tmp_path))
+    interrupted = export_jobs.submit("stg-modula-12345", date(2023, 12, 1), date(2023, 12, 1))
+    export_jobs.claim_queued(1)
+    queued = export_jobs.submit("stg-modula-12345", date(2023, 12, 1), date(2023, 12, 1))
+
+    assert export_runner.main(["--once"]) == 0
+
+    state = export_jobs.get_job(interrupted["id"])
+    assert (state["status"], state["error"]) == ("failed", "Export was interrupted")
+    assert export_jobs.get_job(queued["id"])["status"] == "done"
+
+
+def test_read_ahead_memory_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FILES_ROOT", str(tmp_path))
+    monkeypatch.setattr(Config, "EXPORT_SPOOL_MAX_BYTES", 12)
+    for day in range(1, 6):
+        _make_archive(tmp_path, date(2023, 12, day), "123", [f"{day}-a.xml", f"{day}-b.xml"])
+
+    budgets = []
+    real_budget = export_jobs._MemoryBudget
+
+    def tracked(max_bytes):
+        budget = real_budget(max_bytes)
+        real_acquire = budget.try_acquire
+
+        def try_acquire(size):
+            acquired = real_acquire(size)
+            assert budget._used <= max_bytes
+            return acquired
+
+        budget.try_acquire = try_acquire
+        budgets.append(budget)
+        return budget
+
+    monkeypatch.setattr(export_jobs, "_MemoryBudget", tracked)
+    state, _ = exports.create_export(
+        customer="stg-modula-12345", since=date(2023, 12, 1), until=date(2023, 12, 5), format="tar"
+    )
+    state = _wait(state["id"])
+    assert (state["status"], state["members"]) == ("done", 10)
+    assert budgets[0]._used == 0
@@ -0,0 +1,48 @@
+import pytest
+
+from config import Config
+from extensions import fs_cache
+
+
+def test_stat_is_cached_until_invalidated(tmp_path):
+    path = tmp_path / "a.tar.gz"
+    path.write_bytes(b"v1")
+    first = fs_cache.stat(str(path))
+
+    path.write_bytes(b"version 2")
+    assert fs_cache.stat(str(path)).st_size == first.st_size
+
+    fs_cache.invalidate(str(path))
+    assert fs_cache.stat(str(path)).st_size == len(b"version 2")
+    assert fs_cache.stats()["saved_calls"] == 1
+
+
+def test_missing_paths_are_not_cached(tmp_path):
+    path = tmp_path / "late.tar.gz"
+    with pytest.raises(FileNotFoundError):
+        fs_cache.stat(str(path))
+
+    path.write_bytes(b"landed")
+    assert fs_cache.stat(str(path)).st_size == 6
+
+
+def test_listdir_is_cached_and_invalidated_by_child(tmp_path):
+    (tmp_path / "b").write_bytes(b"")
+    (tmp_path / "a").write_bytes(b"")
+    assert fs_cache.listdir(str(tmp_path)) == ["a", "b"]
+
+    (tmp_path / "c").write_bytes(b"")
+    assert fs_cache.listdir(str(tmp_path)) == ["a", "b"]
+
+    fs_cache.invalidate(str(tmp_path / "c"))
+    assert fs_cache.listdir(str(tmp_path)) == ["a", "b", "c"]
+
+
+def test_disabled_goes_straight_to_the_filesystem(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "FS_CACHE_TTL", 0)
+    path = tmp_path / "a"
+    path.write_bytes(b"1")
+    fs_cache.stat(str(path))
+    path.write_bytes(b"22")
+    assert fs_cache.stat(str(path)).st_size == 2
+    assert fs_cache.stats() == {"enabled": False}
@@ -0,0 +1,134 @@
+import gzip
+import io
+import os
+import tarfile
+
+import pytest
+
+from extensions import archive_index, disk_cache, member_cache
+from utils import archive
+from utils.gzindex import CHECKPOINT_COST, GzipIndex, InflateReader
+from utils.member_index import MemberIndexFile
+
+
+def _payload():
+    # Mix of incompressible and compressible data so checkpoints land at varied offsets
+    return os.urandom(600 * 1024) + bytes(range(256)) * 4000
+
+
+def test_inflate_reader_round_trip_and_checkpoints(tmp_path):
+    data = _payload()
+    gz_path = tmp_path / "blob.gz"
+    gz_path.write_bytes(gzip.compress(data))
+
+    with open(gz_path, "rb") as raw:
+        reader = InflateReader(raw, span=64 * 1024)
+        assert reader.read() == data
+
+    assert len(reader.checkpoints) > 1
+    assert reader.checkpoints[0].uncomp_offset == 0
+
+
+def test_gzip_index_open_at_any_offset(tmp_path):
+    data = _payload()
+    gz_path = tmp_path / "blob.gz"
+    gz_path.write_bytes(gzip.compress(data))
+
+    with open(gz_path, "rb") as raw:
+        reader = InflateReader(raw, span=64 * 1024)
+        reader.read()
+    index = GzipIndex(reader.checkpoints)
+
+    for offset in (0, 1, 300 * 1024, len(data) - 100):
+        with index.open_at(str(gz_path), offset, 50) as part:
+            assert index.checkpoint_for(offset).uncomp_offset <= offset
+            assert part.read() == data[offset:offset + 50]
+            assert part.read() == b""
+
+
+def test_inflate_reader_concatenated_members(tmp_path):
+    gz_path = tmp_path / "multi.gz"
+    gz_path.write_bytes(gzip.compress(b"first-") + gzip.compress(b"second") + b"\x00" * 8)
+
+    with open(gz_path, "rb") as raw:
+        assert InflateReader(raw).read() == b"first-second"
+
+
+def test_inflate_reader_truncated(tmp_path):
+    gz_path = tmp_path / "cut.gz"
+    gz_path.write_bytes(gzip.compress(os.urandom(4096))[:-200])
+
+    with open(gz_path, "rb") as raw:
+        with pytest.raises(EOFError):
+            InflateReader(raw).read()
+
+
+def _make_tar(tmp_path, members):
+    tar_path = tmp_path / "docs.tar.gz"
+    with tarfile.open(tar_path, "w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name=name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return tar_path
+
+
+def test_scan_archive_and_index_cache(tmp_path):
+    tar_path = _make_tar(tmp_path, {"a.xml": b"a.xml" * 1000, "b.xml": b"b.xml" * 1000})
+
+    gzip_index, members = archive.scan_archive(str(tar_path), 64 * 1024)
+    assert set(members) == {"a.xml", "b.xml"}
+
+    index = archive_index.build_index(str(tar_path))
+    st = os.stat(tar_path)
+    assert archive_index.get_index(str(tar_path), st) is index
+    with index.open_member(index.get("b.xml")) as reader:
+        assert reader.read() == b"b.xml" * 1000
+
+    # A different mtime invalidates both the cached index and its sidecar
+    os.utime(tar_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert archive_index.get_index(str(tar_path), os.stat(tar_path)) is None
+
+
+def test_index_over_budget_keeps_members_only(tmp_path, monkeypatch):
+    payload = _payload()
+    tar_path = _make_tar(tmp_path, {"big.bin": payload})
+    monkeypatch.setattr(archive_index.Config, "GZIP_INDEX_SPAN", 64 * 1024)
+    monkeypatch.setattr(archive_index.Config, "GZIP_INDEX_CACHE_MAX_BYTES", 2 * CHECKPOINT_COST)
+
+    index = archive_index.build_index(str(tar_path))
+
+    assert len(index.gzip_index.checkpoints) == 1
+    with index.open_member(index.get("big.bin")) as reader:
+        assert reader.read() == payload
+
+
+def test_sidecar_serves_lookups_after_memory_is_cleared(tmp_path):
+    tar_path = _make_tar(tmp_path, {"a.xml": b"<a/>", "b.xml": b"<b/>"})
+    archive_index.build_index(str(tar_path))
+    archive_index.clear()
+
+    index = archive_index.get_index(str(tar_path), os.stat(tar_path))
+    assert isinstance(index.members, MemberIndexFile)
+    assert index.get("missing.xml") is None
+    with index.open_member(index.get("b.xml")) as reader:
+        assert reader.read() == b"<b/>"
+
+
+def test_build_index_can_fill_the_disk_cache(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, {"a.xml": b"<a/>", "big.pdf": b"x" * 5000, "b.xml": b"<b/>", "c.xml": b"<c/>"})
+    monkeypatch.setattr(archive_index.Config, "PREFETCH_MAX_MEMBER_BYTES", 1024)
+    monkeypatch.setattr(archive_index.Config, "PREFETCH_MAX_BYTES", 8)
+
+    archive_index.build_index(str(tar_path), fill_cache=True)
+
+    st = os.stat(tar_path)
+    for name in ("a.xml", "b.xml"):
+        fh, size = disk_cache.open_entry(str(tar_path), st, name)
+        fh.close()
+        assert size == 4
+    # Too large on its own, then over the per-archive budget
+    assert disk_cache.open_entry(str(tar_path), st, "big.pdf") is None
+    assert disk_cache.open_entry(str(tar_path), st, "c.xml") is None
+    # The per-worker member cache is left to requested members
+    assert member_cache.get(str(tar_path), st, "a.xml") is None
@@ -0,0 +1,100 @@
+import io
+import json
+import os
+import tarfile
+from datetime import date
+
+import index_archives
+from config import Config
+from extensions import archive_index
+from utils.archive import iter_archives
+
+
+def _archive(root, rel_path):
+    path = root / rel_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(path, "w:gz") as tar:
+        info = tarfile.TarInfo("doc.xml")
+        info.size = 4
+        tar.addfile(info, io.BytesIO(b"<x/>"))
+    return path
+
+
+def _tree(root):
+    _archive(root, "stg-modula-12345/23/11/07/001_08-00.tar.gz")
+    _archive(root, "stg-modula-12345/23/11/08/001_12-30.tar.gz")
+    _archive(root, "stg-modula-12345/23/11/08/002_12-30.tar.gz")
+    _archive(root, "prd-modula-54321/23/12/01/001_09-15.tar.gz")
+    _archive(root, "stg-modula-12345/23/11/08/notes.tar.gz")
+    (root / "lost+found").mkdir()
+
+
+def test_iter_archives_filters(tmp_path):
+    _tree(tmp_path)
+
+    everything = [ref.rel_path for ref in iter_archives(str(tmp_path))]
+    assert everything == [
+        "prd-modula-54321/23/12/01/001_09-15.tar.gz",
+        "stg-modula-12345/23/11/07/001_08-00.tar.gz",
+        "stg-modula-12345/23/11/08/001_12-30.tar.gz",
+        "stg-modula-12345/23/11/08/002_12-30.tar.gz",
+    ]
+
+    filtered = list(iter_archives(
+        str(tmp_path),
+        customers=["stg-modula-12345"],
+        since=date(2023, 11, 8),
+        until=date(2023, 11, 30),
+        branches=["002"],
+    ))
+    assert [ref.rel_path for ref in filtered] == ["stg-modula-12345/23/11/08/002_12-30.tar.gz"]
+    assert filtered[0].day == date(2023, 11, 8)
+
+
+def test_bulk_index_and_resume(tmp_path, monkeypatch):
+    root = tmp_path / "bucket"
+    _tree(root)
+    state = tmp_path / "state.jsonl"
+    monkeypatch.setattr(Config, "FILES_ROOT", str(root))
+
+    argv = ["--root", str(root), "--workers", "2", "--state", str(state), "--customer", "stg-modula-12345"]
+    assert index_archives.main(argv) == 0
+
+    indexed = root / "stg-modula-12345/23/11/08/001_12-30.tar.gz"
+    assert archive_index.is_indexed(str(indexed), os.stat(indexed))
+    records = [json.loads(line) for line in state.read_text().splitlines()]
+    assert sorted(r["status"] for r in records) == ["indexed"] * 3
+
+    # A second run resumes from the state file without touching the archives
+    progress = index_archives.run(index_archives._parse_args(argv))
+    assert progress.counts["resumed"] == 3
+    assert progress.counts["indexed"] == 0
+
+    # Without state, current sidecars are detected and skipped
+    state.unlink()
+    progress = index_archives.run(index_archives._parse_args(argv))
+    assert progress.counts["current"] == 3
+
+
+def test_resume_reindexes_rewritten_archives(tmp_path, monkeypatch):
+    root = tmp_path / "bucket"
+    _tree(root)
+    state = tmp_path / "state.jsonl"
+    monkeypatch.setattr(Config, "FILES_ROOT", str(root))
+
+    argv = ["--root", str(root), "--workers", "1", "--state", str(state), "--customer", "prd-modula-54321"]
+    assert index_archives.main(argv) == 0
+
+    # Same path, new contents: the state record no longer matches os.stat
+    rewritten = root / "prd-modula-54321/23/12/01/001_09-15.tar.gz"
+    st = os.stat(rewritten)
+    with tarfile.open(rewritten, "w:gz") as tar:
+        info = tarfile.TarInfo("other.xml")
+        info.size = 8
+        tar.addfile(info, io.BytesIO(b"<other/>"))
+    os.utime(rewritten, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    progress = index_archives.run(index_archives._parse_args(argv))
+    assert progress.counts["resumed"] == 0
+    assert progress.counts["indexed"] == 1
+    assert archive_index.is_indexed(str(rewritten), os.stat(rewritten))
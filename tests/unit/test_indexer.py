@@ -0,0 +1,102 @@
+import io
+import os
+import tarfile
+import time
+
+import pytest
+
+from extensions import archive_index, indexer
+from utils.throttle import RateLimiter
+from utils.time import utc_now
+
+
+def _landed_archive(root, day=None, name="123_10-10.tar.gz", age=60):
+    day = day or utc_now().date()
+    directory = root / "stg-modula-12345" / f"{day:%y}" / f"{day:%m}" / f"{day:%d}"
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    with tarfile.open(path, "w:gz") as tar:
+        info = tarfile.TarInfo("doc.xml")
+        info.size = 4
+        tar.addfile(info, io.BytesIO(b"<x/>"))
+    past = time.time() - age
+    os.utime(path, (past, past))
+    return path
+
+
+def test_scan_indexes_recent_archives(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_index.Config, "FILES_ROOT", str(tmp_path))
+    fresh = _landed_archive(tmp_path)
+    settling = _landed_archive(tmp_path, name="124_10-10.tar.gz", age=0)
+    (tmp_path / "not-a-customer").mkdir()
+
+    watcher = indexer.ArchiveWatcher(str(tmp_path), mode="poll", settle_seconds=5)
+    watcher.scan()
+    watcher._pool.shutdown(wait=True)
+
+    assert archive_index.is_indexed(str(fresh), os.stat(fresh))
+    assert not archive_index.is_indexed(str(settling), os.stat(settling))
+    assert watcher.stats["indexed"] == 1
+
+
+def test_first_scan_skips_already_indexed(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_index.Config, "FILES_ROOT", str(tmp_path))
+    path = _landed_archive(tmp_path)
+    archive_index.build_index(str(path))
+
+    watcher = indexer.ArchiveWatcher(str(tmp_path), mode="poll", settle_seconds=0)
+    monkeypatch.setattr(archive_index, "build_index", lambda *a, **k: pytest.fail("re-indexed"))
+    watcher.scan()
+    watcher._pool.shutdown(wait=True)
+
+    assert watcher.stats["indexed"] == 0
+
+
+def test_only_the_lock_holder_builds(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive_index.Config, "FILES_ROOT", str(tmp_path))
+    path = _landed_archive(tmp_path)
+
+    builder = indexer.ArchiveWatcher(str(tmp_path), mode="poll", settle_seconds=0)
+    assert builder._holds_build_lock()
+    other = indexer.ArchiveWatcher(str(tmp_path), mode="poll", settle_seconds=0)
+    other.scan()
+    other._pool.shutdown(wait=True)
+    assert other.stats["indexed"] == 0
+    assert not archive_index.is_indexed(str(path), os.stat(path))
+
+    # Indexed elsewhere after being queued: the check right before the build skips it
+    builder.stop()
+    archive_index.build_index(str(path))
+    monkeypatch.setattr(archive_index, "build_index", lambda *a, **k: pytest.fail("re-indexed"))
+    successor = indexer.ArchiveWatcher(str(tmp_path), mode="poll", settle_seconds=0)
+    successor.scan()
+    successor._pool.shutdown(wait=True)
+    assert successor.stats == {"scans": 1, "indexed": 0, "failed": 0}
+
+
+def test_inotify_reports_new_files(tmp_path):
+    try:
+        notifier = indexer._Inotify()
+    except (OSError, AttributeError):
+        pytest.skip("inotify not available")
+
+    try:
+        notifier.watch(str(tmp_path))
+        (tmp_path / "123_10-10.tar.gz").write_bytes(b"x")
+        assert notifier.read(2.0) == [str(tmp_path / "123_10-10.tar.gz")]
+    finally:
+        notifier.close()
+
+
+def test_ensure_started_disabled(monkeypatch):
+    monkeypatch.setattr(indexer.Config, "INDEXER_ENABLED", False)
+    assert indexer.ensure_started() is None
+
+
+def test_rate_limiter_blocks_when_over_budget(monkeypatch):
+    slept = []
+    monkeypatch.setattr("utils.throttle.time.sleep", slept.append)
+    limiter = RateLimiter(1000, burst=1000)
+    limiter.consume(1000)
+    limiter.consume(500)
+    assert slept and slept[0] == pytest.approx(0.5, abs=0.05)
@@ -0,0 +1,64 @@
+import threading
+
+from utils.lru import LRUCache
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = LRUCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # a is now most recent
+    cache.put("c", b"1234")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1234"
+    assert cache.current_bytes == 8
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_oversized_values_are_rejected():
+    cache = LRUCache(max_bytes=4)
+    assert cache.put("big", b"12345") is False
+    assert len(cache) == 0
+
+
+def test_ttl_and_entry_limit(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("utils.lru.time.monotonic", lambda: now[0])
+    cache = LRUCache(max_entries=2, ttl=5, sizeof=lambda v: 0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert cache.get("a") is None and cache.evictions == 1
+
+    now[0] += 6
+    assert cache.get("b") is None
+    assert cache.expirations == 1
+
+
+def test_discard_where_and_pop():
+    cache = LRUCache(max_bytes=100)
+    cache.put(("x", 1), b"a")
+    cache.put(("y", 1), b"b")
+    assert cache.discard_where(lambda key: key[0] == "x") == 1
+    assert cache.pop(("y", 1)) == b"b"
+    assert cache.current_bytes == 0
+
+
+def test_concurrent_puts_keep_accounting_consistent():
+    cache = LRUCache(max_bytes=1000)
+
+    def worker(prefix):
+        for i in range(500):
+            cache.put((prefix, i), b"x" * 10)
+            cache.get((prefix, i // 2))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.current_bytes == 10 * len(cache) <= 1000
@@ -0,0 +1,66 @@
+import gzip
+import os
+
+from config import Config
+from extensions import member_cache
+
+XML = b"<FacturaElectronica>" + b"<Linea><Detalle>Servicio</Detalle></Linea>" * 200 + b"</FacturaElectronica>"
+PDF = os.urandom(4096)
+
+
+def test_compressed_tier_round_trips_text_members(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MEMBER_CACHE_COMPRESSION", "zlib")
+    st = os.stat(tmp_path)
+
+    member_cache.put("a.tar.gz", st, "doc.xml", XML)
+    member_cache.put("a.tar.gz", st, "doc.pdf", PDF)
+    assert member_cache.get("a.tar.gz", st, "doc.xml") == XML
+    assert member_cache.get("a.tar.gz", st, "doc.pdf") == PDF
+
+    stats = member_cache.stats()
+    # Only the XML is held compressed; the PDF is stored as is
+    assert len(XML) + len(PDF) > stats["bytes"] > len(PDF)
+    compression = stats["compression"]
+    assert compression["compressed"] == 1
+    assert compression["decompressed"] == 1
+    assert compression["ratio"] > 1
+    assert compression["effective_max_bytes"] > stats["max_bytes"]
+
+
+def test_raw_tier_is_the_default(tmp_path):
+    st = os.stat(tmp_path)
+    member_cache.put("a.tar.gz", st, "doc.xml", XML)
+
+    stats = member_cache.stats()
+    assert stats["bytes"] == len(XML)
+    assert stats["compression"]["ratio"] == 1.0
+    assert member_cache.get("a.tar.gz", st, "doc.xml") == XML
+
+
+def test_gzip_copy_replaces_the_raw_entry(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MEMBER_CACHE_COMPRESSION", "zlib")
+    st = os.stat(tmp_path)
+    gzipped = gzip.compress(XML)
+
+    member_cache.put("a.tar.gz", st, "doc.xml", XML)
+    member_cache.put_gzip("a.tar.gz", st, "doc.xml", gzipped, len(XML))
+
+    stats = member_cache.stats()
+    # One entry per member: identity hits inflate the gzip copy
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len(gzipped)
+    assert member_cache.get_gzip("a.tar.gz", st, "doc.xml") == gzipped
+    assert member_cache.get("a.tar.gz", st, "doc.xml") == XML
+
+
+def test_ratio_reflects_current_contents(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MEMBER_CACHE_COMPRESSION", "zlib")
+    st = os.stat(tmp_path)
+
+    member_cache.put("a.tar.gz", st, "doc.xml", XML)
+    assert member_cache.stats()["compression"]["ratio"] > 1
+
+    member_cache.get_cache().pop(member_cache.member_key("a.tar.gz", st, "doc.xml"))
+    member_cache.put("a.tar.gz", st, "doc.pdf", PDF)
+    # The compressed XML is gone, so it no longer inflates the ratio
+    assert member_cache.stats()["compression"]["ratio"] == 1.0
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from utils.archive import MemberEntry
+from utils.member_index import MemberIndexFile, write_member_index
+
+
+def _entries():
+    return [
+        MemberEntry("b.xml", 10, 1700000000, 512, 1024),
+        MemberEntry("a.xml", 20, 1700000001, 0, 512),
+        MemberEntry("ñ.html", 30, 1700000002, 2048, 2560),
+    ]
+
+
+def test_write_and_lookup(tmp_path):
+    archive = tmp_path / "archive.tar.gz"
+    archive.write_bytes(b"x")
+    st = os.stat(archive)
+    index_path = tmp_path / "idx" / "archive.idx"
+
+    write_member_index(str(index_path), st, _entries())
+    index = MemberIndexFile.open(str(index_path))
+
+    assert len(index) == 3
+    assert index.is_current(st)
+    assert index.get("a.xml") == MemberEntry("a.xml", 20, 1700000001, 0, 512)
+    assert index.get("ñ.html").offset_data == 2560
+    assert index.get("c.xml") is None
+    assert "b.xml" in index
+    assert [entry.name for entry in index] == ["a.xml", "b.xml", "ñ.html"]
+
+    archive.write_bytes(b"changed")
+    assert not index.is_current(os.stat(archive))
+
+
+def test_rejects_garbage(tmp_path):
+    bad = tmp_path / "bad.idx"
+    bad.write_bytes(b"not an index file at all, definitely not")
+    with pytest.raises(ValueError):
+        MemberIndexFile.open(str(bad))
@@ -0,0 +1,28 @@
+import os
+
+from config import Config
+from extensions import negative_cache
+
+
+def test_member_entries_are_keyed_on_archive_version(tmp_path):
+    archive = tmp_path / "a.tar.gz"
+    archive.write_bytes(b"v1")
+    st = os.stat(archive)
+    negative_cache.add_member(str(archive), st, "doc.xml")
+    assert negative_cache.member_missing(str(archive), st, "doc.xml")
+    assert not negative_cache.member_missing(str(archive), st, "other.xml")
+
+    archive.write_bytes(b"version 2")
+    assert not negative_cache.member_missing(str(archive), os.stat(archive), "doc.xml")
+
+
+def test_archive_entries_expire_and_can_be_forgotten(monkeypatch):
+    negative_cache.add_archive("/bucket/a.tar.gz")
+    assert negative_cache.archive_missing("/bucket/a.tar.gz")
+
+    negative_cache.forget_archive("/bucket/a.tar.gz")
+    assert not negative_cache.archive_missing("/bucket/a.tar.gz")
+
+    monkeypatch.setattr(Config, "NEGATIVE_CACHE_ARCHIVE_TTL", 0)
+    negative_cache.add_archive("/bucket/a.tar.gz")
+    assert not negative_cache.archive_missing("/bucket/a.tar.gz")
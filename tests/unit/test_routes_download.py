@@ -1,15 +1,33 @@
+import gzip
 import io
 import os
 import tarfile
+import threading
+import time
+import zipfile
+from email.utils import formatdate
 
 import pytest
 
 from config import Config
+from extensions import archive_index, disk_cache, fs_cache, member_cache
 from routes import download
 
 
+class _SentBytes(bytes):
+    """Member bytes standing in for a ``send_file`` response."""
+
+    status_code = 200
+
+
+def _send_bytes(fileobj, **kwargs):
+    sent = _SentBytes(fileobj.getvalue())
+    sent.headers = {}
+    return sent
+
+
 def _make_tar(tmp_path, filename="file.txt", content=b"data"):
-    tar_path = tmp_path / "stg-modula-12345" / "23" / "12" / "31" / "123" / "01_10-10.tar.gz"
+    tar_path = tmp_path / "stg-modula-12345" / "23" / "12" / "31" / "123_10-10.tar.gz"
     tar_path.parent.mkdir(parents=True, exist_ok=True)
     with tarfile.open(tar_path, "w:gz") as tar:
         info = tarfile.TarInfo(name=filename)
@@ -24,17 +42,18 @@ def test_download_file_success(tmp_path, monkeypatch):
 
     captured = {}
 
-    def fake_send_file(fileobj, as_attachment=False, download_name=None):
+    def fake_send_file(fileobj, as_attachment=False, download_name=None, **kwargs):
         captured["bytes"] = fileobj.getvalue()
         captured["download_name"] = download_name
-        return "ok"
+        return download.Response(status=200)
 
     monkeypatch.setattr(download, "send_file", fake_send_file)
 
     tar_rel = tar_path.relative_to(Config.FILES_ROOT)
     result = download.download_file(filename="doc.pdf", tar_path=str(tar_rel))
 
-    assert result == "ok"
+    assert result.status_code == 200
+    assert "immutable" in result.headers["Cache-Control"]
     assert captured["bytes"] == b"pdf-bytes"
     assert captured["download_name"] == "doc.pdf"
 
@@ -69,7 +88,7 @@ def test_download_file_empty_group(monkeypatch, abort_exc):
 
 def test_download_file_missing_tar(tmp_path, abort_exc):
     Config.FILES_ROOT = str(tmp_path)
-    tar_rel = os.path.join("stg-modula-12345", "23", "12", "31", "123", "01_10-10.tar.gz")
+    tar_rel = os.path.join("stg-modula-12345", "23", "12", "31", "123_10-10.tar.gz")
 
     with pytest.raises(abort_exc) as exc:
         download.download_file(filename="file.txt", tar_path=tar_rel)
@@ -77,7 +96,7 @@ def test_download_file_missing_tar(tmp_path, abort_exc):
 
 
 def test_download_file_tar_error(tmp_path, abort_exc, monkeypatch):
-    bad_tar = tmp_path / "stg-modula-12345" / "23" / "12" / "31" / "123" / "01_10-10.tar.gz"
+    bad_tar = tmp_path / "stg-modula-12345" / "23" / "12" / "31" / "123_10-10.tar.gz"
     bad_tar.parent.mkdir(parents=True, exist_ok=True)
     bad_tar.write_text("not-a-tar")
     Config.FILES_ROOT = str(tmp_path)
@@ -110,8 +129,8 @@ def test_download_file_extract_none(tmp_path, abort_exc, monkeypatch):
     tar_rel = tar_path.relative_to(Config.FILES_ROOT)
 
     class FakeTar:
-        def getmember(self, name):
-            return name
+        def __iter__(self):
+            return iter([tarfile.TarInfo("doc.txt")])
         def extractfile(self, member):
             return None
         def __enter__(self): return self
@@ -121,3 +140,483 @@ def test_download_file_extract_none(tmp_path, abort_exc, monkeypatch):
     with pytest.raises(abort_exc) as exc:
         download.download_file(filename="doc.txt", tar_path=str(tar_rel))
     assert exc.value.status_code == 404
+
+
+def test_download_file_streams_large_members(tmp_path, monkeypatch):
+    content = b"x" * 5000
+    tar_path = _make_tar(tmp_path, filename="big.pdf", content=content)
+    Config.FILES_ROOT = str(tmp_path)
+    monkeypatch.setattr(Config, "DOWNLOAD_BUFFER_MAX_BYTES", 1024)
+    monkeypatch.setattr(Config, "DOWNLOAD_CHUNK_SIZE", 1000)
+    monkeypatch.setattr(download, "send_file", lambda *a, **k: pytest.fail("large member was buffered"))
+
+    tar_rel = tar_path.relative_to(Config.FILES_ROOT)
+    response = download.download_file(filename="big.pdf", tar_path=str(tar_rel))
+
+    assert response.headers["Content-Length"] == "5000"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="big.pdf"'
+    assert response.mimetype == "application/pdf"
+    chunks = list(response.response)
+    assert max(len(c) for c in chunks) <= 1000
+    assert b"".join(chunks) == content
+
+
+def test_content_disposition_non_ascii():
+    assert download._content_disposition("fáctura.xml") == "attachment; filename*=UTF-8''f%C3%A1ctura.xml"
+
+
+def test_download_file_uses_archive_index(tmp_path, monkeypatch, abort_exc):
+    tar_path = _make_tar(tmp_path, filename="doc.xml", content=b"<xml/>")
+    Config.FILES_ROOT = str(tmp_path)
+    archive_index.build_index(str(tar_path))
+
+    def no_stream(*_a, **_k):
+        raise AssertionError("indexed archive was scanned")
+
+    monkeypatch.setattr(download, "open_archive_stream", no_stream)
+    monkeypatch.setattr(download, "send_file", _send_bytes)
+
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    assert download.download_file(filename="doc.xml", tar_path=tar_rel) == b"<xml/>"
+
+    # Index is authoritative for misses as well
+    with pytest.raises(abort_exc) as exc:
+        download.download_file(filename="missing.xml", tar_path=tar_rel)
+    assert exc.value.status_code == 404
+
+
+def test_download_file_serves_repeats_from_member_cache(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="doc.html", content=b"<html/>")
+    Config.FILES_ROOT = str(tmp_path)
+    monkeypatch.setattr(download, "send_file", _send_bytes)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+
+    assert download.download_file(filename="doc.html", tar_path=tar_rel) == b"<html/>"
+
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: pytest.fail("archive reopened"))
+    assert download.download_file(filename="doc.html", tar_path=tar_rel) == b"<html/>"
+    assert member_cache.stats()["hits"] == 1
+
+
+def test_streamed_member_is_served_from_disk_cache(tmp_path, monkeypatch):
+    content = b"%PDF" + b"x" * 4000
+    tar_path = _make_tar(tmp_path, filename="big.pdf", content=content)
+    Config.FILES_ROOT = str(tmp_path)
+    monkeypatch.setattr(Config, "DOWNLOAD_BUFFER_MAX_BYTES", 1024)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+
+    first = download.download_file(filename="big.pdf", tar_path=tar_rel)
+    assert b"".join(first.response) == content
+
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: pytest.fail("archive reopened"))
+    second = download.download_file(filename="big.pdf", tar_path=tar_rel)
+    assert second.headers["Content-Length"] == str(len(content))
+    assert b"".join(second.response) == content
+
+
+def test_abandoned_stream_is_not_cached(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="big.pdf", content=b"y" * 5000)
+    Config.FILES_ROOT = str(tmp_path)
+    monkeypatch.setattr(Config, "DOWNLOAD_BUFFER_MAX_BYTES", 1024)
+    monkeypatch.setattr(Config, "DOWNLOAD_CHUNK_SIZE", 1000)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+
+    response = download.download_file(filename="big.pdf", tar_path=tar_rel)
+    next(response.response)
+    response.response.close()  # client went away
+
+    st = os.stat(tar_path)
+    assert disk_cache.open_entry(str(tar_path), st, "big.pdf") is None
+
+
+def test_missing_member_is_negatively_cached_until_archive_changes(tmp_path, monkeypatch, abort_exc):
+    tar_path = _make_tar(tmp_path, filename="other.txt")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+
+    with pytest.raises(abort_exc):
+        download.download_file(filename="late.txt", tar_path=tar_rel)
+
+    with monkeypatch.context() as patched:
+        patched.setattr(download, "open_archive_stream", lambda *a: pytest.fail("archive rescanned"))
+        with pytest.raises(abort_exc) as exc:
+            download.download_file(filename="late.txt", tar_path=tar_rel)
+        assert exc.value.status_code == 404
+
+    # The archive is rewritten with the member; once its stat is refreshed
+    # (as the watcher does), the new mtime/size bypass the entry
+    _make_tar(tmp_path, filename="late.txt", content=b"arrived")
+    os.utime(tar_path, ns=(1, 1))
+    fs_cache.invalidate(str(tar_path))
+    monkeypatch.setattr(download, "send_file", _send_bytes)
+    assert download.download_file(filename="late.txt", tar_path=tar_rel) == b"arrived"
+
+
+def test_missing_archive_is_negatively_cached(tmp_path, monkeypatch, abort_exc):
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = os.path.join("stg-modula-12345", "23", "12", "31", "123_10-10.tar.gz")
+
+    with pytest.raises(abort_exc):
+        download.download_file(filename="file.txt", tar_path=tar_rel)
+
+    monkeypatch.setattr(download.os, "stat", lambda path: pytest.fail("archive stat repeated"))
+    with pytest.raises(abort_exc) as exc:
+        download.download_file(filename="file.txt", tar_path=tar_rel)
+    assert exc.value.status_code == 404
+
+
+def test_identical_concurrent_downloads_share_one_extraction(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="doc.xml", content=b"<doc/>")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(download, "send_file", _send_bytes)
+
+    opened = []
+    real_open = download.open_archive_stream
+
+    def slow_open(*args):
+        opened.append(args[0])
+        # Hold the leader until the second request has joined its flight
+        while not download._FLIGHTS._calls or next(iter(download._FLIGHTS._calls.values())).waiters < 1:
+            time.sleep(0.001)
+        return real_open(*args)
+
+    monkeypatch.setattr(download, "open_archive_stream", slow_open)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(download.download_file(filename="doc.xml", tar_path=tar_rel)))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [b"<doc/>", b"<doc/>"]
+    assert len(opened) == 1
+
+
+def test_concurrent_downloads_of_one_archive_share_a_pass(tmp_path, monkeypatch):
+    tar_path = tmp_path / "stg-modula-12345" / "23" / "12" / "31" / "123_10-10.tar.gz"
+    tar_path.parent.mkdir(parents=True)
+    with tarfile.open(tar_path, "w:gz") as tar:
+        for name in ("a.xml", "a.pdf", "a.html"):
+            info = tarfile.TarInfo(name=name)
+            info.size = len(name)
+            tar.addfile(info, io.BytesIO(name.encode()))
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(download, "send_file", _send_bytes)
+    monkeypatch.setattr(download._BATCHES, "window", 0.05)
+
+    opened = []
+    real_open = download.open_archive_stream
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: opened.append(a[0]) or real_open(*a))
+
+    results = {}
+    threads = [
+        threading.Thread(
+            target=lambda name=name: results.__setitem__(name, download.download_file(filename=name, tar_path=tar_rel))
+        )
+        for name in ("a.xml", "a.pdf", "a.html")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {"a.xml": b"a.xml", "a.pdf": b"a.pdf", "a.html": b"a.html"}
+    assert len(opened) == 1
+
+
+def _make_invoice_tar(tmp_path):
+    tar_path = tmp_path / "stg-modula-12345" / "23" / "12" / "31" / "123_10-10.tar.gz"
+    tar_path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(tar_path, "w:gz") as tar:
+        for name in ("K1.xml", "K1-signed.xml", "K1.pdf", "K2.xml"):
+            info = tarfile.TarInfo(name=name)
+            info.size = len(name)
+            tar.addfile(info, io.BytesIO(name.encode()))
+    Config.FILES_ROOT = str(tmp_path)
+    return str(tar_path.relative_to(tmp_path))
+
+
+def test_download_batch_zip_by_filenames(tmp_path):
+    tar_rel = _make_invoice_tar(tmp_path)
+
+    response = download.download_batch(tar_path=tar_rel, filenames=["K1.pdf", "K2.xml", "nope.xml"], format="zip")
+
+    assert response.mimetype == "application/zip"
+    assert response.headers["Content-Disposition"] == 'attachment; filename="123_10-10.zip"'
+    with zipfile.ZipFile(io.BytesIO(b"".join(response.response))) as bundle:
+        assert bundle.namelist() == ["K1.pdf", "K2.xml"]
+        assert bundle.read("K2.xml") == b"K2.xml"
+
+
+def test_download_batch_tar_by_prefix(tmp_path):
+    tar_rel = _make_invoice_tar(tmp_path)
+
+    response = download.download_batch(tar_path=tar_rel, prefix="K1", format="tar")
+
+    with tarfile.open(fileobj=io.BytesIO(b"".join(response.response))) as bundle:
+        assert bundle.getnames() == ["K1.xml", "K1-signed.xml", "K1.pdf"]
+
+
+def test_download_batch_errors(tmp_path, abort_exc):
+    tar_rel = _make_invoice_tar(tmp_path)
+
+    with pytest.raises(abort_exc) as exc:
+        download.download_batch(tar_path=tar_rel)
+    assert exc.value.status_code == 400
+
+    with pytest.raises(abort_exc) as exc:
+        download.download_batch(tar_path=tar_rel, pattern="*.json")
+    assert exc.value.status_code == 404
+
+
+def test_head_returns_member_metadata_without_body(tmp_path, monkeypatch, abort_exc):
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=b"pdf-bytes")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(download.request, "method", "HEAD")
+    monkeypatch.setattr(download, "send_file", lambda *a, **k: pytest.fail("body sent"))
+
+    response = download.download_file(filename="doc.pdf", tar_path=tar_rel)
+    assert response.response is None
+    assert response.mimetype == "application/pdf"
+    assert response.headers["Content-Length"] == "9"
+    assert response.headers["Last-Modified"].endswith("GMT")
+
+    # Served from the index once it exists
+    archive_index.build_index(str(tar_path))
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: pytest.fail("archive scanned"))
+    assert download.download_file(filename="doc.pdf", tar_path=tar_rel).headers["Content-Length"] == "9"
+    with pytest.raises(abort_exc) as exc:
+        download.download_file(filename="missing.pdf", tar_path=tar_rel)
+    assert exc.value.status_code == 404
+
+
+def test_list_members_pages_by_prefix(tmp_path):
+    tar_rel = _make_invoice_tar(tmp_path)
+
+    page = download.list_members(tar_path=tar_rel, prefix="K1", limit=2)
+    assert [m["name"] for m in page["members"]] == ["K1-signed.xml", "K1.pdf"]
+    assert page["members"][1]["size"] == len("K1.pdf")
+    assert page["next_after"] == "K1.pdf"
+
+    page = download.list_members(tar_path=tar_rel, prefix="K1", after=page["next_after"], limit=2)
+    assert [m["name"] for m in page["members"]] == ["K1.xml"]
+    assert page["next_after"] is None
+
+    everything = download.list_members(tar_path=tar_rel)
+    assert [m["name"] for m in everything["members"]] == ["K1-signed.xml", "K1.pdf", "K1.xml", "K2.xml"]
+
+
+def test_conditional_get_answers_304_without_opening_archive(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=b"pdf-bytes")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(download.request, "headers", {})
+
+    first = download.download_file(filename="doc.pdf", tar_path=tar_rel)
+    etag = first["etag"]
+    assert first["last_modified"] == int(tar_path.stat().st_mtime)
+
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: pytest.fail("archive opened"))
+    monkeypatch.setattr(download.member_cache, "get", lambda *a: pytest.fail("cache read"))
+    monkeypatch.setattr(download.request, "headers", {"If-None-Match": f'W/"other", "{etag}"'})
+    response = download.download_file(filename="doc.pdf", tar_path=tar_rel)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"{etag}"'
+
+    monkeypatch.setattr(download.request, "headers", {"If-Modified-Since": response.headers["Last-Modified"]})
+    assert download.download_file(filename="doc.pdf", tar_path=tar_rel).status_code == 304
+
+
+def test_if_modified_since_confirms_the_member(tmp_path, monkeypatch, abort_exc):
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=b"%PDF-1.4")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    since = formatdate(tar_path.stat().st_mtime + 60, usegmt=True)
+
+    # The date holds for the whole archive, including names it does not have
+    for headers in ({"If-Modified-Since": since}, {"If-None-Match": "*"}):
+        monkeypatch.setattr(download.request, "headers", headers)
+        with pytest.raises(abort_exc) as exc:
+            download.download_file(filename="missing.pdf", tar_path=tar_rel)
+        assert exc.value.status_code == 404
+        assert download.download_file(filename="doc.pdf", tar_path=tar_rel).status_code == 304
+
+
+def test_rewritten_archive_changes_etag(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=b"old")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(download.request, "headers", {})
+    etag = download.download_file(filename="doc.pdf", tar_path=tar_rel)["etag"]
+
+    _make_tar(tmp_path, filename="doc.pdf", content=b"new-bytes")
+    os.utime(tar_path, ns=(0, tar_path.stat().st_mtime_ns + 10**9))
+    fs_cache.invalidate(str(tar_path))
+    monkeypatch.setattr(download.request, "headers", {"If-None-Match": f'"{etag}"'})
+
+    result = download.download_file(filename="doc.pdf", tar_path=tar_rel)
+    assert result["file"] == b"new-bytes"
+    assert result["etag"] != etag
+
+
+def _range(monkeypatch, tar_rel, header, if_range=None):
+    headers = {"Range": header}
+    if if_range is not None:
+        headers["If-Range"] = if_range
+    monkeypatch.setattr(download.request, "headers", headers)
+    return download.download_file(filename="doc.pdf", tar_path=tar_rel)
+
+
+def test_range_requests_from_each_source(tmp_path, monkeypatch):
+    content = bytes(range(256)) * 40
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=content)
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+
+    # Unindexed archive: read up to the range while the index is built
+    response = _range(monkeypatch, tar_rel, "bytes=-100")
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == f"bytes {len(content) - 100}-{len(content) - 1}/{len(content)}"
+    assert b"".join(response.response) == content[-100:]
+
+    # Indexed archive: seek through the gzip checkpoints
+    archive_index.build_index(str(tar_path))
+    real_stream = download.open_archive_stream
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: pytest.fail("archive scanned"))
+    response = _range(monkeypatch, tar_rel, "bytes=5000-5099")
+    assert response.headers["Content-Length"] == "100"
+    assert b"".join(response.response) == content[5000:5100]
+    monkeypatch.setattr(download, "open_archive_stream", real_stream)
+
+    # Disk cache entry: seek the extracted copy
+    disk_cache.put(str(tar_path), tar_path.stat(), "doc.pdf", content)
+    monkeypatch.setattr(download.archive_index, "get_index", lambda *a: pytest.fail("index used"))
+    response = _range(monkeypatch, tar_rel, "bytes=10-")
+    assert b"".join(response.response) == content[10:]
+
+    # Member cache: slice the cached bytes
+    member_cache.put(str(tar_path), tar_path.stat(), "doc.pdf", content)
+    monkeypatch.setattr(download.disk_cache, "open_entry", lambda *a: pytest.fail("disk used"))
+    response = _range(monkeypatch, tar_rel, "bytes=0-0")
+    assert b"".join(response.response) == content[:1]
+
+    response = _range(monkeypatch, tar_rel, f"bytes={len(content)}-")
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(content)}"
+
+
+def test_if_range_mismatch_serves_whole_member(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=b"pdf-bytes")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+
+    result = _range(monkeypatch, tar_rel, "bytes=0-2", if_range='"stale"')
+    assert result["file"] == b"pdf-bytes"
+
+    response = _range(monkeypatch, tar_rel, "bytes=0-2", if_range=f'"{result["etag"]}"')
+    assert b"".join(response.response) == b"pdf"
+
+    # Several ranges get the whole member; Werkzeug must not answer them with 416
+    result = _range(monkeypatch, tar_rel, "bytes=0-1,5-6")
+    assert (result["file"], result["conditional"]) == (b"pdf-bytes", False)
+
+
+def test_accel_redirect_hands_member_to_nginx(tmp_path, monkeypatch):
+    content = b"x" * 4096
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=content)
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(Config, "ACCEL_REDIRECT_ENABLED", True)
+    monkeypatch.setattr(Config, "DOWNLOAD_BUFFER_MAX_BYTES", 1024)
+    monkeypatch.setattr(download.request, "headers", {})
+    monkeypatch.setattr(download, "send_file", lambda *a, **k: pytest.fail("body sent"))
+
+    response = download.download_file(filename="doc.pdf", tar_path=tar_rel)
+    location = response.headers["X-Accel-Redirect"]
+    assert location.startswith(Config.ACCEL_REDIRECT_PREFIX)
+    entry = os.path.join(Config.DISK_CACHE_DIR, location[len(Config.ACCEL_REDIRECT_PREFIX):])
+    with open(entry, "rb") as fh:
+        assert fh.read() == content
+    assert os.stat(entry).st_mode & 0o044 == 0o044
+    assert response.headers["ETag"].startswith('"')
+    assert "Content-Length" not in response.headers
+    assert response.headers["X-Accel-Expires"] == "0"
+
+    # The second request only locates the entry
+    monkeypatch.setattr(download, "open_archive_stream", lambda *a: pytest.fail("archive opened"))
+    assert download.download_file(filename="doc.pdf", tar_path=tar_rel).headers["X-Accel-Redirect"] == location
+
+
+def test_accel_redirect_falls_back_when_member_is_not_cacheable(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=b"pdf-bytes")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(Config, "ACCEL_REDIRECT_ENABLED", True)
+    monkeypatch.setattr(Config, "DISK_CACHE_MAX_ITEM_BYTES", 4)
+    monkeypatch.setattr(download.request, "headers", {})
+
+    assert download.download_file(filename="doc.pdf", tar_path=tar_rel)["file"] == b"pdf-bytes"
+
+    # An indexed archive knows the size up front, so the member is inflated once
+    archive_index.build_index(str(tar_path))
+    member_cache.reset()
+    monkeypatch.setattr(download, "_fill_disk_cache", lambda *a: pytest.fail("inflated for the disk cache"))
+    assert download.download_file(filename="doc.pdf", tar_path=tar_rel)["file"] == b"pdf-bytes"
+
+
+def test_download_cache_headers(tmp_path, monkeypatch):
+    tar_path = _make_tar(tmp_path, filename="doc.pdf", content=b"pdf-bytes")
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+    monkeypatch.setattr(download.request, "headers", {})
+    monkeypatch.setattr(Config, "DOWNLOAD_CACHE_MAX_AGE", 600)
+    monkeypatch.setattr(Config, "DOWNLOAD_PROXY_CACHE_TTL", 60)
+
+    headers = download.download_file(filename="doc.pdf", tar_path=tar_rel).headers
+    assert headers["Cache-Control"] == "private, max-age=600, immutable"
+    assert headers["X-Accel-Expires"] == "60"
+    assert "Vary" not in headers
+
+    monkeypatch.setattr(Config, "DOWNLOAD_CACHE_MAX_AGE", 0)
+    monkeypatch.setattr(download.request, "headers", {"If-None-Match": headers["ETag"]})
+    response = download.download_file(filename="doc.pdf", tar_path=tar_rel)
+    assert response.status_code == 304
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    monkeypatch.setattr(download.request, "headers", {"Range": "bytes=100-"})
+    assert "Cache-Control" not in download.download_file(filename="doc.pdf", tar_path=tar_rel).headers
+
+
+def test_text_members_are_served_from_a_cached_gzip_copy(tmp_path, monkeypatch):
+    content = b"<FacturaElectronica>" + b"<Linea>1</Linea>" * 200 + b"</FacturaElectronica>"
+    tar_path = _make_tar(tmp_path, filename="doc.xml", content=content)
+    Config.FILES_ROOT = str(tmp_path)
+    tar_rel = str(tar_path.relative_to(Config.FILES_ROOT))
+
+    monkeypatch.setattr(download.request, "headers", {})
+    plain = download.download_file(filename="doc.xml", tar_path=tar_rel)
+    assert plain["file"] == content
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    monkeypatch.setattr(download.request, "headers", {"Accept-Encoding": "gzip, br"})
+    response = download.download_file(filename="doc.xml", tar_path=tar_rel)
+    body = b"".join(response.response)
+    assert gzip.decompress(body) == content
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Length"] == str(len(body))
+    assert response.headers["ETag"] == f'W/"{plain["etag"]}"'
+
+    # Later requests reuse the compressed copy
+    monkeypatch.setattr(download, "gzip_bytes", lambda *a: pytest.fail("compressed again"))
+    assert b"".join(download.download_file(filename="doc.xml", tar_path=tar_rel).response) == body
+
+    # Members below GZIP_MEMBERS_MIN_BYTES are sent as they are
+    monkeypatch.setattr(Config, "GZIP_MEMBERS_MIN_BYTES", len(content) + 1)
+    member_cache.reset()
+    assert download.download_file(filename="doc.xml", tar_path=tar_rel)["file"] == content
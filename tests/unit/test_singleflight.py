@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import FlightTimeout, MicroBatcher, SingleFlight
+
+
+def _run_waiter(flights, key, results, timeout=5):
+    try:
+        results.append(flights.do(key, lambda: "not shared", timeout=timeout))
+    except Exception as exc:
+        results.append(exc)
+
+
+def _wait_for_waiters(flights, key, count):
+    while flights._calls[key].waiters < count:
+        time.sleep(0.001)
+
+
+def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return b"payload"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=_run_waiter, args=(flights, "k", results)) for _ in range(3)]
+    for waiter in waiters:
+        waiter.start()
+    _wait_for_waiters(flights, "k", 3)
+    release.set()
+    for thread in [leader, *waiters]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert sorted(results, key=lambda r: r[1]) == [(b"payload", False)] + [(b"payload", True)] * 3
+    assert flights.stats["shared"] == 3
+
+
+def test_errors_reach_waiters_and_are_not_remembered():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    leader_errors, results = [], []
+
+    def lead():
+        try:
+            flights.do("k", failing)
+        except ValueError as exc:
+            leader_errors.append(exc)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(5)
+    waiter = threading.Thread(target=_run_waiter, args=(flights, "k", results))
+    waiter.start()
+    _wait_for_waiters(flights, "k", 1)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+
+    assert isinstance(leader_errors[0], ValueError)
+    assert results[0] is leader_errors[0]
+    assert flights.do("k", lambda: "fresh") == ("fresh", False)
+
+
+def test_waiter_times_out():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    leader = threading.Thread(target=flights.do, args=("k", slow))
+    leader.start()
+    started.wait(5)
+    with pytest.raises(FlightTimeout):
+        flights.do("k", lambda: None, timeout=0.01)
+    release.set()
+    leader.join(5)
+    assert flights.stats["timeouts"] == 1
+
+
+def test_micro_batcher_runs_one_batch_per_window():
+    batcher = MicroBatcher(window=0.05)
+    batches = []
+
+    def run(items):
+        batches.append(items)
+        return {item: item.upper() for item in items if item != "missing"}
+
+    results = {}
+    threads = [
+        threading.Thread(target=lambda item=item: results.__setitem__(item, batcher.submit("archive", item, run)))
+        for item in ("a", "b", "missing")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert batches == [frozenset({"a", "b", "missing"})]
+    assert results == {"a": "A", "b": "B", "missing": None}
+    # The window has closed; a later call starts a new batch
+    assert batcher.submit("archive", "c", run) == "C"
+    assert batcher.stats["batches"] == 2
@@ -0,0 +1,88 @@
+import io
+import tarfile
+import tracemalloc
+
+from utils import archive
+
+
+def _make_tar(tmp_path, names):
+    tar_path = tmp_path / "multi.tar.gz"
+    with tarfile.open(tar_path, "w:gz") as tar:
+        for name in names:
+            data = name.encode()
+            info = tarfile.TarInfo(name=name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return tar_path
+
+
+def test_find_member_stops_at_first_match(tmp_path):
+    tar_path = _make_tar(tmp_path, ["a.xml", "b.xml", "c.xml"])
+
+    with archive.open_archive_stream(str(tar_path)) as tar:
+        member = archive.find_member(tar, "a.xml")
+        assert member is not None and member.name == "a.xml"
+        # Only the first header was read from the stream
+        assert len(tar.members) == 1
+        assert tar.extractfile(member).read() == b"a.xml"
+
+
+def test_find_member_missing_scans_everything(tmp_path):
+    tar_path = _make_tar(tmp_path, ["a.xml", "b.xml"])
+
+    with archive.open_archive_stream(str(tar_path)) as tar:
+        assert archive.find_member(tar, "zzz.xml") is None
+        assert len(tar.members) == 2
+
+
+def test_find_members_yields_in_archive_order_and_stops_early(tmp_path):
+    tar_path = _make_tar(tmp_path, ["a.xml", "b.xml", "c.xml", "d.xml"])
+
+    with archive.open_archive_stream(str(tar_path)) as tar:
+        found = []
+        for name, member in archive.find_members(tar, ["c.xml", "a.xml", "missing.xml"]):
+            found.append((name, tar.extractfile(member).read()))
+        assert found == [("a.xml", b"a.xml"), ("c.xml", b"c.xml")]
+
+    with archive.open_archive_stream(str(tar_path)) as tar:
+        assert [name for name, _ in archive.find_members(tar, ["b.xml", "a.xml"])] == ["a.xml", "b.xml"]
+        assert len(tar.members) == 2
+
+
+def test_select_members_by_names_glob_and_prefix(tmp_path):
+    tar_path = _make_tar(tmp_path, ["K1.xml", "K1.pdf", "K2.xml", "K1.xml", "other.txt"])
+
+    with archive.open_archive_stream(str(tar_path)) as tar:
+        assert [m.name for m in archive.select_members(tar, filenames=["K2.xml", "K1.xml"])] == ["K1.xml", "K2.xml"]
+        assert len(tar.members) == 3
+
+    with archive.open_archive_stream(str(tar_path)) as tar:
+        assert [m.name for m in archive.select_members(tar, pattern="*.xml")] == ["K1.xml", "K2.xml"]
+
+    with archive.open_archive_stream(str(tar_path)) as tar:
+        assert [m.name for m in archive.select_members(tar, prefix="K1", filenames=["other.txt"])] == [
+            "K1.xml",
+            "K1.pdf",
+            "other.txt",
+        ]
+
+
+def test_streaming_a_compressible_member_keeps_memory_flat(tmp_path):
+    tar_path = tmp_path / "big.tar.gz"
+    size = 16 * 1024 * 1024
+    with tarfile.open(tar_path, "w:gz") as tar:
+        info = tarfile.TarInfo(name="big.xml")
+        info.size = size
+        tar.addfile(info, io.BytesIO(b"\0" * size))
+
+    with open(tar_path, "rb", buffering=archive.TAR_READ_BUFSIZE) as source, \
+            archive.open_archive_stream(str(tar_path), source) as tar:
+        extracted = tar.extractfile(archive.find_member(tar, "big.xml"))
+        tracemalloc.start()
+        try:
+            total = sum(len(chunk) for chunk in iter(lambda: extracted.read(64 * 1024), b""))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert total == size
+    assert peak < 4 * 1024 * 1024